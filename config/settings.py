@@ -52,3 +52,153 @@ TASK_ACCOUNTS = [
 ]
 
 
+
+
+# =========================
+# 任务结果通知配置
+# =========================
+RESULT_NOTIFY_PREFIX = os.getenv('RESULT_NOTIFY_PREFIX', 'ctrip_result_notify')
+RESULT_NOTIFY_TTL = int(os.getenv('RESULT_NOTIFY_TTL', 600))  # 通知 key 过期时间（秒）
+RESULT_NOTIFY_WAIT = int(os.getenv('RESULT_NOTIFY_WAIT', 15))  # 单次阻塞等待时长，超时后回落一次 Mongo 查询
+
+
+# =========================
+# 任务队列配置
+# =========================
+TASK_QUEUE_LEASE = int(os.getenv('TASK_QUEUE_LEASE', 300))  # 任务租约时长（秒），超时未确认则重新投递
+TASK_QUEUE_REAP_INTERVAL = int(os.getenv('TASK_QUEUE_REAP_INTERVAL', 30))  # 回收过期租约的间隔（秒）
+TASK_QUEUE_BLOCK_TIMEOUT = int(os.getenv('TASK_QUEUE_BLOCK_TIMEOUT', 5))  # 阻塞领取单次等待时长（秒）
+
+
+# =========================
+# 爬虫并发配置
+# =========================
+CRAWLER_CONCURRENCY = int(os.getenv('CRAWLER_CONCURRENCY', 200))  # 单进程同时处理的任务上限
+CRAWLER_DRAIN_TIMEOUT = int(os.getenv('CRAWLER_DRAIN_TIMEOUT', 240))  # 停止时等待在途任务完成的最长时间（秒）
+DOWNLOADER_MAX_WORKERS = int(os.getenv('DOWNLOADER_MAX_WORKERS', 64))  # 同步下载器线程池大小
+DOWNLOADER_PER_HOST_LIMIT = int(os.getenv('DOWNLOADER_PER_HOST_LIMIT', 32))  # 单个 host 同时在途请求上限
+
+
+# =========================
+# 酒店基础信息缓存配置
+# =========================
+HOTEL_CACHE_SIZE = int(os.getenv('HOTEL_CACHE_SIZE', 10000))  # 进程内 LRU 容量
+HOTEL_CACHE_TTL = int(os.getenv('HOTEL_CACHE_TTL', 24 * 3600))  # 进程内缓存过期时间（秒）
+
+
+# =========================
+# Mongo 索引配置
+# =========================
+MONGO_ENSURE_INDEXES = os.getenv('MONGO_ENSURE_INDEXES', '1') == '1'  # 启动时自动创建索引
+RESULT_TTL_DAYS = int(os.getenv('RESULT_TTL_DAYS', 30))  # 爬虫结果保留天数（created_at TTL）
+HOTEL_CACHE_STORE_TTL_DAYS = int(os.getenv('HOTEL_CACHE_STORE_TTL_DAYS', 30))  # 酒店基础信息持久化缓存保留天数
+
+
+# =========================
+# 爬虫结果批量写入配置
+# =========================
+RESULT_WRITE_BATCH_SIZE = int(os.getenv('RESULT_WRITE_BATCH_SIZE', 200))  # 缓冲记录数达到该值立即写入
+RESULT_WRITE_FLUSH_INTERVAL = float(os.getenv('RESULT_WRITE_FLUSH_INTERVAL', 1.0))  # 最长缓冲时间（秒），决定调度器可见延迟
+RESULT_WRITE_MAX_RETRIES = int(os.getenv('RESULT_WRITE_MAX_RETRIES', 5))  # 整批写入失败后的最大重试次数，超过后丢弃并记录错误
+RESULT_WRITE_RETRY_BACKOFF = float(os.getenv('RESULT_WRITE_RETRY_BACKOFF', 1.0))  # 重试退避基数（秒），按 2 的幂增长
+RESULT_WRITE_RETRY_MAX_DELAY = float(os.getenv('RESULT_WRITE_RETRY_MAX_DELAY', 30.0))  # 单次退避上限（秒）
+
+
+# =========================
+# 爬虫结果存储格式
+# =========================
+# json: 历史格式，response 存 JSON 字符串
+# bson: response 存为 BSON 子文档，读取时直接得到 dict
+# zstd: response 存为 zstd 压缩后的 JSON 字节（需安装 zstandard），适合只存档很少读取的场景
+RESPONSE_STORAGE_FORMAT = os.getenv('RESPONSE_STORAGE_FORMAT', 'bson')
+RESPONSE_ZSTD_LEVEL = int(os.getenv('RESPONSE_ZSTD_LEVEL', 3))
+
+
+# =========================
+# 详情页响应解析配置
+# =========================
+# full: 读取完整响应后解析（优先 orjson）；stream: 基于 ijson 边下载边解析，只构建需要的字段（需安装 ijson）
+DETAIL_PARSE_MODE = os.getenv('DETAIL_PARSE_MODE', 'full')
+DETAIL_RESPONSE_PRUNE = os.getenv('DETAIL_RESPONSE_PRUNE', '1') == '1'  # 只保留 code/msg 与 physicRoomMap/saleRoomMap
+
+
+# =========================
+# 截图浏览器池配置
+# =========================
+BROWSER_HEADLESS = os.getenv('BROWSER_HEADLESS', '1') == '1'  # 无头模式，本地调试时可设为 0
+BROWSER_DEVICE = os.getenv('BROWSER_DEVICE', 'iPhone X')  # 截图使用的设备描述（playwright devices）
+BROWSER_PAGES_PER_DEVICE = int(os.getenv('BROWSER_PAGES_PER_DEVICE', 8))  # 每个设备同时借出的 page 上限，即所有账号合计的并发截图数
+BROWSER_PAGE_MAX_USES = int(os.getenv('BROWSER_PAGE_MAX_USES', 50))  # 单个 page 复用次数上限，超过后关闭重建
+BROWSER_RECYCLE_AFTER = int(os.getenv('BROWSER_RECYCLE_AFTER', 500))  # 浏览器累计借出 page 数上限，达到后换新浏览器，防止内存膨胀
+BROWSER_HEALTH_CHECK_TIMEOUT = float(os.getenv('BROWSER_HEALTH_CHECK_TIMEOUT', 5))  # 空闲 page 借出前健康检查超时（秒）
+SCREENSHOT_TIMEOUT = int(os.getenv('SCREENSHOT_TIMEOUT', 300))  # 单个任务截图最长等待时间（秒）
+SCREENSHOT_TASK_CONCURRENCY = int(os.getenv('SCREENSHOT_TASK_CONCURRENCY', 4))  # 单个任务同时渲染的房型数（每个房型一个 page）
+SCREENSHOT_READY_TIMEOUT = float(os.getenv('SCREENSHOT_READY_TIMEOUT', 10))  # 等待页面 / 弹窗就绪的最长时间（秒）
+# page: 每个房型单独渲染，点击展开弹窗后整页截图；single: 所有房型合并成一个文档渲染一次，弹窗用 CSS 预先展开后按元素截图
+SCREENSHOT_MODE = os.getenv('SCREENSHOT_MODE', 'page')
+
+
+# =========================
+# 房型页渲染配置
+# =========================
+# jinja: 进程内渲染（需安装 jinja2，模板与静态资源取自原 Flask 渲染服务的目录）；flask: 调用外部渲染服务
+RENDER_BACKEND = os.getenv('RENDER_BACKEND', 'jinja')
+RENDER_ROOM_URL = os.getenv('RENDER_ROOM_URL', 'http://127.0.0.1:5000/render_room')  # Flask 渲染服务地址（回落时使用）
+TEMPLATE_DIR = os.getenv('TEMPLATE_DIR', 'templates')  # 模板目录
+ROOM_TEMPLATE = os.getenv('ROOM_TEMPLATE', 'room.html')  # 房型页模板
+STATIC_DIR = os.getenv('STATIC_DIR', 'static')  # 静态资源目录（CSS / 字体 / 图片）
+RENDER_ORIGIN = os.getenv('RENDER_ORIGIN', 'http://render.local')  # 静态资源虚拟域名，由浏览器路由拦截，不发出网络请求
+TEMPLATE_AUTO_RELOAD = os.getenv('TEMPLATE_AUTO_RELOAD', '0') == '1'  # 模板修改后自动重新编译，调试时打开
+
+
+# =========================
+# 截图缓存配置
+# =========================
+SCREENSHOT_CACHE_ENABLED = os.getenv('SCREENSHOT_CACHE_ENABLED', '1') == '1'  # 按渲染内容复用截图和 OSS 上传结果
+SCREENSHOT_CACHE_DIR = os.getenv('SCREENSHOT_CACHE_DIR', 'screenshots/cache')  # 缓存目录
+SCREENSHOT_CACHE_MAX_MB = int(os.getenv('SCREENSHOT_CACHE_MAX_MB', 2048))  # 缓存总大小上限（MB），超出按最近使用时间淘汰
+SCREENSHOT_CACHE_MAX_AGE = int(os.getenv('SCREENSHOT_CACHE_MAX_AGE', 3 * 24 * 3600))  # 缓存条目最长保留时间（秒）
+SCREENSHOT_CACHE_EVICT_INTERVAL = int(os.getenv('SCREENSHOT_CACHE_EVICT_INTERVAL', 600))  # 淘汰检查间隔（秒）
+SCREENSHOT_CACHE_VERSION = os.getenv('SCREENSHOT_CACHE_VERSION', '')  # 缓存版本，修改后全部缓存失效；Flask 渲染时未配置则不使用缓存
+
+
+# =========================
+# 截图上传配置
+# =========================
+OSS_UPLOAD_WORKERS = int(os.getenv('OSS_UPLOAD_WORKERS', 8))  # 并发上传线程数，所有账号共享
+OSS_UPLOAD_RETRIES = int(os.getenv('OSS_UPLOAD_RETRIES', 5))  # 获取上传参数 / 上传文件的最大尝试次数
+OSS_UPLOAD_BACKOFF = float(os.getenv('OSS_UPLOAD_BACKOFF', 1.0))  # 重试退避基数（秒），按 2 的幂增长并加随机抖动
+OSS_UPLOAD_TIMEOUT = float(os.getenv('OSS_UPLOAD_TIMEOUT', 30))  # 单次请求超时（秒）
+
+
+# =========================
+# 任务平台接口配置
+# =========================
+PLATFORM_BASE_URL = os.getenv('PLATFORM_BASE_URL', 'http://47.101.140.209/crowd')  # 任务平台地址
+PLATFORM_POOL_SIZE = int(os.getenv('PLATFORM_POOL_SIZE', 32))  # keep-alive 连接池大小，所有账号共享
+PLATFORM_CONNECT_TIMEOUT = float(os.getenv('PLATFORM_CONNECT_TIMEOUT', 3))  # 建立连接超时（秒）
+PLATFORM_READ_TIMEOUT = float(os.getenv('PLATFORM_READ_TIMEOUT', 10))  # 登录 / 查询 / 领取 / 取消接口读超时（秒）
+PLATFORM_SUBMIT_TIMEOUT = float(os.getenv('PLATFORM_SUBMIT_TIMEOUT', 30))  # 提交接口读超时（秒）
+PLATFORM_MAX_RETRIES = int(os.getenv('PLATFORM_MAX_RETRIES', 3))  # 连接异常 / 超时 / 5xx 的最大重试次数
+PLATFORM_BACKOFF = float(os.getenv('PLATFORM_BACKOFF', 0.5))  # 重试退避基数（秒），按 2 的幂增长并加随机抖动
+PLATFORM_METRICS_LOG_INTERVAL = int(os.getenv('PLATFORM_METRICS_LOG_INTERVAL', 300))  # 接口耗时 / 错误统计输出间隔（秒）
+
+
+# =========================
+# 异步多账号调度配置
+# =========================
+ASYNC_SCHEDULER_IO_WORKERS = int(os.getenv('ASYNC_SCHEDULER_IO_WORKERS', 32))  # 执行平台接口 / Mongo 查询等阻塞调用的共享线程数
+ASYNC_SCHEDULER_STATUS_INTERVAL = int(os.getenv('ASYNC_SCHEDULER_STATUS_INTERVAL', 60))  # 各状态账号数统计输出间隔（秒）
+ACCOUNT_START_STAGGER = float(os.getenv('ACCOUNT_START_STAGGER', 0.2))  # 相邻账号启动间隔（秒），错开登录请求
+ACCOUNT_IDLE_DELAY = float(os.getenv('ACCOUNT_IDLE_DELAY', 2))  # 无可领任务时的等待时间（秒）
+ACCOUNT_RETRY_DELAY = float(os.getenv('ACCOUNT_RETRY_DELAY', 5))  # 结果无效重新投放前的等待时间（秒）
+ACCOUNT_RESTART_DELAY = float(os.getenv('ACCOUNT_RESTART_DELAY', 10))  # 账号异常后重新登录前的等待时间（秒）
+
+
+# =========================
+# 单账号流水线配置
+# =========================
+# 1: 提交后的收尾记录（task_log、cookie 统计、OSS key 登记）放到后台执行，立即领取下一个任务；仍然一次只持有一个任务
+SCHEDULER_PIPELINE = os.getenv('SCHEDULER_PIPELINE', '0') == '1'
+BOOKKEEPING_WORKERS = int(os.getenv('BOOKKEEPING_WORKERS', 2))  # 后台记录线程数，所有账号共享
+BOOKKEEPING_MAX_PENDING = int(os.getenv('BOOKKEEPING_MAX_PENDING', 1000))  # 积压记录数上限，超过后提交方阻塞等待
@@ -13,13 +13,51 @@ from loguru import logger
 from pymongo import MongoClient, UpdateOne, InsertOne, ASCENDING, ReturnDocument
 from pymongo.collection import Collection
 from pymongo.database import Database
-from typing import Optional, Dict, Any, List, Iterable, Tuple
+from typing import Optional, Dict, Any, List, Iterable, Tuple, AsyncIterator
+from pymongo.errors import CursorNotFound
+try:
+    from pymongo import AsyncMongoClient  # pymongo >= 4.9
+except ImportError:  # pragma: no cover
+    AsyncMongoClient = None
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import argparse
+import queue
 import threading
 
 from config import settings
 
 
-
+# 爬虫结果按 (hotel_name, check_in, check_out, date) 查询和 upsert
+_RESULT_INDEXES = [
+    (
+        [("hotel_name", ASCENDING), ("check_in", ASCENDING), ("check_out", ASCENDING), ("date", ASCENDING)],
+        {"name": "uniq_hotel_checkin_checkout_date", "unique": True},
+    ),
+    (
+        [("created_at", ASCENDING)],
+        {"name": "ttl_created_at", "expireAfterSeconds": settings.RESULT_TTL_DAYS * 24 * 3600},
+    ),
+]
+
+# 启动时需要保证存在的索引：{db_name: {collection: [(keys, options), ...]}}
+INDEX_SPECS: Dict[str, Dict[str, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]]] = {
+    "ctrip": {
+        "ctrip_detail_results": _RESULT_INDEXES,
+        "ctrip_list_results": _RESULT_INDEXES,
+        "cookie_use_log": [
+            ([("phone", ASCENDING)], {"name": "uniq_phone", "unique": True}),
+        ],
+        "task_log": [
+            ([("hotel_name", ASCENDING), ("check_in", ASCENDING), ("check_out", ASCENDING)],
+             {"name": "hotel_checkin_checkout"}),
+        ],
+        "hotel_identity": [
+            ([("updated_at", ASCENDING)],
+             {"name": "ttl_updated_at", "expireAfterSeconds": settings.HOTEL_CACHE_STORE_TTL_DAYS * 24 * 3600}),
+        ],
+    },
+}
 
 
 class MongoClientSingleton:
@@ -47,8 +85,13 @@ class MongoClientSingleton:
 
         4. **增强功能**
            - `create_ttl_index()`      : 支持创建ttl索引功能。
+           - `ensure_indexes()` : 按 `INDEX_SPECS` 创建复合索引、唯一索引和 TTL 索引，实例化时自动执行；
+                                  唯一索引创建失败时记录错误日志，strict=True 时抛出异常。
+           - `dedupe()`         : 删除唯一索引键重复的历史文档，之后才能建立唯一索引。
+           - `index_stats()`    : 基于 `$indexStats` 查看索引使用情况。
            - `write()`      : 封装批量写操作，支持 Insert / Update 混合，底层基于 `bulk_write`。
-           - `iter_data()`  : 批量迭代读取数据，按块返回（游标遍历）。
+           - `iter_data()`  : 批量迭代读取数据，按块返回（单游标遍历，失效后按 keyset 续读）。
+           - `iter_data_parallel()` : 按 `_id` 区间分片多线程并行读取。
            - `batch_data()` : 使用聚合管道方式批量读取，支持 skip / group / sort / project 等复杂场景。
 
         使用示例：
@@ -89,6 +132,8 @@ class MongoClientSingleton:
         self._db: Optional[Database] = None
 
         self.connect()
+        if settings.MONGO_ENSURE_INDEXES:
+            self.ensure_indexes()
         self._initialized = True
 
     @property
@@ -249,6 +294,84 @@ class MongoClientSingleton:
         except Exception as e:
             logger.warning(f"Failed to create TTL index on {database}.{collection}: {e}")
 
+    def ensure_indexes(self, database: Optional[str] = None,
+                       specs: Optional[Dict[str, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]]] = None,
+                       strict: bool = False):
+        """
+        按 INDEX_SPECS 创建索引，已存在的索引 create_index 为空操作，可重复执行
+
+        :param database: 数据库名，默认为当前数据库
+        :param specs: {collection: [(keys, options), ...]}，默认取 INDEX_SPECS[database]
+        :param strict: 唯一索引创建失败时抛出 RuntimeError（命令行 --ensure-indexes 使用）；
+                       默认只记录错误日志，实例化时的自动创建不会因历史重复数据或缺少权限导致进程无法启动
+        """
+        database = database or self._db_name
+        specs = specs if specs is not None else INDEX_SPECS.get(database, {})
+        for collection, indexes in specs.items():
+            col: Collection = self._client[database][collection]
+            for keys, options in indexes:
+                try:
+                    col.create_index(keys, **options)
+                except Exception as e:
+                    if not options.get("unique"):
+                        logger.warning(f"Failed to create index {options.get('name')} on {database}.{collection}: {e}")
+                        continue
+                    # 常见原因：历史数据存在重复，先执行 python -m db.mongo --db ctrip --dedupe；或账号缺少 createIndex 权限
+                    message = (f"Failed to create unique index {options.get('name')} on {database}.{collection}: {e}; "
+                               f"run `python -m db.mongo --db {database} --dedupe --ensure-indexes` to remove duplicates first")
+                    if strict:
+                        raise RuntimeError(message) from e
+                    logger.error(message)
+
+    def dedupe(self, database: Optional[str] = None,
+               specs: Optional[Dict[str, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]]] = None) -> Dict[str, int]:
+        """
+        按 INDEX_SPECS 中的唯一索引删除重复文档，每组只保留一条：优先 is_valid=True，其次 _id 最新
+
+        :param database: 数据库名，默认为当前数据库
+        :param specs: {collection: [(keys, options), ...]}，默认取 INDEX_SPECS[database]
+        :return: {collection: 删除的文档数}
+        """
+        database = database or self._db_name
+        specs = specs if specs is not None else INDEX_SPECS.get(database, {})
+        removed: Dict[str, int] = {}
+        for collection, indexes in specs.items():
+            col: Collection = self._client[database][collection]
+            for keys, options in indexes:
+                if not options.get("unique"):
+                    continue
+                pipeline = [
+                    {"$sort": {"is_valid": -1, "_id": -1}},
+                    {"$group": {"_id": {field: f"${field}" for field, _ in keys},
+                                "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+                    {"$match": {"count": {"$gt": 1}}},
+                ]
+                for group in col.aggregate(pipeline, allowDiskUse=True):
+                    result = col.delete_many({"_id": {"$in": group["ids"][1:]}})
+                    removed[collection] = removed.get(collection, 0) + result.deleted_count
+        logger.info(f"Removed duplicates on {database}: {removed}")
+        return removed
+
+    def index_stats(self, collection: str, database: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        查看集合各索引的使用次数（$indexStats），统计值在 mongod 重启后清零
+
+        :param collection: 集合名
+        :param database: 数据库名，默认为当前数据库
+        :return: [{"name": ..., "key": ..., "ops": ..., "since": ...}, ...]
+        """
+        database = database or self._db_name
+        col: Collection = self._client[database][collection]
+        return [
+            {
+                "name": item["name"],
+                "key": dict(item["key"]),
+                "ops": item["accesses"]["ops"],
+                "since": item["accesses"]["since"],
+            }
+            for item in col.aggregate([{"$indexStats": {}}])
+        ]
+
     # ======================= 重写方法 ===========================
     def write(
             self,
@@ -318,44 +441,229 @@ class MongoClientSingleton:
             sort: Optional[List[tuple]] = None,
             skip: int = 0,
             count: int = 1000,
+            batch_size: Optional[int] = None,
     ) -> Iterable[List[dict]]:
         """
         从 collection_name 获取迭代数据
 
+        使用单个服务端游标顺序读取，按 count 条一块返回，不再每块重新 skip（大集合下 O(n²)）。
+        排序键末尾自动补 `_id` 保证全序；若游标在处理过程中超时失效，则按 keyset
+        （最后一条记录的排序键值）重新打开游标继续读取，不重复也不遗漏。
+        排序字段需要有索引；projection 会自动带上排序字段（含 `_id`），调用方未请求的字段在返回前删除。
+
         :param projection: 过滤字段
         :param collection: 表名
         :param query: 过滤条件
-        :param sort: 排序条件
+        :param sort: 排序条件，默认按 `_id` 升序
         :param database: 数据库
-        :param skip: 要跳过多少
+        :param skip: 要跳过多少（仅首次打开游标时生效）
         :param count: 一次能得到多少
+        :param batch_size: 游标每次从服务端拉取的条数，默认与 count 相同
         :return:
         """
         database = database or self._db_name
         col: Collection = self._client[database][collection]
-        sort = [sort] if (not isinstance(sort, list) and sort) else sort
+        sort = self._keyset_sort(sort)
+        projection, added = self._keyset_projection(projection, sort)
         query = query or {}
 
+        batch: List[dict] = []
+        last_values = None
         while True:
-            data = list(
-                col.find(
-                    filter=query,
-                    projection=projection,
-                    skip=skip,
-                    sort=sort,
-                    limit=count,
-                    allow_disk_use=True,
-                )
+            _query = query if last_values is None else {"$and": [query, self._keyset_condition(sort, last_values)]}
+            cursor = col.find(
+                filter=_query,
+                projection=projection,
+                skip=skip if last_values is None else 0,
+                sort=sort,
+                batch_size=batch_size or count,
+                allow_disk_use=True,
             )
-            if not data:
-                return
+            try:
+                for doc in cursor:
+                    last_values = self._keyset_values(sort, doc)
+                    batch.append(self._strip_fields(doc, added))
+                    if len(batch) >= count:
+                        yield batch
+                        batch = []
+            except CursorNotFound:
+                logger.warning(f"Cursor on {database}.{collection} expired, resuming from last key")
+                continue
+            finally:
+                cursor.close()
+
+            if batch:
+                yield batch
+            return
 
-            else:
-                yield data
-                skip += len(data)
+    def iter_data_parallel(
+            self,
+            collection: str,
+            query: Dict[str, Any] = None,
+            projection: Dict[str, Any] = None,
+            database: str = None,
+            partitions: int = 4,
+            count: int = 1000,
+            batch_size: Optional[int] = None,
+    ) -> Iterable[List[dict]]:
+        """
+        按 `_id` 区间分片，多线程并行读取，适合全表导出、夜间报表等不关心顺序的场景
 
+        先用 `$bucketAuto` 把满足条件的数据按 `_id` 切成 partitions 段，每段在独立线程里用 iter_data 读取，
+        批次按完成先后返回，不保证顺序。
 
+        :param collection: 表名
+        :param query: 过滤条件
+        :param projection: 过滤字段
+        :param database: 数据库
+        :param partitions: 分片数 / 线程数
+        :param count: 一次能得到多少
+        :param batch_size: 游标每次从服务端拉取的条数
+        :return:
+        """
+        database = database or self._db_name
+        col: Collection = self._client[database][collection]
+        query = query or {}
 
+        pipeline = [
+            {"$match": query},
+            {"$bucketAuto": {"groupBy": "$_id", "buckets": partitions}},
+        ]
+        buckets = list(col.aggregate(pipeline, allowDiskUse=True))
+        if not buckets:
+            return
+
+        ranges = []
+        for index, bucket in enumerate(buckets):
+            # 除最后一段外，区间上界是开区间
+            upper = "$lte" if index == len(buckets) - 1 else "$lt"
+            ranges.append({"$and": [query, {"_id": {"$gte": bucket["_id"]["min"], upper: bucket["_id"]["max"]}}]})
+
+        done = object()
+        stopped = threading.Event()
+        results: "queue.Queue" = queue.Queue(maxsize=partitions * 2)
+
+        def put(item) -> bool:
+            # 调用方提前退出时不再阻塞在满队列上
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker(range_query: Dict[str, Any]):
+            try:
+                for data in self.iter_data(collection, query=range_query, projection=projection,
+                                           database=database, count=count, batch_size=batch_size):
+                    if not put(data):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="mongo-iter") as executor:
+            for range_query in ranges:
+                executor.submit(worker, range_query)
+
+            try:
+                finished = 0
+                while finished < len(ranges):
+                    item = results.get()
+                    if item is done:
+                        finished += 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stopped.set()
+
+    @staticmethod
+    def _keyset_sort(sort) -> List[Tuple[str, int]]:
+        """规范化排序条件，并以 `_id` 兜底保证全序"""
+        sort = [sort] if (not isinstance(sort, list) and sort) else list(sort or [])
+        if not sort:
+            return [("_id", ASCENDING)]
+        if all(field != "_id" for field, _ in sort):
+            sort.append(("_id", sort[0][1]))
+        return sort
+
+    @staticmethod
+    def _keyset_projection(projection: Optional[Dict[str, Any]],
+                           sort: List[Tuple[str, int]]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """
+        keyset 续读依赖每条记录的全部排序字段（含 `_id`），projection 必须返回这些字段：
+            - 包含型 projection：补上未包含的排序字段，包括被显式排除的 `_id`
+            - 排除型 projection：去掉对排序字段的排除
+        返回 (projection, 额外加入的字段)，额外加入的字段在返回给调用方之前删除
+        """
+        if not projection:
+            return projection, []
+        projection = dict(projection)
+        inclusive = any(v for k, v in projection.items() if k != "_id")
+        added = []
+        for field, _ in sort:
+            if inclusive:
+                # 父路径已包含时不能再加子路径（Path collision）
+                parents = [".".join(field.split(".")[:i]) for i in range(1, field.count(".") + 1)]
+                if any(projection.get(parent) for parent in parents):
+                    continue
+                if field == "_id" and "_id" not in projection:
+                    continue  # 包含型 projection 默认返回 _id
+                if not projection.get(field):
+                    projection[field] = 1
+                    added.append(field)
+            elif field in projection:
+                del projection[field]
+                added.append(field)
+        # pymongo 把空 projection 当作只返回 _id
+        return projection or None, added
+
+    @staticmethod
+    def _keyset_values(sort: List[Tuple[str, int]], doc: dict) -> List[Any]:
+        """按排序字段取值，支持 a.b 形式的嵌套字段"""
+        values = []
+        for field, _ in sort:
+            value = doc
+            for part in field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            values.append(value)
+        return values
+
+    @staticmethod
+    def _strip_fields(doc: dict, fields: List[str]) -> dict:
+        """删除 keyset 额外加入的字段，嵌套字段删除后父文档为空时一并删除"""
+        for field in fields:
+            parts = field.split(".")
+            parents = [doc]
+            for part in parts[:-1]:
+                child = parents[-1].get(part)
+                if not isinstance(child, dict):
+                    break
+                parents.append(child)
+            else:
+                parents[-1].pop(parts[-1], None)
+                for depth in range(len(parents) - 1, 0, -1):
+                    if parents[depth]:
+                        break
+                    parents[depth - 1].pop(parts[depth - 1], None)
+        return doc
+
+    @staticmethod
+    def _keyset_condition(sort: List[Tuple[str, int]], last_values: List[Any]) -> Dict[str, Any]:
+        """
+        构造"排在上一条记录之后"的条件，按字典序展开：
+            (k1 > v1) or (k1 == v1 and k2 > v2) or ...
+        """
+        conditions = []
+        for index, (field, direction) in enumerate(sort):
+            condition = {f: last_values[i] for i, (f, _) in enumerate(sort[:index])}
+            condition[field] = {"$gt" if direction == ASCENDING else "$lt": last_values[index]}
+            conditions.append(condition)
+        return conditions[0] if len(conditions) == 1 else {"$or": conditions}
 
     def batch_data(self,
                    collection: str,
@@ -483,15 +791,220 @@ class MongoClientSingleton:
 
         self._client[database][collection].update_one(query, update, upsert=upsert)
 
+
+class AsyncMongoClientSingleton:
+    """
+        MongoDB 异步客户端单例封装类，基于 pymongo 的 `AsyncMongoClient`
+
+        与 `MongoClientSingleton` 共用 `config.settings` 中的连接配置和 `INDEX_SPECS` 索引定义，
+        接口保持一致但均为协程，供爬虫等 asyncio 进程在事件循环中直接读写，不阻塞其他在途请求。
+
+        常用操作：
+           - `find_one()`       : 单条查询。
+           - `update()`         : 批量更新文档，支持 upsert。
+           - `write()`          : 批量写操作，底层基于 `bulk_write`。
+           - `iter_data()`      : 异步批量迭代读取数据，按块返回（单游标遍历）。
+           - `ensure_indexes()` : 按 `INDEX_SPECS` 创建索引，MONGO_ENSURE_INDEXES 开启时首次操作前自动执行。
+
+        注意：异步客户端绑定首次使用时的事件循环，同一实例不要跨事件循环使用。
+
+        使用示例：
+        -----------
+        # >>> mongo = AsyncMongoClientSingleton(db_name="ctrip")
+        # >>> await mongo.update("users", {"active": True}, {"age": {"$gte": 18}})
+        # >>> async for batch in mongo.iter_data("users", count=1000):
+        # ...     print(batch)
+        """
+    _instances: Dict[str, "AsyncMongoClientSingleton"] = {}  # 按 db_name 存储单例
+    _lock = threading.Lock()
+
+    def __new__(cls, uri: str = None, db_name: str = None):
+        db_name = db_name or settings.MONGO_DB
+        with cls._lock:
+            if db_name not in cls._instances:
+                cls._instances[db_name] = super().__new__(cls)
+            return cls._instances[db_name]
+
+    def __init__(self, uri: str = None, db_name: str = None):
+        if getattr(self, "_initialized", False):
+            return
+        if AsyncMongoClient is None:
+            raise ImportError("AsyncMongoClientSingleton 需要 pymongo >= 4.9")
+
+        self._uri = uri or settings.MONGO_URI
+        self._db_name = db_name or settings.MONGO_DB
+        # AsyncMongoClient 在首次操作时才建立连接，实例化本身不产生 IO
+        self._client = AsyncMongoClient(self._uri, tz_aware=True)
+        self._db = self._client[self._db_name]
+        self._indexes_ready = not settings.MONGO_ENSURE_INDEXES
+        self._index_lock: Optional[asyncio.Lock] = None
+        self._initialized = True
+        logger.info(f"Created async MongoDB client {self._uri}, db={self._db_name}")
+
+    @property
+    def client(self):
+        """对外暴露 AsyncMongoClient"""
+        return self._client
+
+    @property
+    def db(self):
+        """对外暴露 AsyncDatabase"""
+        return self._db
+
+    async def _collection(self, collection: str, database: Optional[str] = None):
+        """首次操作前创建索引（与 MongoClientSingleton 实例化时的行为一致），返回 AsyncCollection"""
+        if not self._indexes_ready:
+            if self._index_lock is None:
+                self._index_lock = asyncio.Lock()
+            async with self._index_lock:
+                if not self._indexes_ready:
+                    await self.ensure_indexes()
+                    self._indexes_ready = True
+        return self._client[database or self._db_name][collection]
+
+    async def find_one(self, collection: str, query: Dict[str, Any] = None, database: str = None,
+                       projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        col = await self._collection(collection, database)
+        return await col.find_one(query or {}, projection=projection)
+
+    async def update(self, collection: str, update_data: Dict[str, Any], query: Dict[str, Any] = None,
+                     database: str = None, upsert: bool = True, use_set: bool = True):
+        """
+        支持 $set / $inc 等 MongoDB 操作符，参数同 MongoClientSingleton.update
+        """
+        col = await self._collection(collection, database)
+        query = query or {}
+
+        if any(k.startswith("$") for k in update_data.keys()):
+            update_doc = update_data
+        else:
+            update_doc = {"$set": update_data} if use_set else update_data
+        return await col.update_many(query, update_doc, upsert=upsert)
+
+    async def write(
+            self,
+            collection: str,
+            *items: Dict[str, Any],
+            query: Optional[List[str]] = None,
+            database: Optional[str] = None,
+            **kwargs,
+    ):
+        """
+        批量更新或者插入，参数同 MongoClientSingleton.write
+        """
+        query = query or []
+        action = kwargs.pop("action", "$set")
+        upsert = kwargs.pop("upsert", True)
+        update_op = kwargs.pop("update_op", None) or UpdateOne
+        insert_op = kwargs.pop("insert_op", None) or InsertOne
+        col = await self._collection(collection, database)
+        requests = []
+
+        for item in items:
+            item = dict(item)
+            if query:
+                _query = {i: item.get(i) for i in query}
+                requests.append(update_op(filter=_query, update={action: item}, upsert=upsert))
+            else:
+                requests.append(insert_op(item))
+
+        return requests and await col.bulk_write(requests, ordered=False)
+
+    async def iter_data(
+            self,
+            collection: str,
+            query: Dict[str, Any] = None,
+            projection: Dict[str, Any] = None,
+            database: str = None,
+            sort: Optional[List[tuple]] = None,
+            skip: int = 0,
+            count: int = 1000,
+            batch_size: Optional[int] = None,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        异步版 iter_data：单个服务端游标顺序读取，按 count 条一块返回，游标失效后按 keyset 续读
+        """
+        database = database or self._db_name
+        col = await self._collection(collection, database)
+        sort = MongoClientSingleton._keyset_sort(sort)
+        projection, added = MongoClientSingleton._keyset_projection(projection, sort)
+        query = query or {}
+
+        batch: List[dict] = []
+        last_values = None
+        while True:
+            _query = query if last_values is None else {
+                "$and": [query, MongoClientSingleton._keyset_condition(sort, last_values)]
+            }
+            cursor = col.find(
+                filter=_query,
+                projection=projection,
+                skip=skip if last_values is None else 0,
+                sort=sort,
+                batch_size=batch_size or count,
+                allow_disk_use=True,
+            )
+            try:
+                async for doc in cursor:
+                    last_values = MongoClientSingleton._keyset_values(sort, doc)
+                    batch.append(MongoClientSingleton._strip_fields(doc, added))
+                    if len(batch) >= count:
+                        yield batch
+                        batch = []
+            except CursorNotFound:
+                logger.warning(f"Cursor on {database}.{collection} expired, resuming from last key")
+                continue
+            finally:
+                await cursor.close()
+
+            if batch:
+                yield batch
+            return
+
+    async def ensure_indexes(self, database: Optional[str] = None,
+                             specs: Optional[Dict[str, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]]] = None):
+        """
+        按 INDEX_SPECS 创建索引，与 MongoClientSingleton.ensure_indexes 默认行为一致：创建失败只记录日志
+        """
+        database = database or self._db_name
+        specs = specs if specs is not None else INDEX_SPECS.get(database, {})
+        for collection, indexes in specs.items():
+            col = self._client[database][collection]
+            for keys, options in indexes:
+                try:
+                    await col.create_index(keys, **options)
+                except Exception as e:
+                    log = logger.error if options.get("unique") else logger.warning
+                    log(f"Failed to create index {options.get('name')} on {database}.{collection}: {e}")
+
+    async def close(self):
+        await self._client.close()
+        with self._lock:
+            if self._instances.get(self._db_name) is self:
+                del self._instances[self._db_name]
+
+
 if __name__ == "__main__":
-    mongo_instance = MongoClientSingleton(settings.MONGO_URI, db_name="crawler")
-
-    # print(mongo_instance.find("crawl_tasks", {"status": "pending"}, limit=500))
-    # mongo_instance.update(
-    #     "crawl_tasks",
-    #     {
-    #         "last_heartbeat": now_local(),
-    #         "update_at": now_local(),
-    #     },
-    #     {"id": "a13f9c0f7c0d2f5bbf24c6f2"}
-    # )
\ No newline at end of file
+    # python -m db.mongo --db ctrip --ensure-indexes
+    # python -m db.mongo --db ctrip --index-stats ctrip_detail_results ctrip_list_results
+    # python -m db.mongo --db ctrip --dedupe --ensure-indexes
+    parser = argparse.ArgumentParser(description="MongoDB 索引维护")
+    parser.add_argument("--db", default="ctrip", help="数据库名")
+    parser.add_argument("--dedupe", action="store_true", help="删除唯一索引键重复的文档（在 --ensure-indexes 之前执行）")
+    parser.add_argument("--ensure-indexes", action="store_true", help="按 INDEX_SPECS 创建索引")
+    parser.add_argument("--index-stats", nargs="*", metavar="COLLECTION",
+                        help="输出索引使用情况，不指定集合时输出 INDEX_SPECS 中的全部集合")
+    args = parser.parse_args()
+
+    # 由命令行显式控制索引创建：先 --dedupe 再建索引，唯一索引创建失败时以非零状态退出
+    settings.MONGO_ENSURE_INDEXES = False
+    mongo_instance = MongoClientSingleton(settings.MONGO_URI, db_name=args.db)
+    if args.dedupe:
+        mongo_instance.dedupe()
+    if args.ensure_indexes:
+        mongo_instance.ensure_indexes(strict=True)
+    if args.index_stats is not None:
+        for name in args.index_stats or INDEX_SPECS.get(args.db, {}).keys():
+            print(f"== {args.db}.{name}")
+            for stat in mongo_instance.index_stats(name):
+                print(f"  {stat['name']:<40} ops={stat['ops']:<10} since={stat['since']}  key={stat['key']}")
@@ -1,36 +1,51 @@
 import json
 from dataclasses import dataclass
-from typing import List, Optional, Any, Dict, Tuple
+from typing import List, Optional, Any, Dict, Tuple, Iterable
 
 
 # ============================
 # 数据模型
 # ============================
+# 解析结果使用不可变的 slots 记录，比 dict 更省内存；只在渲染（调用 Flask / 模板）时通过 to_dict() 转成 dict
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Discount:
     name: str
-    amount: float
+    amount: Optional[float]
     desc: str
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "amount": self.amount, "desc": self.desc}
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Dialog:
     title: str
     date_range: str
     room_name: str
     room_code: str
-    fee: float
+    fee: Optional[float]
     discount_total: float
-    discounts: List[Discount]
-    final_price: Optional[float] = None
+    discounts: Tuple[Discount, ...]
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "title": self.title,
+            "date_range": self.date_range,
+            "room_name": self.room_name,
+            "room_code": self.room_code,
+            "fee": self.fee,
+            "discount_total": self.discount_total,
+            "discounts": [d.to_dict() for d in self.discounts],
+        }
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Room:
-    id: str
-    name: str
-    code: str
+    group_id: Any
+    id: Any
+    name: Optional[str]
+    code: Optional[str]
     img: Optional[str]
     bed: Optional[str]
     size: Optional[str]
@@ -39,10 +54,72 @@ class Room:
     cancel: Optional[str]
     old_price: Optional[float]
     price: Optional[float]
-    discounts: List[str]
+    discounts: Tuple[str, ...]
     discount_desc: Optional[str]
     residue: Optional[str]
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "group_id": self.group_id,
+            "id": self.id,
+            "name": self.name,
+            "code": self.code,
+            "img": self.img,
+            "bed": self.bed,
+            "size": self.size,
+            "people": self.people,
+            "breakfast": self.breakfast,
+            "cancel": self.cancel,
+            "old_price": self.old_price,
+            "price": self.price,
+            "discounts": list(self.discounts),
+            "discount_desc": self.discount_desc,
+            "residue": self.residue,
+        }
+
+
+class RoomIndex:
+    """
+    房型 / 费用明细索引：按房型名称、房型编码 O(1) 查找，替代截图时对全部房型的反复过滤
+
+    使用示例：
+        # >>> rooms, dialogs = parse_room(json_content=response)
+        # >>> index = RoomIndex(rooms, dialogs)
+        # >>> index.by_name("豪华大床房")
+        # >>> index.dialogs_for(["code1", "code2"])
+    """
+    __slots__ = ("rooms", "dialogs", "_by_name", "_by_code", "_dialogs_by_code")
+
+    def __init__(self, rooms: List[Room], dialogs: List[Dialog]):
+        self.rooms = rooms
+        self.dialogs = dialogs
+        self._by_name: Dict[str, List[Room]] = {}
+        self._by_code: Dict[str, Room] = {}
+        self._dialogs_by_code: Dict[str, List[Tuple[int, Dialog]]] = {}
+
+        for room in rooms:
+            self._by_name.setdefault(room.name or "", []).append(room)
+            if room.code:
+                self._by_code.setdefault(room.code, room)
+        for position, dialog in enumerate(dialogs):
+            if dialog.room_code:
+                self._dialogs_by_code.setdefault(dialog.room_code, []).append((position, dialog))
+
+    def by_name(self, name: str) -> List[Room]:
+        """按房型名称查找，保持解析顺序"""
+        return self._by_name.get(name or "", [])
+
+    def by_code(self, code: str) -> Optional[Room]:
+        """按房型编码查找"""
+        return self._by_code.get(code)
+
+    def dialogs_for(self, codes: Iterable[str]) -> List[Dialog]:
+        """查找一组房型编码对应的费用明细，保持解析顺序"""
+        matched = []
+        for code in set(codes):
+            matched.extend(self._dialogs_by_code.get(code, []))
+        return [dialog for _, dialog in sorted(matched, key=lambda item: item[0])]
+
 
 # ============================
 # 安全辅助函数
@@ -67,9 +144,9 @@ def safe_float(value: Any) -> Optional[float]:
 # 主解析逻辑
 # ============================
 
-def parse_room(file_path:str =None, json_content: Dict = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+def parse_room(file_path:str =None, json_content: Dict = None) -> Tuple[List[Room], List[Dialog]]:
     """
-    解析酒店 JSON 文件并返回房间信息和费用明细对话框信息
+    解析酒店 JSON 文件并返回房间信息和费用明细对话框信息（Room / Dialog 记录）
     """
     room_info = []
     dialogs = []
@@ -107,13 +184,16 @@ def parse_room(file_path:str =None, json_content: Dict = None) -> Tuple[List[Dic
             })
 
         # 2️⃣ 解析 saleRoomMap (售卖房间信息)
+        # 先按 physicalRoomId 一次分组，避免每个物理房型都扫描一遍 saleRoomMap（O(P×S) → O(P+S)），
+        # 分组内保持 saleRoomMap 的原有顺序，输出与逐个扫描一致
+        sale_room_groups: Dict[Any, List[Dict]] = {}
+        for _, v in data.get("saleRoomMap", {}).items():
+            sale_room_groups.setdefault(safe_get(v, "physicalRoomId"), []).append(v)
+
         for physic_item in physic_room_list:
             room_physic_id = physic_item["room_physic_id"]
 
-            for _, v in data.get("saleRoomMap", {}).items():
-                if safe_get(v, "physicalRoomId") != room_physic_id:
-                    continue
-
+            for v in sale_room_groups.get(room_physic_id, ()):
                 room_id = safe_get(v, "id")
                 room_code = safe_get(v, "roomCode")
                 meal_title = safe_get(v.get("mealInfo", {}), "title")
@@ -137,23 +217,23 @@ def parse_room(file_path:str =None, json_content: Dict = None) -> Tuple[List[Dic
                     residue = safe_get(inspire_info[0], "title", "")
 
                 if price:  # 仅保留有价格的房型
-                    room_info.append({
-                        "group_id": room_physic_id,
-                        "id": room_id,
-                        "name": physic_item["room_name"],
-                        "code": room_code,
-                        "img": physic_item["picture_url"],
-                        "bed": physic_item["bed_info"],
-                        "size": physic_item["area_info"],
-                        "people": physic_item["people_info"],
-                        "breakfast": meal_title,
-                        "cancel": cancel_title,
-                        "old_price": old_price,
-                        "price": price,
-                        "discounts": discounts,
-                        "discount_desc": discount_desc,
-                        "residue": residue,
-                    })
+                    room_info.append(Room(
+                        group_id=room_physic_id,
+                        id=room_id,
+                        name=physic_item["room_name"],
+                        code=room_code,
+                        img=physic_item["picture_url"],
+                        bed=physic_item["bed_info"],
+                        size=physic_item["area_info"],
+                        people=physic_item["people_info"],
+                        breakfast=meal_title,
+                        cancel=cancel_title,
+                        old_price=old_price,
+                        price=price,
+                        discounts=tuple(discounts),
+                        discount_desc=discount_desc,
+                        residue=residue,
+                    ))
 
                 # 3️⃣ 解析费用对话框信息
                 total_price_info = safe_get(v, "totalPriceInfo")
@@ -165,7 +245,8 @@ def parse_room(file_path:str =None, json_content: Dict = None) -> Tuple[List[Dic
                         promotion_dict=total_price_info,
                         old_price= old_price
                     )
-                    dialogs.append(dialog_info)
+                    if dialog_info:
+                        dialogs.append(dialog_info)
 
         return room_info, dialogs
 
@@ -183,7 +264,7 @@ def parse_room(file_path:str =None, json_content: Dict = None) -> Tuple[List[Dic
 # 费用详情解析
 # ============================
 
-def parse_dialog(date_range: str, room_name: str, room_code: str, promotion_dict: Dict, old_price:str) -> Dict:
+def parse_dialog(date_range: str, room_name: str, room_code: str, promotion_dict: Dict, old_price:str) -> Optional[Dialog]:
     """解析促销价格明细"""
     try:
         quantity_days = safe_get(promotion_dict, "quantityDays", {})
@@ -194,25 +275,21 @@ def parse_dialog(date_range: str, room_name: str, room_code: str, promotion_dict
         for item in safe_get(promotion_dict, "promotionItems", []):
             title = safe_get(item, "title", "")
             amount = safe_float(safe_get(item, "amount"))
-            discounts.append({
-                "name": title,
-                "amount": amount,
-                "desc": title,
-            })
-
-        return {
-            "title": "费用明细",
-            "date_range": date_range,
-            "room_name": room_name,
-            "room_code": room_code,
-            "fee": fee,
-            "discount_total": discount_total,
-            "discounts": discounts,
-        }
+            discounts.append(Discount(name=title, amount=amount, desc=title))
+
+        return Dialog(
+            title="费用明细",
+            date_range=date_range,
+            room_name=room_name,
+            room_code=room_code,
+            fee=fee,
+            discount_total=discount_total,
+            discounts=tuple(discounts),
+        )
 
     except Exception as e:
         print(f"⚠️ 解析费用信息时出错 ({room_name}): {e}")
-        return {}
+        return None
 
 
 # ============================
@@ -223,5 +300,5 @@ if __name__ == "__main__":
     hotel, dialogs = parse_room(r"C:\Users\95826\Documents\携程项目\json\hotel_detail.json")
 
     print(f"✅ 成功解析 {len(hotel)} 个房型，{len(dialogs)} 条费用详情")
-    print(json.dumps(hotel[:1], ensure_ascii=False, indent=2))
-    print(json.dumps(dialogs[:1], ensure_ascii=False, indent=2))
+    print(json.dumps([r.to_dict() for r in hotel[:1]], ensure_ascii=False, indent=2))
+    print(json.dumps([d.to_dict() for d in dialogs[:1]], ensure_ascii=False, indent=2))
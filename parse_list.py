@@ -2,20 +2,14 @@ import json
 from dataclasses import dataclass
 from typing import List, Optional, Any, Dict, Tuple
 
+from parse_detail import Discount, Dialog, Room  # 房型记录与详情页共用
+
 
 # ============================
 # 数据模型
 # ============================
 
-@dataclass
-class Discount:
-    name: str
-    amount: float
-    desc: str
-
-
-
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Hotel:
     id: str
     name: str
@@ -32,7 +26,6 @@ class Hotel:
     position_desc: Optional[str]
 
 
-
 # ============================
 # 安全辅助函数
 # ============================
@@ -56,9 +49,9 @@ def safe_float(value: Any) -> Optional[float]:
 # 主解析逻辑
 # ============================
 
-def parse_hotel(file_path:str =None, json_content: Dict = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+def parse_hotel(file_path:str =None, json_content: Dict = None) -> Tuple[List[Room], List[Dialog]]:
     """
-    解析酒店 JSON 文件并返回房间信息和费用明细对话框信息
+    解析酒店 JSON 文件并返回房间信息和费用明细对话框信息（Room / Dialog 记录）
     """
     room_info = []
     dialogs = []
@@ -96,13 +89,16 @@ def parse_hotel(file_path:str =None, json_content: Dict = None) -> Tuple[List[Di
             })
 
         # 2️⃣ 解析 saleRoomMap (售卖房间信息)
+        # 先按 physicalRoomId 一次分组，避免每个物理房型都扫描一遍 saleRoomMap（O(P×S) → O(P+S)），
+        # 分组内保持 saleRoomMap 的原有顺序，输出与逐个扫描一致
+        sale_room_groups: Dict[Any, List[Dict]] = {}
+        for _, v in data.get("saleRoomMap", {}).items():
+            sale_room_groups.setdefault(safe_get(v, "physicalRoomId"), []).append(v)
+
         for physic_item in physic_room_list:
             room_physic_id = physic_item["room_physic_id"]
 
-            for _, v in data.get("saleRoomMap", {}).items():
-                if safe_get(v, "physicalRoomId") != room_physic_id:
-                    continue
-
+            for v in sale_room_groups.get(room_physic_id, ()):
                 room_id = safe_get(v, "id")
                 room_code = safe_get(v, "roomCode")
                 meal_title = safe_get(v.get("mealInfo", {}), "title")
@@ -126,23 +122,23 @@ def parse_hotel(file_path:str =None, json_content: Dict = None) -> Tuple[List[Di
                     residue = safe_get(inspire_info[0], "title", "")
 
                 if price:  # 仅保留有价格的房型
-                    room_info.append({
-                        "group_id": room_physic_id,
-                        "id": room_id,
-                        "name": physic_item["room_name"],
-                        "code": room_code,
-                        "img": physic_item["picture_url"],
-                        "bed": physic_item["bed_info"],
-                        "size": physic_item["area_info"],
-                        "people": physic_item["people_info"],
-                        "breakfast": meal_title,
-                        "cancel": cancel_title,
-                        "old_price": old_price,
-                        "price": price,
-                        "discounts": discounts,
-                        "discount_desc": discount_desc,
-                        "residue": residue,
-                    })
+                    room_info.append(Room(
+                        group_id=room_physic_id,
+                        id=room_id,
+                        name=physic_item["room_name"],
+                        code=room_code,
+                        img=physic_item["picture_url"],
+                        bed=physic_item["bed_info"],
+                        size=physic_item["area_info"],
+                        people=physic_item["people_info"],
+                        breakfast=meal_title,
+                        cancel=cancel_title,
+                        old_price=old_price,
+                        price=price,
+                        discounts=tuple(discounts),
+                        discount_desc=discount_desc,
+                        residue=residue,
+                    ))
 
                 # 3️⃣ 解析费用对话框信息
                 total_price_info = safe_get(v, "totalPriceInfo")
@@ -154,7 +150,8 @@ def parse_hotel(file_path:str =None, json_content: Dict = None) -> Tuple[List[Di
                         promotion_dict=total_price_info,
                         old_price= old_price
                     )
-                    dialogs.append(dialog_info)
+                    if dialog_info:
+                        dialogs.append(dialog_info)
 
         return room_info, dialogs
 
@@ -172,7 +169,7 @@ def parse_hotel(file_path:str =None, json_content: Dict = None) -> Tuple[List[Di
 # 费用详情解析
 # ============================
 
-def parse_dialog(date_range: str, room_name: str, room_code: str, promotion_dict: Dict, old_price:str) -> Dict:
+def parse_dialog(date_range: str, room_name: str, room_code: str, promotion_dict: Dict, old_price:str) -> Optional[Dialog]:
     """解析促销价格明细"""
     try:
         quantity_days = safe_get(promotion_dict, "quantityDays", {})
@@ -183,25 +180,21 @@ def parse_dialog(date_range: str, room_name: str, room_code: str, promotion_dict
         for item in safe_get(promotion_dict, "promotionItems", []):
             title = safe_get(item, "title", "")
             amount = safe_float(safe_get(item, "amount"))
-            discounts.append({
-                "name": title,
-                "amount": amount,
-                "desc": title,
-            })
-
-        return {
-            "title": "费用明细",
-            "date_range": date_range,
-            "room_name": room_name,
-            "room_code": room_code,
-            "fee": fee,
-            "discount_total": discount_total,
-            "discounts": discounts,
-        }
+            discounts.append(Discount(name=title, amount=amount, desc=title))
+
+        return Dialog(
+            title="费用明细",
+            date_range=date_range,
+            room_name=room_name,
+            room_code=room_code,
+            fee=fee,
+            discount_total=discount_total,
+            discounts=tuple(discounts),
+        )
 
     except Exception as e:
         print(f"⚠️ 解析费用信息时出错 ({room_name}): {e}")
-        return {}
+        return None
 
 
 # ============================
@@ -209,8 +202,8 @@ def parse_dialog(date_range: str, room_name: str, room_code: str, promotion_dict
 # ============================
 
 if __name__ == "__main__":
-    hotel, dialogs = parse_room(r"C:\Users\95826\Documents\携程项目\json\hotel_detail.json")
+    hotel, dialogs = parse_hotel(r"C:\Users\95826\Documents\携程项目\json\hotel_detail.json")
 
     print(f"✅ 成功解析 {len(hotel)} 个房型，{len(dialogs)} 条费用详情")
-    print(json.dumps(hotel[:1], ensure_ascii=False, indent=2))
-    print(json.dumps(dialogs[:1], ensure_ascii=False, indent=2))
+    print(json.dumps([r.to_dict() for r in hotel[:1]], ensure_ascii=False, indent=2))
+    print(json.dumps([d.to_dict() for d in dialogs[:1]], ensure_ascii=False, indent=2))
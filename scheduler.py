@@ -5,20 +5,27 @@ import random
 import re
 import threading
 import time
-import uuid
-from typing import Dict, List
-from urllib.parse import quote
+from typing import Any, Callable, Dict, List
 
 import redis
-import requests
 import concurrent.futures
 from bricks.db.redis_ import Redis
 from loguru import logger
 from urllib3.exceptions import RequestError
 
+from config import settings
 from db.mongo import MongoClientSingleton
-from parse_detail import parse_room
+from parse_detail import RoomIndex, parse_room
 from utils.date_switch import parse_checkin_checkout
+from utils import json_codec
+from utils.bookkeeping import get_bookkeeper
+from utils.oss_uploader import get_oss_uploader
+from utils.platform_client import get_platform_client
+from utils.response_codec import decode_response
+from utils.response_validator import Verdict, validate_response
+from utils.result_channel import ResultChannel
+from utils.room_screenshot import RenderJob, RoomScreenshotter
+from utils.task_queue import TaskQueue, task_identifier
 from utils.task_platform_login import rsa_encrypt_base64
 
 # Redis 连接配置
@@ -103,6 +110,7 @@ class CookieManager:
 class Scheduler:
     """
     单用户任务是串行的，也就是说单个用户只有执行完第一个任务才能接收下一个
+    （流水线模式下只有领取 / 提交串行，提交后的收尾记录与下一个任务并行，见 run）
     """
 
     def __init__(self, username: str, password: str):
@@ -112,10 +120,22 @@ class Scheduler:
         self.cm = CookieManager()
         self.token = None
         self.cookie_col = "cookie_use_log"
+        self.task_queues: Dict[str, TaskQueue] = {}
 
         # ✅ 初始化 MongoDB
         self.redis = Redis()
         self.mongo = MongoClientSingleton(db_name="ctrip")
+        # 爬虫完成通知，替代固定间隔轮询 Mongo
+        self.result_channel = ResultChannel(redis_host=REDIS_HOST, redis_port=REDIS_PORT, redis_db=REDIS_DB)
+        # 截图 page 从进程内共享的浏览器池借用，不再每个任务启动一次浏览器
+        self.screenshotter = RoomScreenshotter()
+        # 截图上传：共享连接池 + 有界线程池并发上传，已上传过的缓存截图直接复用 OSS key
+        self.oss_uploader = get_oss_uploader()
+        # 任务平台接口：共享 keep-alive 连接池，按接口超时 / 重试，并统计耗时和错误
+        self.platform = get_platform_client()
+        # 收尾记录（task_log、cookie 统计、OSS key 登记），流水线模式下在后台执行
+        self.bookkeeper = get_bookkeeper()
+        self.pipelined = settings.SCHEDULER_PIPELINE
 
         # 添加线程锁确保单个账号串行执行
         self.lock = threading.Lock()
@@ -124,8 +144,6 @@ class Scheduler:
 
     def login(self):
         # 登录接口地址（换成你实际的平台登录接口）
-        api = "http://47.101.140.209/crowd/task/login"
-
         body = rsa_encrypt_base64(f"{self.username}_{self.password}")
 
         # 可选请求头（根据平台要求修改）
@@ -135,7 +153,7 @@ class Scheduler:
         }
 
         # 发送请求
-        response = requests.post(api, body, headers=headers)
+        response = self.platform.post("login", data=body, headers=headers)
 
         # 解析响应
         try:
@@ -153,13 +171,12 @@ class Scheduler:
             logger.error(f"❌ 登录异常: {e}")
 
     def get_tasks(self):
-        api = "http://47.101.140.209/crowd/task/listTask"
         if self.token:
             params = {
                 "token": self.token,
             }
             try:
-                response = requests.get(api, params)
+                response = self.platform.get("listTask", params=params)
                 raw_task = response.json()
                 tasks = self.task_filter(raw_task)
                 return tasks
@@ -190,8 +207,6 @@ class Scheduler:
         :return:
         """
         result = []
-        api = "http://47.101.140.209/crowd/task/queryClaimRecordList"
-
         params = {
             "type": "today",
             "claimStatus": "CLAIMED",
@@ -201,7 +216,7 @@ class Scheduler:
         }
 
         try:
-            response = requests.get(api, params)
+            response = self.platform.get("queryClaimRecordList", params=params)
             if all([
                 response.status_code == 200,
                 response.json()["code"] == 200,
@@ -270,16 +285,16 @@ class Scheduler:
         city, hotel_name, check_in, check_out, claim_id = "", "", "", "", ""
         room_info = []
         if original_task_info.get("running_task") == 1:
-            api = "http://47.101.140.209/crowd/task/queryClaimTemplateTask"
+            endpoint = "queryClaimTemplateTask"
         else:
-            api = "http://47.101.140.209/crowd/task/claimTemplateTask"
+            endpoint = "claimTemplateTask"
 
         params = {
             "taskSetId": original_task_info["task_id"],
             "token": self.token,
         }
         try:
-            response = requests.get(api, params)
+            response = self.platform.get(endpoint, params=params)
             if all([
                 response.status_code == 200,
                 response.json()["code"] == 200,
@@ -334,9 +349,15 @@ class Scheduler:
             "room_info": room_info,
         }
 
-    def add_task_to_redis(self,queue_name, task_info: Dict):
-        """保存 cookies 到 Redis 哈希表，field 为手机号"""
-        self.redis.sadd(queue_name, json.dumps(task_info))
+    def add_task_to_redis(self, queue_name: str, task_info: Dict):
+        """添加任务到 Redis 可靠队列，按任务标识去重"""
+        queue = self.task_queues.get(queue_name)
+        if queue is None:
+            queue = self.task_queues[queue_name] = TaskQueue(queue_name)
+
+        task_id = task_identifier(task_info, task_info["task_type"])
+        if not queue.push(task_id, task_info):
+            logger.info(f"任务 {task_id} 已在 {queue_name} 中排队或处理中，不重复投放")
         logger.info(f"✅ 已将 任务 {task_info} 写入 Redis 队列，类型为 = {task_info['task_type']}")
 
     def send_task(self, task_info: Dict):
@@ -363,6 +384,7 @@ class Scheduler:
             # 推送任务
             cookie = self.cm.get_valid_cookie()  # 从 cookie 池中获取一个可用 cookie
             task_info["cookie"] = cookie
+            self.result_channel.reset(collection, task_info)
             self.add_task_to_redis(queue_name, task_info)
             logger.info(f"✅ 投放任务到 {queue_name}，使用 cookie: {cookie[:20]}...")
 
@@ -376,13 +398,15 @@ class Scheduler:
 
         while True:
             # 检查是否超时
-            if time.time() - start_time > timeout:
+            remaining = timeout - (time.time() - start_time)
+            if remaining <= 0:
                 raise TimeoutError("获取任务结果超时，已超过2分钟")
 
+            # 阻塞等待爬虫完成通知，收到通知或等待超时后查询一次 Mongo（通知丢失时的兜底）
+            self.result_channel.wait(collection, task_info, timeout=min(remaining, settings.RESULT_NOTIFY_WAIT))
             result = self.get_task_result(task_info, collection)
             if result:
                 break
-            time.sleep(5)
 
         # 检查响应是否正常
         is_success, result = self.handle_task_result(result, task_info["task_type"], collection, task_info, cookie=cookie)
@@ -391,11 +415,12 @@ class Scheduler:
 
         # 需要根据给过来的图片链接提交
 
-    def screenshot(self, task_info: dict, response: dict = None):
-        """生成渲染数据并调用 Flask 接口渲染 + Playwright 截图"""
+    def screenshot(self, task_info: dict, response: dict = None, on_image: Callable[[str], Any] = None):
+        """
+        生成渲染数据并渲染房型页，page 从共享浏览器池借用后截图
 
-        import os, requests
-        from playwright.sync_api import sync_playwright
+        :param on_image: 每张截图写入后立即回调，传入 UploadBatch.submit 即可边截图边上传
+        """
 
         hotel_name = task_info["hotel_name"]
         check_in = task_info["check_in"]
@@ -404,6 +429,7 @@ class Scheduler:
 
         # 房型数据
         rooms, dialogs = parse_room(json_content=response)
+        room_index = RoomIndex(rooms, dialogs)
         room_info_list = task_info.get("room_info", [])
 
         # 初始化路径
@@ -415,168 +441,75 @@ class Scheduler:
         for room_item in room_info_list:
             room_item["screenshots"] = []
 
-        flask_render_room_url = "http://127.0.0.1:5000/render_room"
+        # === 处理房型列表页 ===
+        list_page_item = next((i for i in room_info_list if i["title"] == "列表页信息"), None)
+        if not list_page_item:
+            raise ValueError("房型列表页信息缺失")
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)
-            context = browser.new_context(**p.devices["iPhone X"])
-            page = context.new_page()
-
-            self.patch_page_rendering(page)
-
-            # === 处理房型列表页 ===
-            list_page_item = next((i for i in room_info_list if i["title"] == "列表页信息"), None)
-            if not list_page_item:
-                raise ValueError("房型列表页信息缺失")
-
-            # 遍历每个房型（非列表页）
-            for room_item in room_info_list:
-                title = room_item["title"].strip()
-
-                if title == "列表页信息":
-                    continue
-
-                logger.info(f"📸 开始处理房型：{title}")
-
-                # 匹配房型数据
-                target_rooms = [r for r in rooms if title == (r.get("name") or "")]
-                if not target_rooms:
-                    logger.warning(f"⚠ 未匹配到房型：{title}")
-                    continue
-
-                # 计算每种早餐的最低价 variant
-                breakfast_map = self.compute_breakfast_lowest_variant(target_rooms)
-
-                # 匹配对应弹窗
-                matched_dialogs = [
-                    d for d in dialogs
-                    if d.get("room_code") and any(v.get("code") == d.get("room_code") for v in breakfast_map.values())
-                ]
-
-                # 构建渲染 payload
-                payload = {
-                    "hotel_name": hotel_name,
-                    "checkin_date": date_dict["checkin_date"],
-                    "checkin_day": date_dict["checkin_day"],
-                    "checkout_date": date_dict["checkout_date"],
-                    "checkout_day": date_dict["checkout_day"],
-                    "stay_night": 1,
-                    "rooms": list(breakfast_map.values()),
-                    "dialog": matched_dialogs
-                }
-
-                # 调用 Flask
-                resp = requests.post(flask_render_room_url, json=payload)
-                if resp.status_code != 200:
-                    logger.error("❌ 渲染失败")
-                    continue
-
-                # 页面加载
-                page.set_content(resp.text, wait_until="networkidle")
-                page.wait_for_timeout(500)
+        # 遍历每个房型（非列表页），先准备好渲染数据，再统一渲染、借用 page 截图
+        jobs = []
+        for room_item in room_info_list:
+            title = room_item["title"].strip()
+
+            if title == "列表页信息":
+                continue
+
+            logger.info(f"📸 开始处理房型：{title}")
+
+            # 匹配房型数据
+            target_rooms = room_index.by_name(title)
+            if not target_rooms:
+                logger.warning(f"⚠ 未匹配到房型：{title}")
+                continue
+
+            # 计算每种早餐的最低价 variant
+            breakfast_map = self.compute_breakfast_lowest_variant(target_rooms)
+
+            # 匹配对应弹窗
+            matched_dialogs = room_index.dialogs_for(v.code for v in breakfast_map.values())
+
+            # 构建渲染 payload（记录在这里转成 dict）
+            payload = {
+                "hotel_name": hotel_name,
+                "checkin_date": date_dict["checkin_date"],
+                "checkin_day": date_dict["checkin_day"],
+                "checkout_date": date_dict["checkout_date"],
+                "checkout_day": date_dict["checkout_day"],
+                "stay_night": 1,
+                "rooms": [v.to_dict() for v in breakfast_map.values()],
+                "dialog": [d.to_dict() for d in matched_dialogs]
+            }
 
-                # ✔ 截图列表页
-                list_img = self.capture_room_list_item(page, title, out_dir)
-                list_page_item["screenshots"].append(list_img)
+            # 渲染（默认进程内模板渲染）与截图缓存都在 RoomScreenshotter 中处理
+            jobs.append((room_item, RenderJob(title, [v.code for v in breakfast_map.values()], payload=payload)))
 
-                # ✔ 截图每种早餐对应弹窗
-                for b_type, variant in breakfast_map.items():
-                    variant_code = variant.get("code")
-                    dialog_img = self.capture_dialog(page, variant_code, out_dir)
-                    if dialog_img:
-                        room_item["screenshots"].append(dialog_img)
+        self.screenshotter.capture([job for _, job in jobs], out_dir, on_image=on_image)
 
-            browser.close()
+        for room_item, job in jobs:
+            # ✔ 列表页截图
+            if job.list_image:
+                list_page_item["screenshots"].append(job.list_image)
+            # ✔ 每种早餐对应弹窗截图
+            room_item["screenshots"].extend(job.dialog_images)
 
         return room_info_list
 
-    def patch_page_rendering(self, page):
-        page.evaluate("""
-            () => {
-                document.body.style.overflow = 'hidden';
-                document.body.style.webkitFontSmoothing = 'antialiased';
-                document.body.style.mozOsxFontSmoothing = 'grayscale';
-                document.body.style.textRendering = 'optimizeLegibility';
-            }
-        """)
-        page.add_style_tag(content="""
-            * {
-                image-rendering: crisp-edges !important;
-                text-rendering: optimizeLegibility !important;
-                -webkit-font-smoothing: antialiased !important;
-            }
-        """)
-
-    def capture_room_list_item(self, page, title, out_dir):
-        safe_title = title.replace("/", "_").replace(" ", "")
-        img_path = os.path.join(out_dir, f"{uuid.uuid4().hex}_list.png")
-        page.screenshot(path=img_path)
-        logger.info(f"✔ 列表页截图完成: {img_path}")
-        return img_path
-
     def compute_breakfast_lowest_variant(self, rooms):
         breakfast_types = ["无早餐", "1份早餐", "2份早餐"]
 
         result = {}
         for room in rooms:
-            bf_raw = room.get("breakfast", "") or ""
+            bf_raw = room.breakfast or ""
 
             matched = next((b for b in breakfast_types if b in bf_raw), "无早餐")
 
-            price = float(room.get("price", 1e9) or 1e9)
+            price = float(room.price or 1e9)
 
-            if matched not in result or price < float(result[matched].get("price", 1e9)):
+            if matched not in result or price < float(result[matched].price or 1e9):
                 result[matched] = room
 
         return result
 
-    def capture_dialog(self, page, variant_code, out_dir):
-        dialog_id = f"dialog-{variant_code}"
-        btn_selector = f'.open-discount-btn[data-dialog-id="{dialog_id}"]'
-        btn = page.query_selector(btn_selector)
-
-        if not btn:
-            logger.warning(f"⚠ 未找到弹窗按钮: {btn_selector}")
-            return None
-
-        try:
-            btn.scroll_into_view_if_needed()
-            page.wait_for_timeout(200)
-            btn.click()
-            page.wait_for_timeout(600)
-
-            img_path = os.path.join(out_dir, f"{uuid.uuid4().hex}_dialog.png")
-            page.screenshot(path=img_path)
-            logger.info(f"✔ 弹窗截图成功: {img_path}")
-
-            self.safe_close_dialog(page, variant_code)
-            return img_path
-
-        except Exception as e:
-            logger.error(f"❌ 弹窗截图失败: {e}")
-            return None
-
-    def safe_close_dialog(self, page, variant_code):
-        dialog_id = f"dialog-{variant_code}"
-        close_selector = f'.close[data-dialog-id="{dialog_id}"]'
-
-        try:
-            btn = page.query_selector(close_selector)
-            if btn:
-                btn.scroll_into_view_if_needed()
-                btn.click()
-            else:
-                mask = page.query_selector(f"#mask-{variant_code}")
-                if mask:
-                    mask.click()
-                else:
-                    page.mouse.click(10, 10)
-
-            page.wait_for_timeout(200)
-        except:
-            page.mouse.click(10, 10)
-
-
     def get_task_result(self, task_info: Dict, collection: str, timeout: int = 120):
         """
         根据任务信息轮询 MongoDB 或 Redis 获取结果
@@ -593,7 +526,7 @@ class Scheduler:
 
         result = self.mongo.find_one(collection, query=query)
         if result:
-            response = json.loads(result.get("response"))
+            response = decode_response(result)
 
         return response
 
@@ -627,73 +560,35 @@ class Scheduler:
         # -------------------------
         # 写入 / 更新 Mongo 记录
         # -------------------------
-        record = self.mongo.find_one(self.cookie_col, {"phone": phone})
-
-        if record:
-            # 已存在记录 → 更新
-            if cookie_error == 0:  # success
-                new_success = record.get("success_count", 0) + 1
-                self.mongo.update(
-                    self.cookie_col,
-                    {"$set": {
-                        "cookie": cookie,
-                        "status": "success",
-                        "success_count": new_success
-                    }},
-                    {"phone": phone},
-
-                )
-            else:  # failed
-                self.mongo.update(
-                    self.cookie_col,
-                    {"$set": {
-                        "cookie": cookie,
-                        "status": "failed"
-                    }},
-                    {"phone": phone},
-
-                )
-
-        else:
-            # 不存在 → 新增
-            doc = {
-                "phone": phone,
-                "cookie": cookie,
-                "status": "success" if cookie_error == 0 else "failed",
-                "success_count": 1 if cookie_error == 0 else 0
-            }
-            self.mongo.insert_one(self.cookie_col, doc)
-
+        # 单条原子 upsert：流水线模式下多个后台线程可能同时统计同一手机号，读后写会丢失计数
+        success = cookie_error == 0
+        self.mongo.update_row(
+            self.cookie_col,
+            query={"phone": phone},
+            update={
+                "$inc": {"success_count": 1 if success else 0},
+                "$set": {"cookie": cookie, "status": "success" if success else "failed"},
+                "$setOnInsert": {"phone": phone},
+            },
+            upsert=True,
+        )
 
     def handle_task_result(self, result: dict, task_type: str, collection: str, task_info, cookie: str = None):
         cookie_error = 0
-        result_str = json.dumps(result)
+        verdict = validate_response(result, task_type)
 
-        if result.get('msg') =="搜索不到酒店":
+        if verdict is Verdict.HOTEL_NOT_FOUND:
             return True, result
-        if "priceInfo" in result_str:
-            if task_type == "XC_ROOM_DETAIL_RP_PIC_DISCOUNT":
-                if "totalPriceInfo" in result_str:
-                    logger.info("✅ cookie 正常，任务处理完成。")
-                    if cookie:
-                        self.stat_cookie(cookie, cookie_error)
-                    return True, result
-                else:
-                    cookie_error = 1
-            else:
-                if "tipAfterPrice" in result_str:
-                    logger.info("✅ cookie 正常，任务处理完成。")
-                    if cookie:
-                        self.stat_cookie(cookie, cookie_error)
-                    return True, result
-                else:
-                    cookie_error = 1
-        else:
-            cookie_error = 1
+        if verdict.ok:
+            logger.info(f"✅ cookie 正常，任务处理完成。({verdict.value})")
+            if cookie:
+                self.record(self.stat_cookie, cookie, cookie_error)
+            return True, result
+        cookie_error = 1
 
         # ❌ 任务失败：记录失败
         if cookie:
-            self.stat_cookie(cookie, cookie_error)
+            self.record(self.stat_cookie, cookie, cookie_error)
 
 
         if cookie_error and cookie:
@@ -709,69 +604,6 @@ class Scheduler:
             self.cm.remove_invalid_cookie(cookie)
         return False, result
 
-    # ===== 第一步：请求 OSS 上传所需参数 =====
-    def get_oss_upload_info(self, token, file_name):
-        url = "http://47.101.140.209/crowd/task/getOssKey?token=" + token
-        headers = {
-            "Accept": "*/*",
-            "Content-Type": "application/json",
-            "Origin": "http://47.101.140.209",
-            "Referer": "http://47.101.140.209/crowd.html",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
-        }
-        cookies = {"crowd-code": "759528"}
-        payload = {
-            "bizType": "HOTEL",
-            "fileName": file_name,
-            "token": token
-        }
-        while True:
-            try:
-                resp = requests.post(url, headers=headers, json=payload, cookies=cookies, verify=False)
-                resp.raise_for_status()
-                if resp.json() and resp.json()["msg"] == '正常返回':
-                    data = resp.json()["data"]
-                    logger.info("✅ 获取 OSS 上传参数成功")
-                    return data
-            except Exception as e:
-                logger.warning(f"图片上传出现问题，错误原因{e}")
-                time.sleep(2)
-
-
-    # ===== 第二步：使用返回参数上传文件到 OSS =====
-    def upload_to_oss(self, file_path, oss_info):
-        url = f"https://{oss_info['url']}/"
-
-        data = {
-            "accessId": oss_info["accessId"],
-            "ossKey": oss_info["ossKey"],
-            "signature": oss_info["signature"],
-            "expiration": oss_info["expiration"],
-            "uuid": oss_info["uuid"],
-            "policy": oss_info["policy"],
-            "OSSAccessKeyId": oss_info["accessId"],
-            "key": oss_info["ossKey"]
-        }
-
-        files = {
-            "file": (file_path.split("/")[-1], open(file_path, "rb"), "image/png")
-        }
-
-        logger.info("📤 正在上传文件到 OSS ...")
-        while True:
-            try:
-                resp = requests.post(url, data=data, files=files)
-                resp.raise_for_status()
-                break
-            except Exception as e:
-                logger.warning("上传文件到 OSS，错误原因{e}, 继续重试")
-                time.sleep(2)
-
-        if resp.status_code == 204:
-            logger.info ("✅ 上传成功（OSS 无返回体）")
-        else:
-            logger.info("✅ 上传成功，响应：", resp.text)
-
     def submit_template_task(self, task_info, token, submit_task_map, claim_id, do_submit=True):
         """
         提交模板任务
@@ -791,7 +623,6 @@ class Scheduler:
         Returns:
             dict: 服务器响应数据
         """
-        url = "http://47.101.140.209/crowd/task/submitTemplateTask?token=" + token
         headers = {
           'Accept': '*/*',
           'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
@@ -807,14 +638,15 @@ class Scheduler:
         payload = {
             "claimId": claim_id,
             "giveUpTaskMap": "{}",
-            "submitTaskMap": json.dumps(submit_task_map, ensure_ascii=False),
+            "submitTaskMap": json_codec.dumps(submit_task_map),
             "doSubmit": do_submit,
             "token": token
         }
 
         # 发送请求
-        resp = requests.post(
-            url,
+        resp = self.platform.post(
+            "submitTemplateTask",
+            params={"token": token},
             headers=headers,
             json=payload,
             verify=False
@@ -826,12 +658,12 @@ class Scheduler:
         # logger.info(response_data)
         if response_data and response_data.get("msg") == '未识别到匹配房型，请重试！':
             result = "Failure"
-            self.mongo.write("task_log", {
+            self.record(self.mongo.write, "task_log", {
                 "hotel_name": task_info["hotel_name"],
                 "check_in": task_info["check_in"],
                 "check_out": task_info["check_out"],
                 "status": result,
-                "response": json.dumps(response_data)
+                "response": json_codec.dumps(response_data)
             })
             logger.warning("✅ 模板任务提交失败， 取消任务")
             self.cancel_task(token, claim_id)
@@ -841,12 +673,12 @@ class Scheduler:
             return self.submit_template_task(task_info, self.token, submit_task_map, claim_id)
         elif response_data and response_data.get("msg") == "正常返回":
             result = "Success"
-            self.mongo.write("task_log", {
+            self.record(self.mongo.write, "task_log", {
                 "hotel_name": task_info["hotel_name"],
                 "check_in": task_info["check_in"],
                 "check_out": task_info["check_out"],
                 "status": result,
-                "response": json.dumps(response_data)
+                "response": json_codec.dumps(response_data)
             })
             logger.info(f"》》》》》step6. {task_info['hotel_name']} 任务提交成功\n\n")
             return response_data
@@ -877,11 +709,6 @@ class Scheduler:
         Returns:
             dict: 服务器响应数据
         """
-        # URL编码取消原因
-        encoded_reason = quote(reason_type, encoding='utf-8')
-
-        url = f"http://47.101.140.209/crowd/task/cancelTask?claimId={claim_id}&reasonType={encoded_reason}&token={token}"
-
         headers = {
           'Accept': '*/*',
           'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
@@ -892,8 +719,9 @@ class Scheduler:
         }
 
         # 发送GET请求
-        resp = requests.get(
-            url,
+        resp = self.platform.get(
+            "cancelTask",
+            params={"claimId": claim_id, "reasonType": reason_type, "token": token},
             headers=headers,
             verify=False
         )
@@ -908,8 +736,22 @@ class Scheduler:
             error_msg = response_data.get("msg", "未知错误")
             raise Exception(f"任务取消失败: {error_msg}")
 
-    def run(self):
-        """单账号运行逻辑"""
+    def record(self, func: Callable, *args):
+        """收尾记录：流水线模式下交给后台执行，不阻塞领取下一个任务"""
+        if self.pipelined:
+            self.bookkeeper.defer(func, *args)
+        else:
+            func(*args)
+
+    def run(self, pipelined: bool = None):
+        """单账号运行逻辑
+
+        :param pipelined: 流水线模式，默认取 SCHEDULER_PIPELINE。平台限制一个账号同时只能持有一个任务，
+                          领取 / 提交仍然严格串行；提交后的收尾记录交给后台执行，立即领取下一个任务，
+                          记录写入与下一个任务的爬虫抓取重叠
+        """
+        if pipelined is not None:
+            self.pipelined = pipelined
         with self.lock:  # 确保单个账号串行执行
             # 1.登录任务平台
             self.login()
@@ -954,35 +796,19 @@ class Scheduler:
                     else:
                         time.sleep(5)
 
-                if "搜索不到酒店" in json.dumps(response):
+                if validate_response(response, task_info["task_type"]) is Verdict.HOTEL_NOT_FOUND:
                     self.cancel_task(self.token, claim_id)
                 else:
                     logger.info(f"[{self.username}] 》》》》》step3. {task_info['hotel_name']} 数据请求成功\n\n")
-                    # 6. 生成各房型对应图片
-                    room_info = self.screenshot(task_info, response)
+                    # 6. 生成各房型对应图片，每张截图写入后立即进入上传队列
+                    upload_batch = self.oss_uploader.batch(self.token)
+                    room_info = self.screenshot(task_info, response, on_image=upload_batch.submit)
 
                     logger.info(f"[{self.username}] 》》》》》step4. {task_info['hotel_name']} 截图成功\n\n")
 
-                    # 7.图片上传
-                    submit_map = {}
-                    for item in room_info:
-                        key = item["key"]
-                        image_paths = item["screenshots"]
-
-                        submit_map[key] = []
-
-                        for img_path in image_paths:
-                            file_name = os.path.basename(img_path)
-
-                            # 步骤1：获取 OSS 上传参数
-                            oss_info = self.get_oss_upload_info(self.token, file_name)
-                            oss_key = oss_info["ossKey"]
-
-                            # 步骤2：上传到 OSS
-                            self.upload_to_oss(img_path, oss_info)
-                            submit_map[key].append(oss_key)
-
-                            time.sleep(0.5)  # 防止接口过快
+                    # 7.等待图片上传完成（大部分已在截图期间上传）
+                    submit_map = upload_batch.collect(room_info, record_keys=False)
+                    self.record(upload_batch.record_oss_keys, room_info, submit_map)
                     logger.info(f"[{self.username}] 》》》》》step5. {task_info['hotel_name']} 图片上传成功\n\n")
                     # 8.提交任务
                     self.submit_template_task(task_info, self.token, submit_map, claim_id)
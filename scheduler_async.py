@@ -0,0 +1,273 @@
+import asyncio
+import concurrent.futures
+import time
+from collections import Counter
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from config import settings
+from scheduler_auto import MAX_RETRIES, TASK_RESULT_TIMEOUT, SchedulerAuto
+from utils.oss_uploader import UploadBatch
+from utils.result_channel import AsyncResultChannel
+
+
+class AccountState(str, Enum):
+    LOGIN = "login"
+    CLAIM = "claim"
+    DISPATCH = "dispatch"
+    AWAIT_RESULT = "await_result"
+    RENDER = "render"
+    UPLOAD = "upload"
+    SUBMIT = "submit"
+    CANCEL = "cancel"
+    STOPPED = "stopped"
+
+
+class AccountWorker:
+    """
+    单个账号的协程状态机：登录 → 领取 → 投放 → 等待结果 → 截图 → 上传 → 提交
+
+    每个状态对应一个处理协程，返回下一个状态；当前任务的上下文（task_info、结果、上传批次等）保存在实例上。
+    平台接口、Mongo 查询等短暂的阻塞调用放到共享 IO 线程池执行，
+    等待爬虫结果（异步 BLPOP）、空闲休眠、截图和上传都在事件循环中等待，不占用线程。
+
+    业务逻辑（任务过滤、结果校验、提交 / 取消）全部复用 SchedulerAuto 的方法，与线程版保持一致。
+    """
+
+    def __init__(self, scheduler: SchedulerAuto, channel: AsyncResultChannel):
+        self.scheduler = scheduler
+        self.channel = channel
+        self.state = AccountState.LOGIN
+        self.state_since = time.time()
+        self.stopping = False
+        self._handlers = {
+            AccountState.LOGIN: self.on_login,
+            AccountState.CLAIM: self.on_claim,
+            AccountState.DISPATCH: self.on_dispatch,
+            AccountState.AWAIT_RESULT: self.on_await_result,
+            AccountState.RENDER: self.on_render,
+            AccountState.UPLOAD: self.on_upload,
+            AccountState.SUBMIT: self.on_submit,
+            AccountState.CANCEL: self.on_cancel,
+        }
+        self._reset_task()
+
+    @property
+    def username(self) -> str:
+        return self.scheduler.username
+
+    def _reset_task(self):
+        self.task_info: Dict[str, Any] = {}
+        self.collection: Optional[str] = None
+        self.response: Optional[Dict] = None
+        self.deadline = 0.0
+        self.retry_count = 0
+        self.upload_batch: Optional[UploadBatch] = None
+        self.room_info: List[Dict] = []
+        self.submit_map: Dict[str, List[str]] = {}
+        self.cancel_reason = ""
+
+    async def run(self):
+        while not self.stopping:
+            handler = self._handlers[self.state]
+            try:
+                next_state = await handler()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                next_state = await self.on_error(e)
+            if next_state is not self.state:
+                self.state, self.state_since = next_state, time.time()
+        self.state = AccountState.STOPPED
+
+    @staticmethod
+    async def _call(func, *args):
+        """在共享 IO 线程池中执行阻塞调用"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    # ---------------- 状态处理 ----------------
+
+    async def on_login(self) -> AccountState:
+        await self._call(self.scheduler.login)
+        if not self.scheduler.token:
+            await asyncio.sleep(settings.ACCOUNT_RESTART_DELAY)
+            return AccountState.LOGIN
+        return AccountState.CLAIM
+
+    async def on_claim(self) -> AccountState:
+        self._reset_task()
+        s = self.scheduler
+        tasks = await self._call(s.get_running_task) or await self._call(s.get_tasks)
+
+        # 一次只能接一个任务
+        for task in tasks:
+            self.task_info = await self._call(s.task_fetcher, task)
+            if self.task_info:
+                break
+
+        if not self.task_info:
+            logger.info(f"[{self.username}] 当前无可用任务，休眠{settings.ACCOUNT_IDLE_DELAY}s")
+            await asyncio.sleep(settings.ACCOUNT_IDLE_DELAY)
+            return AccountState.CLAIM
+        if not self.task_info["hotel_name"]:
+            return AccountState.CLAIM
+
+        logger.info(f"[{self.username}] 》》》》》step2. 酒店：{self.task_info['hotel_name']}开始运行\n\n")
+        return AccountState.DISPATCH
+
+    async def on_dispatch(self) -> AccountState:
+        self.collection, result = await self._call(self.scheduler.dispatch_task, self.task_info)
+        if result:
+            return await self._evaluate(result)
+        self.deadline = time.time() + TASK_RESULT_TIMEOUT
+        return AccountState.AWAIT_RESULT
+
+    async def on_await_result(self) -> AccountState:
+        remaining = self.deadline - time.time()
+        if remaining <= 0:
+            logger.warning(f"❌ 获取任务结果超时")
+            return await self._evaluate({"error": "timeout", "msg": "任务响应超时", "need_cancel": False})
+
+        # 收到通知或等待超时后查询一次 Mongo（通知丢失时的兜底）
+        await self.channel.wait(self.collection, self.task_info, timeout=min(remaining, settings.RESULT_NOTIFY_WAIT))
+        result = await self._call(self.scheduler.check_task_result, self.task_info, self.collection)
+        if result:
+            return await self._evaluate(result)
+        return AccountState.AWAIT_RESULT
+
+    async def _evaluate(self, response: Dict) -> AccountState:
+        """与 SchedulerAuto.run 相同的判定：305 取消、有效数据截图、其余重试，重试用尽取消"""
+        hotel_name = self.task_info["hotel_name"]
+        if response.get("code") == 305:
+            logger.warning(f"❌ 酒店：{hotel_name} 遇到305错误，取消任务")
+            self.cancel_reason = "携程服务器异常"
+            return AccountState.CANCEL
+
+        if self.scheduler.is_valid_response(response, self.task_info["task_type"]):
+            logger.info(f"✅ 第{self.retry_count + 1}次尝试成功获取有效数据")
+            self.response = response
+            return AccountState.RENDER
+
+        self.retry_count += 1
+        if self.retry_count >= MAX_RETRIES:
+            logger.warning(f"❌ 酒店：{hotel_name}重试{MAX_RETRIES}次均失败，取消任务")
+            self.cancel_reason = "数据获取失败"
+            return AccountState.CANCEL
+        logger.info(f"[{self.username}] 》》》》》 酒店：{hotel_name}重试第{self.retry_count}次\n\n")
+        await asyncio.sleep(settings.ACCOUNT_RETRY_DELAY)
+        return AccountState.DISPATCH
+
+    async def on_render(self) -> AccountState:
+        s = self.scheduler
+        hotel_name = self.task_info["hotel_name"]
+        logger.info(f"[{self.username}] 》》》》》step3. {hotel_name} 数据请求成功\n\n")
+
+        # 每张截图写入后立即进入上传队列
+        self.upload_batch = s.oss_uploader.batch(s.token)
+        room_info_list, jobs, out_dir = await self._call(s.build_render_jobs, self.task_info, self.response)
+        await s.screenshotter.capture_from_loop([job for _, job in jobs], out_dir, on_image=self.upload_batch.submit)
+        self.room_info = s.attach_screenshots(room_info_list, jobs)
+        logger.info(f"[{self.username}] 》》》》》step4. {hotel_name} 截图成功\n\n")
+        return AccountState.UPLOAD
+
+    async def on_upload(self) -> AccountState:
+        self.submit_map = await self.upload_batch.collect_async(self.room_info)
+        logger.info(f"[{self.username}] 》》》》》step5. {self.task_info['hotel_name']} 图片上传成功\n\n")
+        return AccountState.SUBMIT
+
+    async def on_submit(self) -> AccountState:
+        s = self.scheduler
+        await self._call(s.submit_template_task, self.task_info, s.token, self.submit_map, self.task_info["claim_id"])
+        logger.info(f"[{self.username}] " + "*" * 50)
+        return AccountState.CLAIM
+
+    async def on_cancel(self) -> AccountState:
+        s = self.scheduler
+        await self._call(s.cancel_task, s.token, self.task_info["claim_id"], self.cancel_reason)
+        logger.info(f"[{self.username}] " + "*" * 50)
+        return AccountState.CLAIM
+
+    async def on_error(self, error: Exception) -> AccountState:
+        """截图、上传、提交失败时取消任务；其余阶段失败等待后重新登录（同线程版的重启逻辑）"""
+        if self.state in (AccountState.RENDER, AccountState.UPLOAD, AccountState.SUBMIT):
+            logger.error(f"❌ 任务后续处理失败: {error}")
+            self.cancel_reason = "处理失败"
+            return AccountState.CANCEL
+
+        logger.error(f"账号 {self.username} 在 {self.state.value} 阶段执行异常，"
+                     f"{settings.ACCOUNT_RESTART_DELAY}秒后重启: {error}")
+        await asyncio.sleep(settings.ACCOUNT_RESTART_DELAY)
+        return AccountState.LOGIN
+
+
+class AsyncMultiAccountScheduler:
+    """
+    异步多账号调度器，替代每个账号一个线程的 MultiAccountScheduler.run_concurrent / run_continuous
+
+    所有账号的状态机运行在同一个事件循环中，线程只有：
+        - 共享 IO 线程池（ASYNC_SCHEDULER_IO_WORKERS），执行平台接口、Mongo 查询等短暂阻塞调用
+        - 浏览器池事件循环线程、OSS 上传线程池（进程内共享，与线程版相同）
+    等待爬虫结果用异步 BLPOP，空闲 / 重试等待用 asyncio.sleep，都不占用线程，单进程可以跑数百个账号。
+
+    使用示例：
+        # >>> schedulers = [SchedulerAuto(a["username"], a["password"]) for a in accounts]
+        # >>> AsyncMultiAccountScheduler(schedulers).run()
+    """
+
+    def __init__(self, schedulers: List[SchedulerAuto], io_workers: int = settings.ASYNC_SCHEDULER_IO_WORKERS):
+        self.schedulers = schedulers
+        self.io_workers = io_workers
+        self.workers: List[AccountWorker] = []
+
+    def run(self):
+        """阻塞运行，直到手动停止"""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logger.info("收到中断信号，停止所有账号")
+
+    async def run_async(self):
+        loop = asyncio.get_running_loop()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="account-io")
+        loop.set_default_executor(executor)
+
+        channel = AsyncResultChannel()
+        self.workers = [AccountWorker(scheduler, channel) for scheduler in self.schedulers]
+        logger.info(f"启动异步多账号调度，账号数: {len(self.workers)}，IO 线程数: {self.io_workers}")
+
+        tasks = []
+        for i, worker in enumerate(self.workers):
+            tasks.append(asyncio.create_task(self._start_worker(worker, i * settings.ACCOUNT_START_STAGGER),
+                                             name=f"account-{worker.username}"))
+        reporter = asyncio.create_task(self._report())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            reporter.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, reporter, return_exceptions=True)
+            await channel.redis.close()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    async def _start_worker(worker: AccountWorker, delay: float):
+        # 错开登录时间，避免数百个账号同时请求登录接口
+        await asyncio.sleep(delay)
+        await worker.run()
+
+    def stop(self):
+        """各账号在当前状态处理完成后停止"""
+        for worker in self.workers:
+            worker.stopping = True
+
+    def states(self) -> Dict[str, int]:
+        """各状态的账号数"""
+        return dict(Counter(worker.state.value for worker in self.workers))
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(settings.ASYNC_SCHEDULER_STATUS_INTERVAL)
+            logger.info(f"账号状态: {self.states()}")
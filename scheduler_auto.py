@@ -1,14 +1,10 @@
 import datetime
-import json
 import os
 import re
 import threading
 import time
-import uuid
-from typing import Dict, List
-from urllib.parse import quote
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-import requests
 import concurrent.futures
 
 from apscheduler.schedulers.blocking import BlockingScheduler
@@ -16,10 +12,20 @@ from apscheduler.triggers.cron import CronTrigger
 from bricks.db.redis_ import Redis
 from loguru import logger
 
+from config import settings
 from config.settings import REDIS_HOST
 from db.mongo import MongoClientSingleton
-from parse_detail import parse_room
+from parse_detail import RoomIndex, parse_room
 from utils.date_switch import parse_checkin_checkout
+from utils import json_codec
+from utils.bookkeeping import get_bookkeeper
+from utils.oss_uploader import UploadBatch, get_oss_uploader
+from utils.platform_client import get_platform_client
+from utils.response_codec import decode_response
+from utils.response_validator import Verdict, validate_response
+from utils.result_channel import ResultChannel
+from utils.room_screenshot import RenderJob, RoomScreenshotter
+from utils.task_queue import TaskQueue, task_identifier
 from utils.task_platform_login import rsa_encrypt_base64
 
 # =========================
@@ -27,11 +33,13 @@ from utils.task_platform_login import rsa_encrypt_base64
 # =========================
 REDIS_KEY = "ctrip_ck"
 MAX_RETRIES = 3
+TASK_RESULT_TIMEOUT = 240  # 单次投放等待爬虫结果的最长时间（秒）
 
 
 class SchedulerAuto:
     """
     单用户任务是串行的，也就是说单个用户只有执行完第一个任务才能接收下一个
+    （流水线模式下只有领取 / 提交串行，提交后的收尾记录与下一个任务并行，见 run）
     """
 
     def __init__(self, username: str, password: str):
@@ -43,6 +51,18 @@ class SchedulerAuto:
         # ✅ 初始化 MongoDB
         self.redis = Redis(host=REDIS_HOST)
         self.mongo = MongoClientSingleton(db_name="ctrip")
+        # 爬虫完成通知，替代固定间隔轮询 Mongo
+        self.result_channel = ResultChannel()
+        # 截图 page 从进程内共享的浏览器池借用，不再每个任务启动一次浏览器
+        self.screenshotter = RoomScreenshotter()
+        # 截图上传：共享连接池 + 有界线程池并发上传，已上传过的缓存截图直接复用 OSS key
+        self.oss_uploader = get_oss_uploader()
+        # 任务平台接口：共享 keep-alive 连接池，按接口超时 / 重试，并统计耗时和错误
+        self.platform = get_platform_client()
+        # 收尾记录（task_log、cookie 统计、OSS key 登记），流水线模式下在后台执行
+        self.bookkeeper = get_bookkeeper()
+        self.pipelined = settings.SCHEDULER_PIPELINE
+        self.task_queues: Dict[str, TaskQueue] = {}
 
         # 添加线程锁确保单个账号串行执行
         self.lock = threading.Lock()
@@ -51,8 +71,6 @@ class SchedulerAuto:
 
     def login(self):
         # 登录接口地址（换成你实际的平台登录接口）
-        api = "http://47.101.140.209/crowd/task/login"
-
         body = rsa_encrypt_base64(f"{self.username}_{self.password}")
 
         # 可选请求头（根据平台要求修改）
@@ -62,7 +80,7 @@ class SchedulerAuto:
         }
 
         # 发送请求
-        response = requests.post(api, body, headers=headers)
+        response = self.platform.post("login", data=body, headers=headers)
 
         # 解析响应
         try:
@@ -80,13 +98,12 @@ class SchedulerAuto:
             logger.error(f"❌ 登录异常: {e}")
 
     def get_tasks(self):
-        api = "http://47.101.140.209/crowd/task/listTask"
         if self.token:
             params = {
                 "token": self.token,
             }
             try:
-                response = requests.get(api, params)
+                response = self.platform.get("listTask", params=params)
                 raw_task = response.json()
                 tasks = self.task_filter(raw_task)
                 return tasks
@@ -117,8 +134,6 @@ class SchedulerAuto:
         :return:
         """
         result = []
-        api = "http://47.101.140.209/crowd/task/queryClaimRecordList"
-
         params = {
             "type": "today",
             "claimStatus": "CLAIMED",
@@ -128,7 +143,7 @@ class SchedulerAuto:
         }
 
         try:
-            response = requests.get(api, params)
+            response = self.platform.get("queryClaimRecordList", params=params)
             if all([
                 response.status_code == 200,
                 response.json()["code"] == 200,
@@ -197,16 +212,16 @@ class SchedulerAuto:
         city, hotel_name, check_in, check_out, claim_id = "", "", "", "", ""
         room_info = []
         if original_task_info.get("running_task") == 1:
-            api = "http://47.101.140.209/crowd/task/queryClaimTemplateTask"
+            endpoint = "queryClaimTemplateTask"
         else:
-            api = "http://47.101.140.209/crowd/task/claimTemplateTask"
+            endpoint = "claimTemplateTask"
 
         params = {
             "taskSetId": original_task_info["task_id"],
             "token": self.token,
         }
         try:
-            response = requests.get(api, params)
+            response = self.platform.get(endpoint, params=params)
             if all([
                 response.status_code == 200,
                 response.json()["code"] == 200,
@@ -263,14 +278,41 @@ class SchedulerAuto:
 
 
     def add_task_to_redis(self, queue_name: str, task_info: dict):
-        """添加任务到 Redis 队列，使用固定排序的 JSON"""
-        # 使用 sort_keys=True 确保字段按字母顺序排序
-        task_json = json.dumps(task_info, sort_keys=True, ensure_ascii=False)
-        self.redis.sadd(queue_name, task_json)
-        logger.info(f"任务已添加到 {queue_name}: {task_info}")
+        """添加任务到 Redis 可靠队列，按任务标识去重"""
+        queue = self.task_queues.get(queue_name)
+        if queue is None:
+            queue = self.task_queues[queue_name] = TaskQueue(queue_name)
+
+        task_id = task_identifier(task_info, task_info["task_type"])
+        if queue.push(task_id, task_info):
+            logger.info(f"任务已添加到 {queue_name}: {task_info}")
+        else:
+            logger.info(f"任务 {task_id} 已在 {queue_name} 中排队或处理中，不重复投放")
 
     def send_task(self, task_info: Dict):
         """发送任务并等待结果 - 支持305错误处理"""
+        collection, result = self.dispatch_task(task_info)
+        if result:
+            return result
+
+        # 等待任务结果，支持305错误检测
+        start_time = time.time()
+        while time.time() - start_time < TASK_RESULT_TIMEOUT:
+            # 阻塞等待爬虫完成通知，收到通知或等待超时后查询一次 Mongo（通知丢失时的兜底）
+            remaining = TASK_RESULT_TIMEOUT - (time.time() - start_time)
+            self.result_channel.wait(collection, task_info, timeout=min(remaining, settings.RESULT_NOTIFY_WAIT))
+            result = self.check_task_result(task_info, collection)
+            if result:
+                return result
+
+        logger.warning(f"❌ 获取任务结果超时")
+        return {"error": "timeout", "msg": "任务响应超时", "need_cancel": False}
+
+    def dispatch_task(self, task_info: Dict) -> Tuple[str, Optional[Dict]]:
+        """
+        检查已有结果，没有可用结果时投放任务
+        :return: (结果集合, 已有结果)；已有结果为 None 时需要等待爬虫完成通知
+        """
         # 根据任务类型确定队列
         if task_info["task_type"] == "XC_ROOM_DETAIL_RP_PIC_DISCOUNT":
             queue_name = "ctrip_detail_queue_v3"
@@ -282,97 +324,45 @@ class SchedulerAuto:
             raise ValueError(f"未知任务类型 {task_info['task_type']}，请检查")
 
         # 1. 检查是否已有结果
-        existing_result = self.get_task_result(task_info, collection)
+        existing_result = self.check_task_result(task_info, collection)
         if existing_result:
-            is_success, checked_result = self.handle_task_result(existing_result, task_info["task_type"])
-
-            # 检查是否是305错误
-            if self.is_305_response(existing_result):
-                logger.warning("✅ 发现305错误结果，需要取消任务")
-                return {"code": 305, "msg": "携程服务器内异常,放弃任务", "need_cancel": True}
-
-            if is_success and self.validate_response_data(checked_result, task_info["task_type"]):
-                logger.info("✅ 发现已有成功结果，直接使用")
-                return checked_result
+            return collection, existing_result
 
         # 2. 推送任务到队列
+        self.result_channel.reset(collection, task_info)
         self.add_task_to_redis(queue_name, task_info)
         logger.info(f"✅ 投放任务到 {queue_name}...")
+        return collection, None
 
-        # 3. 等待任务结果，支持305错误检测
-        start_time = time.time()
-        timeout = 240
-        poll_interval = 5
-
-        while time.time() - start_time < timeout:
-            result = self.get_task_result(task_info, collection)
-            if result:
-                # 优先检查305错误
-                if self.is_305_response(result):
-                    logger.warning("✅ 获取到305错误结果，需要取消任务")
-                    return {"code": 305, "msg": "携程服务器内异常,放弃任务", "need_cancel": True}
-
-                is_success, checked_result = self.handle_task_result(result, task_info["task_type"])
-                if is_success and self.validate_response_data(checked_result, task_info["task_type"]):
-                    logger.info("✅ 获取到有效数据")
-                    return checked_result
-
-            time.sleep(poll_interval)
-
-        logger.warning(f"❌ 获取任务结果超时")
-        return {"error": "timeout", "msg": "任务响应超时", "need_cancel": False}
-
-    def is_305_response(self, response: dict) -> bool:
-        """判断是否是305错误响应"""
-        if not response or not isinstance(response, dict):
-            return False
-        return response.get("code") == 305
-
-    def validate_response_data(self, response: dict, task_type: str) -> bool:
-        """验证响应数据的完整性"""
-        if not response or response.get("error"):
-            return False
-
-        # 检查是否是服务器错误响应
-        if response.get("code") in [301, 303, 304, 305, 306, 307]:
-            return False
-
-        # 根据任务类型验证数据结构
-        if task_type == "XC_ROOM_DETAIL_RP_PIC_DISCOUNT":
-            # 验证详情任务的数据结构
-            data = response.get("data", {})
-            sale_room_map = data.get("saleRoomMap", {})
-            if not sale_room_map:
-                return False
-
-            # 检查至少一个房型有价格信息
-            for room in sale_room_map.values():
-                price_info = room.get("priceInfo", {})
-                if price_info.get("displayPrice", "").startswith("¥"):
-                    return True
-            return False
+    def check_task_result(self, task_info: Dict, collection: str) -> Optional[Dict]:
+        """查询一次任务结果：305 错误返回取消标记，有效数据返回结果，其余返回 None"""
+        result = self.get_task_result(task_info, collection)
+        if not result:
+            return None
 
-        else:
-            # 列表任务的验证
-            data = response.get("data", {})
-            hotel_list = data.get("hotelList", [])
-            if not hotel_list:
-                return False
-
-            # 检查酒店信息
-            hotel = hotel_list[0]
-            room_info = hotel.get("roomInfo", [])
-            if room_info and room_info[0].get("priceInfo", {}).get("displayPrice", "").startswith("¥"):
-                return True
-            return False
+        verdict = validate_response(result, task_info["task_type"])
+        # 优先检查305错误
+        if verdict is Verdict.SERVER_305:
+            logger.warning("✅ 获取到305错误结果，需要取消任务")
+            return {"code": 305, "msg": "携程服务器内异常,放弃任务", "need_cancel": True}
 
+        if verdict.ok:
+            logger.info(f"✅ 获取到有效数据({verdict.value})")
+            return result
+        return None
 
-    def screenshot(self, task_info: dict, response: dict = None):
-        """生成渲染数据并调用 Flask 接口渲染 + Playwright 截图"""
+    def screenshot(self, task_info: dict, response: dict = None, on_image: Callable[[str], Any] = None):
+        """
+        生成渲染数据并渲染房型页，page 从共享浏览器池借用后截图
 
-        import os, requests
-        from playwright.sync_api import sync_playwright
+        :param on_image: 每张截图写入后立即回调，传入 UploadBatch.submit 即可边截图边上传
+        """
+        room_info_list, jobs, out_dir = self.build_render_jobs(task_info, response)
+        self.screenshotter.capture([job for _, job in jobs], out_dir, on_image=on_image)
+        return self.attach_screenshots(room_info_list, jobs)
 
+    def build_render_jobs(self, task_info: dict, response: dict = None) -> Tuple[List[Dict], List[Tuple[Dict, RenderJob]], str]:
+        """解析房型数据并构建每个房型的渲染任务，返回 (room_info 列表, [(房型项, 渲染任务)], 截图目录)"""
         hotel_name = task_info["hotel_name"]
         check_in = task_info["check_in"]
         check_out = task_info["check_out"]
@@ -380,6 +370,7 @@ class SchedulerAuto:
 
         # 房型数据
         rooms, dialogs = parse_room(json_content=response)
+        room_index = RoomIndex(rooms, dialogs)
         room_info_list = task_info.get("room_info", [])
 
         # 初始化路径
@@ -391,168 +382,79 @@ class SchedulerAuto:
         for room_item in room_info_list:
             room_item["screenshots"] = []
 
-        flask_render_room_url = "http://127.0.0.1:5000/render_room"
-
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)
-            context = browser.new_context(**p.devices["iPhone X"])
-            page = context.new_page()
-
-            self.patch_page_rendering(page)
-
-            # === 处理房型列表页 ===
-            list_page_item = next((i for i in room_info_list if i["title"] == "列表页信息"), None)
-            if not list_page_item:
-                raise ValueError("房型列表页信息缺失")
-
-            # 遍历每个房型（非列表页）
-            for room_item in room_info_list:
-                title = room_item["title"].strip()
-
-                if title == "列表页信息":
-                    continue
-
-                logger.info(f"📸 开始处理房型：{title}")
-
-                # 匹配房型数据
-                target_rooms = [r for r in rooms if title == (r.get("name") or "")]
-                if not target_rooms:
-                    logger.warning(f"⚠ 未匹配到房型：{title}")
-                    continue
-
-                # 计算每种早餐的最低价 variant
-                breakfast_map = self.compute_breakfast_lowest_variant(target_rooms)
-
-                # 匹配对应弹窗
-                matched_dialogs = [
-                    d for d in dialogs
-                    if d.get("room_code") and any(v.get("code") == d.get("room_code") for v in breakfast_map.values())
-                ]
-
-                # 构建渲染 payload
-                payload = {
-                    "hotel_name": hotel_name,
-                    "checkin_date": date_dict["checkin_date"],
-                    "checkin_day": date_dict["checkin_day"],
-                    "checkout_date": date_dict["checkout_date"],
-                    "checkout_day": date_dict["checkout_day"],
-                    "stay_night": 1,
-                    "rooms": list(breakfast_map.values()),
-                    "dialog": matched_dialogs
-                }
-
-                # 调用 Flask
-                resp = requests.post(flask_render_room_url, json=payload)
-                if resp.status_code != 200:
-                    logger.error("❌ 渲染失败")
-                    continue
+        # === 处理房型列表页 ===
+        list_page_item = next((i for i in room_info_list if i["title"] == "列表页信息"), None)
+        if not list_page_item:
+            raise ValueError("房型列表页信息缺失")
 
-                # 页面加载
-                page.set_content(resp.text, wait_until="networkidle")
-                page.wait_for_timeout(500)
+        # 遍历每个房型（非列表页），先准备好渲染数据，再统一渲染、借用 page 截图
+        jobs = []
+        for room_item in room_info_list:
+            title = room_item["title"].strip()
+
+            if title == "列表页信息":
+                continue
+
+            logger.info(f"📸 开始处理房型：{title}")
+
+            # 匹配房型数据
+            target_rooms = room_index.by_name(title)
+            if not target_rooms:
+                logger.warning(f"⚠ 未匹配到房型：{title}")
+                continue
+
+            # 计算每种早餐的最低价 variant
+            breakfast_map = self.compute_breakfast_lowest_variant(target_rooms)
+
+            # 匹配对应弹窗
+            matched_dialogs = room_index.dialogs_for(v.code for v in breakfast_map.values())
+
+            # 构建渲染 payload（记录在这里转成 dict）
+            payload = {
+                "hotel_name": hotel_name,
+                "checkin_date": date_dict["checkin_date"],
+                "checkin_day": date_dict["checkin_day"],
+                "checkout_date": date_dict["checkout_date"],
+                "checkout_day": date_dict["checkout_day"],
+                "stay_night": 1,
+                "rooms": [v.to_dict() for v in breakfast_map.values()],
+                "dialog": [d.to_dict() for d in matched_dialogs]
+            }
 
-                # ✔ 截图列表页
-                list_img = self.capture_room_list_item(page, title, out_dir)
-                list_page_item["screenshots"].append(list_img)
+            # 渲染（默认进程内模板渲染）与截图缓存都在 RoomScreenshotter 中处理
+            jobs.append((room_item, RenderJob(title, [v.code for v in breakfast_map.values()], payload=payload)))
 
-                # ✔ 截图每种早餐对应弹窗
-                for b_type, variant in breakfast_map.items():
-                    variant_code = variant.get("code")
-                    dialog_img = self.capture_dialog(page, variant_code, out_dir)
-                    if dialog_img:
-                        room_item["screenshots"].append(dialog_img)
+        return room_info_list, jobs, out_dir
 
-            browser.close()
+    @staticmethod
+    def attach_screenshots(room_info_list: List[Dict], jobs: List[Tuple[Dict, RenderJob]]) -> List[Dict]:
+        """把截图路径回填到 room_info：列表页截图归到列表页信息，弹窗截图归到各自房型"""
+        list_page_item = next(i for i in room_info_list if i["title"] == "列表页信息")
+        for room_item, job in jobs:
+            # ✔ 列表页截图
+            if job.list_image:
+                list_page_item["screenshots"].append(job.list_image)
+            # ✔ 每种早餐对应弹窗截图
+            room_item["screenshots"].extend(job.dialog_images)
 
         return room_info_list
 
-    def patch_page_rendering(self, page):
-        page.evaluate("""
-            () => {
-                document.body.style.overflow = 'hidden';
-                document.body.style.webkitFontSmoothing = 'antialiased';
-                document.body.style.mozOsxFontSmoothing = 'grayscale';
-                document.body.style.textRendering = 'optimizeLegibility';
-            }
-        """)
-        page.add_style_tag(content="""
-            * {
-                image-rendering: crisp-edges !important;
-                text-rendering: optimizeLegibility !important;
-                -webkit-font-smoothing: antialiased !important;
-            }
-        """)
-
-    def capture_room_list_item(self, page, title, out_dir):
-        safe_title = title.replace("/", "_").replace(" ", "")
-        img_path = os.path.join(out_dir, f"{uuid.uuid4().hex}_list.png")
-        page.screenshot(path=img_path)
-        logger.info(f"✔ 列表页截图完成: {img_path}")
-        return img_path
-
     def compute_breakfast_lowest_variant(self, rooms):
         breakfast_types = ["无早餐", "1份早餐", "2份早餐"]
 
         result = {}
         for room in rooms:
-            bf_raw = room.get("breakfast", "") or ""
+            bf_raw = room.breakfast or ""
 
             matched = next((b for b in breakfast_types if b in bf_raw), "无早餐")
 
-            price = float(room.get("price", 1e9) or 1e9)
+            price = float(room.price or 1e9)
 
-            if matched not in result or price < float(result[matched].get("price", 1e9)):
+            if matched not in result or price < float(result[matched].price or 1e9):
                 result[matched] = room
 
         return result
 
-    def capture_dialog(self, page, variant_code, out_dir):
-        dialog_id = f"dialog-{variant_code}"
-        btn_selector = f'.open-discount-btn[data-dialog-id="{dialog_id}"]'
-        btn = page.query_selector(btn_selector)
-
-        if not btn:
-            logger.warning(f"⚠ 未找到弹窗按钮: {btn_selector}")
-            return None
-
-        try:
-            btn.scroll_into_view_if_needed()
-            page.wait_for_timeout(200)
-            btn.click()
-            page.wait_for_timeout(600)
-
-            img_path = os.path.join(out_dir, f"{uuid.uuid4().hex}_dialog.png")
-            page.screenshot(path=img_path)
-            logger.info(f"✔ 弹窗截图成功: {img_path}")
-
-            self.safe_close_dialog(page, variant_code)
-            return img_path
-
-        except Exception as e:
-            logger.error(f"❌ 弹窗截图失败: {e}")
-            return None
-
-    def safe_close_dialog(self, page, variant_code):
-        dialog_id = f"dialog-{variant_code}"
-        close_selector = f'.close[data-dialog-id="{dialog_id}"]'
-
-        try:
-            btn = page.query_selector(close_selector)
-            if btn:
-                btn.scroll_into_view_if_needed()
-                btn.click()
-            else:
-                mask = page.query_selector(f"#mask-{variant_code}")
-                if mask:
-                    mask.click()
-                else:
-                    page.mouse.click(10, 10)
-
-            page.wait_for_timeout(200)
-        except:
-            page.mouse.click(10, 10)
-
-
     def get_task_result(self, task_info: Dict, collection: str, timeout: int = 120):
         """
         根据任务信息轮询 MongoDB 或 Redis 获取结果
@@ -569,99 +471,10 @@ class SchedulerAuto:
 
         result = self.mongo.find_one(collection, query=query)
         if result:
-            response = json.loads(result.get("response"))
+            response = decode_response(result)
 
         return response
 
-    def handle_task_result(self, result: dict, task_type: str):
-        """改进的结果检查逻辑，支持305错误"""
-        if not result:
-            return False, {"msg": "空结果"}
-
-        # 检查305错误
-        if result.get("code") == 305:
-            return True, result  # 返回True表示需要特殊处理305错误
-
-        result_str = json.dumps(result)
-
-        # 检查错误情况
-        if any(error in result_str for error in ["error", "timeout", "异常", "失败"]):
-            return False, result
-
-        if "priceInfo" in result_str:
-            if task_type == "XC_ROOM_DETAIL_RP_PIC_DISCOUNT":
-                if "totalPriceInfo" in result_str:
-                    logger.info("✅ 详情任务数据正常")
-                    return True, result
-            else:
-                if "tipAfterPrice" in result_str or "酒店已售罄" in result_str:
-                    logger.info("✅ 列表任务数据正常")
-                    return True, result
-
-        return False, {"msg": "数据结构异常"}
-
-    # ===== 第一步：请求 OSS 上传所需参数 =====
-    def get_oss_upload_info(self, token, file_name):
-        url = "http://47.101.140.209/crowd/task/getOssKey?token=" + token
-        headers = {
-            "Accept": "*/*",
-            "Content-Type": "application/json",
-            "Origin": "http://47.101.140.209",
-            "Referer": "http://47.101.140.209/crowd.html",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
-        }
-        cookies = {"crowd-code": "759528"}
-        payload = {
-            "bizType": "HOTEL",
-            "fileName": file_name,
-            "token": token
-        }
-        while True:
-            try:
-                resp = requests.post(url, headers=headers, json=payload, cookies=cookies, verify=False)
-                resp.raise_for_status()
-                if resp.json() and resp.json()["msg"] == '正常返回':
-                    data = resp.json()["data"]
-                    logger.info("✅ 获取 OSS 上传参数成功")
-                    return data
-            except Exception as e:
-                logger.warning(f"图片上传出现问题，错误原因{e}")
-                time.sleep(2)
-
-    # ===== 第二步：使用返回参数上传文件到 OSS =====
-    def upload_to_oss(self, file_path, oss_info):
-        url = f"https://{oss_info['url']}/"
-
-        data = {
-            "accessId": oss_info["accessId"],
-            "ossKey": oss_info["ossKey"],
-            "signature": oss_info["signature"],
-            "expiration": oss_info["expiration"],
-            "uuid": oss_info["uuid"],
-            "policy": oss_info["policy"],
-            "OSSAccessKeyId": oss_info["accessId"],
-            "key": oss_info["ossKey"]
-        }
-
-        files = {
-            "file": (file_path.split("/")[-1], open(file_path, "rb"), "image/png")
-        }
-
-        logger.info("📤 正在上传文件到 OSS ...")
-        while True:
-            try:
-                resp = requests.post(url, data=data, files=files)
-                resp.raise_for_status()
-                break
-            except Exception as e:
-                logger.warning("上传文件到 OSS，错误原因{e}, 继续重试")
-                time.sleep(2)
-
-        if resp.status_code == 204:
-            logger.info ("✅ 上传成功（OSS 无返回体）")
-        else:
-            logger.info("✅ 上传成功，响应：", resp.text)
-
     def submit_template_task(self, task_info, token, submit_task_map, claim_id, do_submit=True):
         """
         提交模板任务
@@ -686,7 +499,6 @@ class SchedulerAuto:
             :param token:
             :param task_info:
         """
-        url = "http://47.101.140.209/crowd/task/submitTemplateTask?token=" + token
         headers = {
           'Accept': '*/*',
           'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
@@ -702,14 +514,15 @@ class SchedulerAuto:
         payload = {
             "claimId": claim_id,
             "giveUpTaskMap": "{}",
-            "submitTaskMap": json.dumps(submit_task_map, ensure_ascii=False),
+            "submitTaskMap": json_codec.dumps(submit_task_map),
             "doSubmit": do_submit,
             "token": token
         }
 
         # 发送请求
-        resp = requests.post(
-            url,
+        resp = self.platform.post(
+            "submitTemplateTask",
+            params={"token": token},
             headers=headers,
             json=payload,
             verify=False
@@ -737,12 +550,12 @@ class SchedulerAuto:
         else:
             logger.warning(f"异常的提交任务返回值: \n{response_data}")
 
-        self.mongo.write("task_log", {
+        self.record(self.mongo.write, "task_log", {
             "hotel_name": task_info["hotel_name"],
             "check_in": task_info["check_in"],
             "check_out": task_info["check_out"],
             "status": result,
-            "response": json.dumps(response_data)
+            "response": json_codec.dumps(response_data)
         })
         return response_data
 
@@ -758,11 +571,6 @@ class SchedulerAuto:
         Returns:
             dict: 服务器响应数据
         """
-        # URL编码取消原因
-        encoded_reason = quote(reason_type, encoding='utf-8')
-
-        url = f"http://47.101.140.209/crowd/task/cancelTask?claimId={claim_id}&reasonType={encoded_reason}&token={token}"
-
         headers = {
           'Accept': '*/*',
           'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
@@ -773,8 +581,9 @@ class SchedulerAuto:
         }
 
         # 发送GET请求
-        resp = requests.get(
-            url,
+        resp = self.platform.get(
+            "cancelTask",
+            params={"claimId": claim_id, "reasonType": reason_type, "token": token},
             headers=headers,
             verify=False
         )
@@ -789,8 +598,22 @@ class SchedulerAuto:
             error_msg = response_data.get("msg", "未知错误")
             raise Exception(f"任务取消失败: {error_msg}")
 
-    def run(self):
-        """单账号运行逻辑 - 支持305错误取消任务"""
+    def record(self, func: Callable, *args):
+        """收尾记录：流水线模式下交给后台执行，不阻塞领取下一个任务"""
+        if self.pipelined:
+            self.bookkeeper.defer(func, *args)
+        else:
+            func(*args)
+
+    def run(self, pipelined: bool = None):
+        """单账号运行逻辑 - 支持305错误取消任务
+
+        :param pipelined: 流水线模式，默认取 SCHEDULER_PIPELINE。平台限制一个账号同时只能持有一个任务，
+                          领取 / 提交仍然严格串行；提交后的收尾记录交给后台执行，立即领取下一个任务，
+                          记录写入与下一个任务的爬虫抓取重叠
+        """
+        if pipelined is not None:
+            self.pipelined = pipelined
         with self.lock:
             self.login()
 
@@ -860,12 +683,13 @@ class SchedulerAuto:
                     logger.info(f"[{self.username}] 》》》》》step3. {hotel_name} 数据请求成功\n\n")
 
                     try:
-                        # 生成截图
-                        room_info = self.screenshot(task_info, success_response)
+                        # 生成截图，每张截图写入后立即进入上传队列
+                        upload_batch = self.oss_uploader.batch(self.token)
+                        room_info = self.screenshot(task_info, success_response, on_image=upload_batch.submit)
                         logger.info(f"[{self.username}] 》》》》》step4. {hotel_name} 截图成功\n\n")
 
                         # 图片上传和提交任务
-                        submit_map = self.upload_screenshots(room_info)
+                        submit_map = self.upload_screenshots(room_info, upload_batch)
                         logger.info(f"[{self.username}] 》》》》》step5. {hotel_name} 图片上传成功\n\n")
 
                         # 提交任务
@@ -897,21 +721,11 @@ class SchedulerAuto:
         else:
             return response.get('code') == 305 or bool(response.get("data"))
 
-    def upload_screenshots(self, room_info):
-        """提取截图上传逻辑"""
-        submit_map = {}
-        for item in room_info:
-            key = item["key"]
-            image_paths = item["screenshots"]
-            submit_map[key] = []
-
-            for img_path in image_paths:
-                file_name = os.path.basename(img_path)
-                oss_info = self.get_oss_upload_info(self.token, file_name)
-                self.upload_to_oss(img_path, oss_info)
-                submit_map[key].append(oss_info["ossKey"])
-                time.sleep(0.5)
-
+    def upload_screenshots(self, room_info, upload_batch: UploadBatch = None):
+        """提取截图上传逻辑：等待截图期间已提交的上传完成并补传其余截图，返回 {key: [ossKey, ...]}"""
+        upload_batch = upload_batch or self.oss_uploader.batch(self.token)
+        submit_map = upload_batch.collect(room_info, record_keys=False)
+        self.record(upload_batch.record_oss_keys, room_info, submit_map)
         return submit_map
 
 class MultiAccountScheduler:
@@ -980,7 +794,7 @@ class MultiAccountScheduler:
 
     def run_continuous(self, max_workers: int = None):
         """
-        持续并发运行（推荐使用）
+        持续并发运行
         每个账号在自己的线程中持续运行
         """
         if max_workers is None:
@@ -1008,6 +822,15 @@ class MultiAccountScheduler:
                 for future in futures:
                     future.cancel()
 
+    def run_async(self):
+        """
+        异步并发运行（推荐使用）
+        所有账号作为协程状态机运行在同一个事件循环中，不再每个账号占用一个线程，见 scheduler_async
+        """
+        from scheduler_async import AsyncMultiAccountScheduler
+
+        AsyncMultiAccountScheduler(self.schedulers).run()
+
     def _run_continuous_wrapper(self, scheduler):
         """持续运行包装器，包含重启逻辑"""
         while True:
@@ -1049,7 +872,7 @@ def start_multi_account_scheduler():
 
     # 创建多账号调度器并执行
     multi_scheduler = MultiAccountScheduler(accounts)
-    multi_scheduler.run_concurrent()
+    multi_scheduler.run_async()
 
 if __name__ == '__main__':
     # # 1️⃣ 你的 token（示例中从 curl 提取）
@@ -1,7 +1,5 @@
 # scheduler_auto_refactor.py
-import json
 import time
-import uuid
 import logging
 import threading
 import datetime
@@ -20,6 +18,13 @@ from urllib3.util.retry import Retry
 # 我这里用占位
 from redis import Redis
 
+from utils import json_codec
+from utils.response_codec import decode_response
+from utils.response_validator import validate_response
+from utils.room_screenshot import RenderJob, RoomScreenshotter
+from utils.task_queue import TaskQueue, task_identifier
+from utils.template_renderer import RoomRenderer, get_room_renderer
+
 # -----------------------------------------------------------------------------
 # 配置 / 常量
 # -----------------------------------------------------------------------------
@@ -235,16 +240,19 @@ class TaskManager:
             return {"err": str(e)}
 
 # -----------------------------------------------------------------------------
-# Screenshot manager: render html via flask endpoint + playwright
+# Screenshot manager: render html in-process (or via flask endpoint) + playwright
 # -----------------------------------------------------------------------------
 class ScreenshotManager:
-    def __init__(self, flask_render_url: str = "http://127.0.0.1:5000/render_room"):
-        self.flask_render_url = flask_render_url
-        # TODO: 你可在这里注入 playwright 的配置
+    def __init__(self, renderer: RoomRenderer = None, screenshotter: RoomScreenshotter = None):
+        # 默认进程内模板渲染（utils.template_renderer），RENDER_BACKEND=flask 时回落到 Flask 渲染服务
+        self.renderer = renderer or get_room_renderer()
+        # page 从进程内共享的浏览器池借用（utils.browser_pool），不再每个任务启动一次浏览器
+        self.screenshotter = screenshotter or RoomScreenshotter(renderer=self.renderer)
 
-    def parse_and_render(self, hotel_name: str, check_in: str, check_out: str, rooms: List[Dict], dialogs: List[Dict]) -> str:
-        """调用 Flask 渲染，返回 HTML 文本"""
-        payload = {
+    @staticmethod
+    def build_payload(hotel_name: str, check_in: str, check_out: str, rooms: List[Dict], dialogs: List[Dict]) -> Dict:
+        """房型页渲染数据，同时作为截图缓存的 key"""
+        return {
             "hotel_name": hotel_name,
             "checkin_date": check_in,
             "checkout_date": check_out,
@@ -252,18 +260,16 @@ class ScreenshotManager:
             "rooms": rooms,
             "dialog": dialogs
         }
-        r = requests.post(self.flask_render_url, json=payload, timeout=20)
-        r.raise_for_status()
-        return r.text
+
+    def parse_and_render(self, hotel_name: str, check_in: str, check_out: str, rooms: List[Dict], dialogs: List[Dict]) -> str:
+        """渲染房型页，返回 HTML 文本"""
+        return self.renderer.render(self.build_payload(hotel_name, check_in, check_out, rooms, dialogs))
 
     def capture_all(self, task_info: TaskInfo, parsed_response: dict) -> List[Dict]:
         """
         parsed_response: 你的 get_task_result() 返回的结构（已经是 dict）
         返回值：room_info_list，格式与原来相同但 screenshots 字段填充为本地路径列表
         """
-        import os
-        from playwright.sync_api import sync_playwright
-
         # 准备输出目录
         today = datetime.datetime.now().strftime("%Y%m%d")
         out_dir = Path(f"screenshots/{today}/{task_info.hotel_name}")
@@ -275,86 +281,37 @@ class ScreenshotManager:
         for r in room_info_list:
             r["screenshots"] = []
 
-        html_cache = {}
-        # 启动浏览器
-        with sync_playwright() as pw:
-            browser = pw.chromium.launch(headless=True)
-            context = browser.new_context(**pw.devices.get("iPhone X", {}))
-            page = context.new_page()
-            self._patch_page(page)
-
-            # 首先渲染一次整体页面（如果每个房型需要不同数据可针对每次渲染）
-            # 下面我们为每个房型单独 render（与原逻辑类似）
-            for room_item in room_info_list:
-                title = room_item["title"].strip()
-                if title == "列表页信息":
-                    continue
-                # 匹配房型
-                target_rooms = [r for r in rooms if title == (r.get("name") or "")]
-                if not target_rooms:
-                    logger.warning(f"未匹配到房型：{title}")
-                    continue
-                breakfast_map = SchedulerUtils.compute_breakfast_lowest_variant(target_rooms)
-                matched_dialogs = [
-                    d for d in dialogs
-                    if d.get("room_code") and any(v.get("code") == d.get("room_code") for v in breakfast_map.values())
-                ]
-                payload_rooms = list(breakfast_map.values())
-                # 渲染 HTML
-                html = self.parse_and_render(task_info.hotel_name, task_info.check_in, task_info.check_out, payload_rooms, matched_dialogs)
-                page.set_content(html, wait_until="networkidle")
-                time.sleep(0.2)
-                # 列表页截图（单张）
-                list_img = out_dir / f"{uuid.uuid4().hex}_list.png"
-                page.screenshot(path=str(list_img))
-                logger.info(f"列表页截图: {list_img}")
-                # 保存到对应的 列表页对象（找到 '列表页信息'）
-                list_page_item = next((i for i in room_info_list if i["title"] == "列表页信息"), None)
-                if list_page_item:
-                    list_page_item.setdefault("screenshots", []).append(str(list_img))
-
-                # 弹窗截图
-                for b_type, variant in breakfast_map.items():
-                    variant_code = variant.get("code")
-                    dialog_selector_btn = f'.open-discount-btn[data-dialog-id="dialog-{variant_code}"]'
-                    btn = page.query_selector(dialog_selector_btn)
-                    if not btn:
-                        logger.warning(f"未找到弹窗按钮: {dialog_selector_btn}")
-                        continue
-                    try:
-                        btn.scroll_into_view_if_needed()
-                        page.wait_for_timeout(200)
-                        btn.click()
-                        page.wait_for_timeout(600)
-                        dialog_img = out_dir / f"{uuid.uuid4().hex}_dialog.png"
-                        page.screenshot(path=str(dialog_img))
-                        logger.info(f"弹窗截图: {dialog_img}")
-                        room_item.setdefault("screenshots", []).append(str(dialog_img))
-                        # 关闭弹窗：优先尝试选择 .close[data-dialog-id="dialog-{code}"]
-                        SchedulerUtils.safe_close_dialog_on_page(page, variant_code)
-                    except Exception as e:
-                        logger.exception(f"弹窗截图异常: {e}")
-
-            browser.close()
+        # 为每个房型准备渲染数据（与原逻辑类似），再统一渲染、借用 page 截图
+        jobs = []
+        for room_item in room_info_list:
+            title = room_item["title"].strip()
+            if title == "列表页信息":
+                continue
+            # 匹配房型
+            target_rooms = [r for r in rooms if title == (r.get("name") or "")]
+            if not target_rooms:
+                logger.warning(f"未匹配到房型：{title}")
+                continue
+            breakfast_map = SchedulerUtils.compute_breakfast_lowest_variant(target_rooms)
+            matched_dialogs = [
+                d for d in dialogs
+                if d.get("room_code") and any(v.get("code") == d.get("room_code") for v in breakfast_map.values())
+            ]
+            payload_rooms = list(breakfast_map.values())
+            # 渲染与截图缓存在 RoomScreenshotter 中处理
+            payload = self.build_payload(task_info.hotel_name, task_info.check_in, task_info.check_out, payload_rooms, matched_dialogs)
+            jobs.append((room_item, RenderJob(title, [v.get("code") for v in breakfast_map.values()], payload=payload)))
+
+        self.screenshotter.capture([job for _, job in jobs], str(out_dir))
+
+        # 保存到对应的 列表页对象（找到 '列表页信息'）
+        list_page_item = next((i for i in room_info_list if i["title"] == "列表页信息"), None)
+        for room_item, job in jobs:
+            if list_page_item and job.list_image:
+                list_page_item.setdefault("screenshots", []).append(job.list_image)
+            room_item.setdefault("screenshots", []).extend(job.dialog_images)
         return room_info_list
 
-    def _patch_page(self, page):
-        page.evaluate("""
-            () => {
-                document.body.style.overflow = 'hidden';
-                document.body.style.webkitFontSmoothing = 'antialiased';
-                document.body.style.mozOsxFontSmoothing = 'grayscale';
-                document.body.style.textRendering = 'optimizeLegibility';
-            }
-        """)
-        page.add_style_tag(content="""
-            * {
-                image-rendering: crisp-edges !important;
-                text-rendering: optimizeLegibility !important;
-                -webkit-font-smoothing: antialiased !important;
-            }
-        """)
-
 # -----------------------------------------------------------------------------
 # OSS uploader
 # -----------------------------------------------------------------------------
@@ -449,28 +406,6 @@ class SchedulerUtils:
                 result[matched] = room
         return result
 
-    @staticmethod
-    def safe_close_dialog_on_page(page, variant_code: str):
-        try:
-            close_sel = f'.close[data-dialog-id="dialog-{variant_code}"]'
-            btn = page.query_selector(close_sel)
-            if btn:
-                btn.scroll_into_view_if_needed()
-                btn.click()
-            else:
-                mask_sel = f"#mask-{variant_code}"
-                mask = page.query_selector(mask_sel)
-                if mask:
-                    mask.click()
-                else:
-                    page.mouse.click(10, 10)
-            page.wait_for_timeout(200)
-        except Exception:
-            try:
-                page.mouse.click(10, 10)
-            except Exception:
-                pass
-
 # -----------------------------------------------------------------------------
 # SchedulerAuto orchestrator (原 SchedulerAuto 的 refactor)
 # -----------------------------------------------------------------------------
@@ -571,9 +506,10 @@ class SchedulerAuto:
         把任务推送入队并轮询 mongo/redis 获取结果（与原来 send_task 逻辑类似）
         这里示例化一个简略流程：直接调用外部系统并等待结果
         """
-        # 1. 投放到 redis set（保留原语义）
+        # 1. 投放到 Redis 可靠队列，按任务标识去重
         queue_name = "ctrip_detail_queue" if task_info.task_type == "XC_ROOM_DETAIL_RP_PIC_DISCOUNT" else "ctrip_list_queue"
-        self.redis.sadd(queue_name, json.dumps(task_info.to_dict()))
+        task = task_info.to_dict()
+        TaskQueue(queue_name, self.redis).push(task_identifier(task, task_info.task_type), task)
         logger.info(f"已将任务放入队列 {queue_name}")
 
         # 等待结果（轮询 mongo）
@@ -599,14 +535,11 @@ class SchedulerAuto:
         query = {"hotel_name": task_info.hotel_name, "check_in": task_info.check_in, "check_out": task_info.check_out, "date": today}
         result = self.mongo.find_one(collection, query=query)
         if result:
-            return json.loads(result.get("response", "{}"))
+            return decode_response(result)
         return {}
 
     def handle_task_result(self, result: dict, task_type: str) -> Tuple[bool, dict]:
-        s = json.dumps(result or {})
-        if "priceInfo" in s and task_type == "XC_ROOM_DETAIL_RP_PIC_DISCOUNT" and "totalPriceInfo" in s:
-            return True, result
-        if task_type != "XC_ROOM_DETAIL_RP_PIC_DISCOUNT" and ("tipAfterPrice" in s or "酒店已售罄" in s):
+        if validate_response(result, task_type).ok:
             return True, result
         return False, {}
 
@@ -615,7 +548,7 @@ class SchedulerAuto:
         payload = {
             "claimId": claim_id,
             "giveUpTaskMap": "{}",
-            "submitTaskMap": json.dumps(submit_task_map, ensure_ascii=False),
+            "submitTaskMap": json_codec.dumps(submit_task_map),
             "doSubmit": do_submit,
             "token": token
         }
@@ -643,7 +576,7 @@ class SchedulerAuto:
                         "check_in": task_info.check_in,
                         "check_out": task_info.check_out,
                         "status": result,
-                        "response": json.dumps(data, ensure_ascii=False)
+                        "response": json_codec.dumps(data)
                     })
             except Exception:
                 logger.exception("写 task_log 到 mongo 失败")
@@ -1,10 +1,12 @@
 import asyncio
+import signal
 import aiohttp
-from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
 
 import redis
-import json
-from typing import Optional, Union
+import redis.asyncio
+from typing import Dict, Optional, Union
 
 from datetime import datetime
 
@@ -13,35 +15,62 @@ from bricks import Request
 from bricks.downloader.go_requests import Downloader
 from bricks.utils.fake import user_agent
 
-from db.mongo import MongoClientSingleton
+from config import settings
+from db.mongo import AsyncMongoClient, AsyncMongoClientSingleton, MongoClientSingleton
 from scheduler import REDIS_HOST, REDIS_PORT, REDIS_DB
+from utils.buffered_writer import BufferedWriter
+from utils.detail_response import read_detail_response
+from utils.hotel_cache import HotelInfoCache
+from utils.response_codec import encode_response
+from utils.response_validator import Verdict, validate_response
+from utils.result_channel import ResultChannel
+from utils.task_queue import AsyncTaskQueue, task_identifier
 
 
 class CrawlerByAuto:
     def __init__(self, redis_host: str = REDIS_HOST, redis_port: int = REDIS_PORT, redis_db: int = REDIS_DB):
         self.redis = redis.StrictRedis(host=redis_host, port=redis_port, db=redis_db, decode_responses=True)
+        # 事件循环内使用的异步 Redis 客户端，避免同步调用阻塞在途协程
+        self.aredis = redis.asyncio.StrictRedis(host=redis_host, port=redis_port, db=redis_db, decode_responses=True)
         self.downloader = Downloader()  # 使用 Downloader
+        # Downloader.fetch 是同步调用，放到线程池执行，并按 host 限制并发
+        self.fetch_executor = ThreadPoolExecutor(max_workers=settings.DOWNLOADER_MAX_WORKERS,
+                                                 thread_name_prefix="downloader")
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
         self.loop = asyncio.get_event_loop()
         self.proxy_set = "proxy_set"
         self.url = "http://127.0.0.1:8004"
 
         # ✅ 初始化 MongoDB
         self.mongo = MongoClientSingleton(db_name="ctrip")
+        # 异步 Mongo 客户端（pymongo >= 4.9）：酒店信息缓存在事件循环中直接查询，未安装时回落到线程池
+        self.async_mongo = AsyncMongoClientSingleton(db_name="ctrip") if AsyncMongoClient is not None else None
+        # 酒店基础信息缓存，命中后跳过关键词搜索
+        self.hotel_cache = HotelInfoCache(self.mongo, async_mongo=self.async_mongo)
+        # 结果落库后通知调度器
+        self.result_channel = ResultChannel(redis_host=redis_host, redis_port=redis_port, redis_db=redis_db)
+        # 结果批量写入：合并同一任务的多次写入，库中已有有效结果时不覆盖
+        self.result_writer = BufferedWriter(self.mongo, guard={"is_valid": {"$ne": True}},
+                                            on_flush=self._on_results_flushed)
 
         self.session = None
 
+        # 任务队列：FIFO + 租约，爬虫中途退出的任务会在租约过期后重新投递
+        self.list_queue = AsyncTaskQueue("ctrip_list_queue", self.aredis)
+        self.detail_queue = AsyncTaskQueue("ctrip_detail_queue_v3", self.aredis)
+
+        # 并发控制与优雅退出
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.stopping: Optional[asyncio.Event] = None
+        self.in_flight = set()  # 在途任务
+
         # 缓冲队列：存储正在处理的任务，避免重复执行
         self.processing_list_tasks = set()  # 正在处理的列表任务标识
         self.processing_detail_tasks = set()  # 正在处理的详情任务标识
 
     def _get_task_identifier(self, task: dict, task_type: str) -> str:
         """生成任务唯一标识符"""
-        if task_type == "list":
-            return f"list_{task['hotel_name']}_{task['check_in']}_{task['check_out']}"
-        elif task_type == "detail":
-            return f"detail_{task['hotel_name']}_{task['check_in']}_{task['check_out']}"
-        else:
-            return f"unknown_{hash(json.dumps(task, sort_keys=True))}"
+        return task_identifier(task, task_type)
 
     async def get_session(self):
         """获取或创建 aiohttp session"""
@@ -52,11 +81,36 @@ class CrawlerByAuto:
 
     async def hotel_info_spider(self, task: dict):
         """
-        用于获取酒店基础信息，包括hotel_id、country等
+        用于获取酒店基础信息，包括hotel_id、country等，优先读取缓存
         :param task:
         :return:
         """
         keyword = task["hotel_name"]
+
+        identity = await self.hotel_cache.get_async(keyword)
+        if identity is None:
+            identity = await self.search_hotel_identity(keyword)
+            if not identity:
+                return []
+            await self.hotel_cache.set_async(keyword, identity)
+
+        hotel_info = {
+            "hotel_id": str(identity["hotel_id"]),
+            "keyword": keyword,
+            "check_in": task["check_in"].replace("-", ""),
+            "check_out": task["check_out"].replace("-", ""),
+            "city_id": str(identity["city_id"]),
+            "city_name": identity["city_name"],
+            "province_name": identity.get("province_name") or ""
+        }
+        return hotel_info
+
+    async def search_hotel_identity(self, keyword: str):
+        """
+        通过关键词搜索接口获取酒店 id、城市等静态信息
+        :param keyword: 酒店名称
+        :return:
+        """
         body = {
             "action": "online",
             "source": "globalonline",
@@ -87,12 +141,9 @@ class CrawlerByAuto:
             print(data_dict)
             # hotel_name = task["hotel_name"]
             # if hotel_name == data_dict["word"]:
-            hotel_info = {
-                "hotel_id": str(data_dict["id"]),
-                "keyword": keyword,
-                "check_in": task["check_in"].replace("-", ""),
-                "check_out": task["check_out"].replace("-", ""),
-                "city_id": str(data_dict["cityId"]),
+            identity = {
+                "hotel_id": data_dict["id"],
+                "city_id": data_dict["cityId"],
                 "city_name": data_dict["cityName"],
                 "province_name": data_dict.get("districtName", "")
             }
@@ -101,108 +152,42 @@ class CrawlerByAuto:
         except:
             logger.warning("获取city_id的数据结构异常")
             return []
-        return hotel_info
+        return identity
 
-    def save_to_mongo(self, collection_name: str, data: dict):
+    async def save_to_mongo(self, collection_name: str, data: dict):
         """
-        同步方式写入 MongoDB - 先查询现有数据，只有不正常时才更新插入
+        写入 MongoDB（批量延迟写入）- 库中已有正常数据时不覆盖，只有不正常时才更新插入
         """
         now = datetime.now()
         data["date"] = now.strftime("%Y-%m-%d")
-        data["created_at"] = now.strftime("%Y-%m-%d %H:%M:%S")
-
-        # 构建查询条件
-        query = {
-            "date": data["date"],
-            "hotel_name": data["hotel_name"],
-            "check_in": data["check_in"],
-            "check_out": data["check_out"]
-        }
+        data["created_at"] = now  # 存为日期类型，供 TTL 索引使用
 
         # 新增：验证响应数据
-        response_str = data.get("response", "{}")
+        response_data = data.get("response") or {}
         try:
-            response_data = json.loads(response_str)
             data["is_valid"] = self.is_valid_response_data(response_data, data.get("task_type"))
         except:
             data["is_valid"] = False
-
-        # 查询 MongoDB 中是否已存在该记录
-        existing_data = self.mongo.find_one(collection_name, query)
-
-        if existing_data:
-            # 如果已存在记录，检查现有数据是否正常
-            existing_response_str = existing_data.get("response", "{}")
-            try:
-                existing_response_data = json.loads(existing_response_str)
-                existing_is_valid = self.is_valid_response_data(existing_response_data, existing_data.get("task_type"))
-            except:
-                existing_is_valid = False
-
-            # 只有当现有数据不正常且新数据正常时，才更新
-            if not existing_is_valid and data["is_valid"]:
-                logger.info(f"更新无效数据为有效数据: {data['hotel_name']} - {data['check_in']}")
-                self.mongo.update(collection_name, data, query=query, upsert=True)
-            elif not existing_is_valid and not data["is_valid"]:
-                # 如果新旧数据都不正常，可以选择更新（记录最新错误）或不更新
-                # 这里选择更新，以记录最新的错误信息
-                logger.info(f"更新无效数据（记录最新错误）: {data['hotel_name']} - {data['check_in']}")
-                self.mongo.update(collection_name, data, query=query, upsert=True)
-            else:
-                logger.info(f"数据已存在且正常，跳过保存: {data['hotel_name']} - {data['check_in']}")
-        else:
-            # 如果不存在记录，直接插入
-            logger.info(f"插入新数据: {data['hotel_name']} - {data['check_in']}")
-            self.mongo.update(collection_name, data, query=query, upsert=True)
+        # 按配置的存储格式编码 response（默认 BSON 子文档）
+        data.update(encode_response(response_data))
+
+        # 放入缓冲区，由后台线程按 (date, hotel_name, check_in, check_out) 合并后批量写入，
+        # 写入后在 _on_results_flushed 中通知调度器来取
+        logger.info(f"缓冲待写入数据: {data['hotel_name']} - {data['check_in']} (is_valid={data['is_valid']})")
+        self.result_writer.add(collection_name, data)
+
+    def _on_results_flushed(self, collection_name: str, records: list):
+        """批量写入完成后推送完成通知，运行在写入线程中"""
+        for data in records:
+            self.result_channel.publish(collection_name, data, status={
+                "is_valid": data["is_valid"],
+                "success": data.get("success"),
+                "server_code": data.get("server_code"),
+            }, date=data["date"])
 
     def is_valid_response_data(self, response_data: dict, task_type: str) -> bool:
         """判断响应数据是否有效"""
-        if not response_data:
-            return False
-
-        # 检查服务器错误码
-        if response_data.get("code") in [301, 303, 304, 305, 306, 307]:
-            return False
-
-        # 检查是否有实际数据
-        if "data" not in response_data:
-            return False
-
-        # 根据任务类型进行更详细的验证
-        if task_type == "detail":
-            return self._is_valid_detail_response(response_data)
-        elif task_type == "list":
-            return self._is_valid_list_response(response_data)
-
-        return True
-
-    def _is_valid_detail_response(self, response_data: dict) -> bool:
-        """验证详情页响应数据的有效性"""
-        data = response_data.get("data", {})
-        if not data:
-            return False
-
-        # 检查是否包含价格信息
-        sale_room_map = data.get("saleRoomMap", {})
-        if not sale_room_map:
-            return False
-
-        # 检查第一个房型是否有价格信息
-        first_room = list(sale_room_map.values())[0]
-        price_info = first_room.get("priceInfo", {})
-        display_price = price_info.get("displayPrice", "")
-
-        return bool(display_price and display_price.startswith("¥"))
-
-    def _is_valid_list_response(self, response_data: dict) -> bool:
-        """验证列表页响应数据的有效性"""
-        data = response_data.get("data", {})
-        if not data:
-            return False
-
-        # 检查是否包含酒店列表
-        hotel_list = data.get("hotelList", [])
-        return len(hotel_list) > 0
+        return validate_response(response_data, task_type).ok
 
     async def list_spider(self, task: dict):
         """
@@ -427,9 +412,9 @@ class CrawlerByAuto:
                 "check_out": task.get("check_out"),
                 "task_type": "list",
                 "status_code": response.status_code,
-                "response": json.dumps(response.json()),
+                "response": response.json(),
             }
-            self.save_to_mongo("ctrip_list_results", save_data)
+            await self.save_to_mongo("ctrip_list_results", save_data)
 
             return response.json()
 
@@ -443,9 +428,9 @@ class CrawlerByAuto:
                 "check_out": task.get("check_out"),
                 "task_type": "list",
                 "status_code": 500,
-                "response": json.dumps({"error": str(e)}),
+                "response": {"error": str(e)},
             }
-            self.save_to_mongo("ctrip_list_results", save_data)
+            await self.save_to_mongo("ctrip_list_results", save_data)
             return None
 
         finally:
@@ -471,11 +456,11 @@ class CrawlerByAuto:
                     "check_out": task.get("check_out"),
                     "task_type": "detail",
                     "status_code": 404,
-                    "response": json.dumps({"msg": "搜索不到酒店"}),
+                    "response": {"msg": "搜索不到酒店"},
                     "success": False,
                     "need_cancel": False  # 不需要取消任务
                 }
-                self.save_to_mongo("ctrip_detail_results", save_data)
+                await self.save_to_mongo("ctrip_detail_results", save_data)
                 return {"status": "failed", "need_cancel": False}
 
             hotel_info["fetch_detail"] = "true"
@@ -493,7 +478,8 @@ class CrawlerByAuto:
             session = await self.get_session()
             try:
                 async with session.get(url, headers=headers) as response:
-                    response_data = await response.json()
+                    # 只解析下游用到的 physicRoomMap / saleRoomMap 等字段（可选 ijson 流式解析）
+                    response_data = await read_detail_response(response)
 
                     # 检查是否是305错误
                     if self.is_305_error(response_data):
@@ -505,12 +491,12 @@ class CrawlerByAuto:
                             "check_out": task.get("check_out"),
                             "task_type": "detail",
                             "status_code": response.status,
-                            "response": json.dumps(response_data),
+                            "response": response_data,
                             "success": False,
                             "need_cancel": True,  # 标记需要取消任务
                             "server_code": 305
                         }
-                        self.save_to_mongo("ctrip_detail_results", save_data)
+                        await self.save_to_mongo("ctrip_detail_results", save_data)
                         return {"status": "failed", "need_cancel": True, "code": 305}
 
                     # 正常处理其他情况
@@ -524,13 +510,13 @@ class CrawlerByAuto:
                         "check_out": task.get("check_out"),
                         "task_type": "detail",
                         "status_code": response.status,
-                        "response": json.dumps(response_data),
+                        "response": response_data,
                         "success": is_success,
                         "need_cancel": False,  # 其他情况不需要取消
                         "server_code": response_data.get("code") if isinstance(response_data, dict) else None
                     }
 
-                    self.save_to_mongo("ctrip_detail_results", save_data)
+                    await self.save_to_mongo("ctrip_detail_results", save_data)
                     return {"status": "success" if is_success else "failed", "need_cancel": False}
 
             except Exception as e:
@@ -542,11 +528,11 @@ class CrawlerByAuto:
                     "check_out": task.get("check_out"),
                     "task_type": "detail",
                     "status_code": 500,
-                    "response": json.dumps({"error": str(e)}),
+                    "response": {"error": str(e)},
                     "success": False,
                     "need_cancel": False
                 }
-                self.save_to_mongo("ctrip_detail_results", save_data)
+                await self.save_to_mongo("ctrip_detail_results", save_data)
                 return {"status": "failed", "need_cancel": False}
 
         except Exception as e:
@@ -558,11 +544,11 @@ class CrawlerByAuto:
                 "check_out": task.get("check_out"),
                 "task_type": "detail",
                 "status_code": 500,
-                "response": json.dumps({"error": str(e)}),
+                "response": {"error": str(e)},
                 "success": False,
                 "need_cancel": False
             }
-            self.save_to_mongo("ctrip_detail_results", save_data)
+            await self.save_to_mongo("ctrip_detail_results", save_data)
             return {"status": "failed", "need_cancel": False}
         finally:
             if task_id in self.processing_detail_tasks:
@@ -571,56 +557,47 @@ class CrawlerByAuto:
 
     def is_305_error(self, response_data: dict) -> bool:
         """检查是否是305错误（需要取消任务的错误）"""
-        if not response_data or not isinstance(response_data, dict):
-            return False
-        return response_data.get("code") == 305
+        return validate_response(response_data, "detail") is Verdict.SERVER_305
 
     def is_successful_response(self, response_data: dict) -> bool:
-        """
-        根据服务器响应判断是否成功
-        服务器成功响应：包含完整的data结构，没有code字段或code为200
-        服务器失败响应：{"code": 301/303/304/305/306/307, "data": {}, "msg": "错误信息"}
-        """
-        if not response_data:
-            return False
-
-        # 如果包含错误码，说明是失败响应
-        if "code" in response_data:
-            error_code = response_data.get("code")
-            # 只有没有code字段或者code为200才是成功响应
-            return error_code == 200
-
-        # 检查是否包含成功的数据结构
-        if "data" in response_data:
-            data = response_data["data"]
-            # 对于详情任务，检查是否包含价格信息
-            if data and "saleRoomMap" in data:
-                sale_room_map = data.get("saleRoomMap", {})
-                if sale_room_map:
-                    # 检查第一个房型是否有价格信息
-                    first_room = list(sale_room_map.values())[0]
-                    price_info = first_room.get("priceInfo", {})
-                    display_price = price_info.get("displayPrice", "")
-                    if display_price and display_price.startswith("¥"):
-                        return True
-
-        return False
+        """根据服务器响应判断详情数据是否完整"""
+        return validate_response(response_data, "detail").ok
 
     async def close(self):
         """关闭 session"""
         if self.session:
             await self.session.close()
+        await self.aredis.close()
+        if self.async_mongo is not None:
+            await self.async_mongo.close()
+        # 写入缓冲区中剩余的结果
+        await asyncio.get_running_loop().run_in_executor(None, self.result_writer.close)
+        self.fetch_executor.shutdown(wait=False)
 
     async def get_proxy(self):
 
         while True:
-            proxy_set = self.redis.smembers(self.proxy_set)
+            proxy_set = await self.aredis.smembers(self.proxy_set)
             if proxy_set:
                 break
             logger.warning("代理池为空，等待投放")
             await asyncio.sleep(5)
         return "http://" + list(proxy_set)[0]
 
+    async def fetch(self, request: Request):
+        """
+        非阻塞地执行 Downloader.fetch：同步请求在线程池中运行，事件循环继续调度其他协程；
+        同一 host 的在途请求数受 DOWNLOADER_PER_HOST_LIMIT 限制
+        """
+        host = urlparse(request.url).netloc
+        semaphore = self.host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.host_semaphores[host] = asyncio.Semaphore(settings.DOWNLOADER_PER_HOST_LIMIT)
+
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.fetch_executor, self.downloader.fetch, request)
+
     async def send_request(self, url: str, method: str = "GET", params: dict = None,
                            body: Optional[Union[str, dict]] = None, headers: dict = None, proxy: str = None):
         """
@@ -633,15 +610,13 @@ class CrawlerByAuto:
             request = Request(url=url, method=method, headers=headers, params=params, body=body, timeout=20,
                               proxies=proxies
                               )
-            response = self.downloader.fetch(request)  # 使用 Downloader
+            response = await self.fetch(request)  # 线程池中执行 Downloader
             if response.status_code == 200:
                 break
             elif response.status_code == -1 and response.error == "ProxyError":
 
                 logger.info("代理失效，等待切换")
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, self.redis.srem, self.proxy_set,
-                                           proxies.replace("http://", ''))  # 异步调用同步方法
+                await self.aredis.srem(self.proxy_set, proxies.replace("http://", ''))
                 await asyncio.sleep(2)
             elif response.error == "ConnectionError":
                 logger.warning(f"连接错误，继续重试")
@@ -655,44 +630,102 @@ class CrawlerByAuto:
 
         return response
 
-    async def listen_queues(self):
-        while True:
-            # 检查列表任务队列
-            list_task = self.redis.spop('ctrip_list_queue')
-            if list_task:
-                task = json.loads(list_task)
-                task_id = self._get_task_identifier(task, "list")
-
-                # 检查任务是否已经在处理中
-                if task_id not in self.processing_list_tasks:
-                    self.processing_list_tasks.add(task_id)
-                    logger.info(f"从 list 队列获取任务（异步执行）: {task_id}")
-                    asyncio.create_task(self.list_spider(task))
-                else:
-                    logger.info(f"列表任务 {task_id} 正在处理中，跳过重复执行")
-                    # 如果任务正在处理，把任务放回队列稍后重试
-                    # await self.redis.sadd('ctrip_list_queue', list_task)
-                    await asyncio.sleep(5)  # 等待一段时间再检查
-
-            # 检查详情任务队列
-            detail_task = self.redis.spop('ctrip_detail_queue_v3')
-            if detail_task:
-                task = json.loads(detail_task)
-                task_id = self._get_task_identifier(task, "detail")
-
-                # 检查任务是否已经在处理中
-                if task_id not in self.processing_detail_tasks:
-                    self.processing_detail_tasks.add(task_id)
-                    logger.info(f"从 detail 队列获取任务（异步执行）: {task_id}")
-                    asyncio.create_task(self.detail_spider(task))
-                else:
-                    logger.info(f"详情任务 {task_id} 正在处理中，跳过重复执行")
-                    # 如果任务正在处理，把任务放回队列稍后重试
-                    # await self.redis.sadd('ctrip_detail_queue', detail_task)
-                    await asyncio.sleep(5)  # 等待一段时间再检查
-
-            await asyncio.sleep(1)
+    async def _consume(self, queue: AsyncTaskQueue, task_id: str, coro):
+        """执行任务，完成后确认并释放并发名额"""
+        try:
+            await coro
+        except asyncio.CancelledError:
+            # 被取消的任务不确认，租约过期后由其他进程重新执行
+            raise
+        except Exception as e:
+            logger.error(f"任务 {task_id} 执行异常: {e}")
+            await queue.ack(task_id)
+        else:
+            await queue.ack(task_id)
+        finally:
+            self.semaphore.release()
 
+    async def _queue_consumer(self, queue: AsyncTaskQueue, spider, processing: set):
+        """
+        单个队列的消费者：先占并发名额，再阻塞领取任务（BLMOVE），领取到后交给事件循环并发执行
+        """
+        while not self.stopping.is_set():
+            await self.semaphore.acquire()
+            try:
+                claimed = await queue.claim(timeout=settings.TASK_QUEUE_BLOCK_TIMEOUT)
+            except asyncio.CancelledError:
+                self.semaphore.release()
+                raise
+            except Exception as e:
+                self.semaphore.release()
+                logger.error(f"{queue.name} 领取任务失败: {e}")
+                await asyncio.sleep(2)
+                continue
+
+            if not claimed:
+                self.semaphore.release()
+                continue
+
+            task_id, task = claimed
+            processing.add(task_id)
+            logger.info(f"从 {queue.name} 获取任务（异步执行）: {task_id}")
+            future = asyncio.create_task(self._consume(queue, task_id, spider(task)))
+            self.in_flight.add(future)
+            future.add_done_callback(self.in_flight.discard)
+
+    async def _reap_expired(self):
+        """定期回收租约过期的任务"""
+        while not self.stopping.is_set():
+            for queue in (self.list_queue, self.detail_queue):
+                try:
+                    await queue.requeue_expired()
+                except Exception as e:
+                    logger.warning(f"{queue.name} 回收过期任务失败: {e}")
+            await asyncio.sleep(settings.TASK_QUEUE_REAP_INTERVAL)
+
+    def stop(self):
+        """停止领取新任务，在途任务继续执行完毕"""
+        if self.stopping and not self.stopping.is_set():
+            logger.info("收到停止信号，停止领取新任务，等待在途任务完成")
+            self.stopping.set()
+
+    async def listen_queues(self, concurrency: int = settings.CRAWLER_CONCURRENCY):
+        """
+        监听列表/详情两个队列
+        :param concurrency: 同时执行的任务上限
+        """
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.stopping = asyncio.Event()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows 不支持 add_signal_handler
+                pass
+
+        consumers = [
+            asyncio.create_task(self._queue_consumer(self.list_queue, self.list_spider, self.processing_list_tasks)),
+            asyncio.create_task(self._queue_consumer(self.detail_queue, self.detail_spider, self.processing_detail_tasks)),
+            asyncio.create_task(self._reap_expired()),
+        ]
+
+        try:
+            await self.stopping.wait()
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+
+            # 优雅退出：等待在途任务完成，超时的任务取消后不确认，由租约机制重新投递
+            if self.in_flight:
+                logger.info(f"等待 {len(self.in_flight)} 个在途任务完成")
+                done, pending = await asyncio.wait(set(self.in_flight), timeout=settings.CRAWLER_DRAIN_TIMEOUT)
+                for future in pending:
+                    future.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            await self.close()
 
 if __name__ == '__main__':
     crawler = CrawlerByAuto()
@@ -1,8 +1,9 @@
 import asyncio
 import re
+import time
 
 import redis
-import json
+import redis.asyncio
 from typing import Optional, Union
 
 from datetime import datetime
@@ -12,14 +13,22 @@ from bricks import Request
 from bricks.downloader.go_requests import Downloader
 from bricks.utils.fake import user_agent
 
-from db.mongo import MongoClientSingleton
+from config import settings
+from db.mongo import AsyncMongoClient, AsyncMongoClientSingleton, MongoClientSingleton
 from scheduler import REDIS_HOST, REDIS_PORT, REDIS_DB
+from utils.result_channel import ResultChannel
 from utils.chrome_tls_profiles import get_random_chrome_tls_config
+from utils import json_codec
+from utils.hotel_cache import HotelInfoCache
+from utils.response_codec import encode_response
+from utils.buffered_writer import BufferedWriter
+from utils.task_queue import AsyncTaskQueue
 
 
 class Crawler:
     def __init__(self, redis_host: str = REDIS_HOST, redis_port: int = REDIS_PORT, redis_db: int = REDIS_DB):
         self.redis = redis.StrictRedis(host=redis_host, port=redis_port, db=redis_db, decode_responses=True)
+        self.aredis = redis.asyncio.StrictRedis(host=redis_host, port=redis_port, db=redis_db, decode_responses=True)
         self.proxy_set = "proxy_pool"  # 假设这是存储代理的 Redis 集合
         self.tls_config = get_random_chrome_tls_config()
         self.downloader = Downloader(tls_config=self.tls_config)  # 使用 Downloader
@@ -28,6 +37,14 @@ class Crawler:
 
         # ✅ 初始化 MongoDB
         self.mongo = MongoClientSingleton(db_name="ctrip")
+        # 异步 Mongo 客户端（pymongo >= 4.9）：酒店信息缓存在事件循环中直接查询，未安装时回落到线程池
+        self.async_mongo = AsyncMongoClientSingleton(db_name="ctrip") if AsyncMongoClient is not None else None
+        # 酒店基础信息缓存，命中后跳过关键词搜索
+        self.hotel_cache = HotelInfoCache(self.mongo, async_mongo=self.async_mongo)
+        # 结果落库后通知调度器
+        self.result_channel = ResultChannel(redis_host=redis_host, redis_port=redis_port, redis_db=redis_db)
+        # 结果批量写入，写入后推送完成通知
+        self.result_writer = BufferedWriter(self.mongo, on_flush=self._on_results_flushed)
 
     @staticmethod
     async def extract_json_from_html(html_text):
@@ -42,9 +59,9 @@ class Crawler:
             json_str = match.group(1)
             try:
                 # 尝试解析JSON
-                json_data = json.loads(json_str)
+                json_data = json_codec.loads(json_str)
                 return json_data
-            except json.JSONDecodeError as e:
+            except ValueError as e:
                 print(f"JSON解析错误: {e}")
                 return None
         else:
@@ -61,6 +78,15 @@ class Crawler:
         """
         hotel_info = {}
         hotel_name = task["hotel_name"]
+
+        identity = await self.hotel_cache.get_async(hotel_name)
+        if identity is not None:
+            return {
+                "city_id": identity["city_id"],
+                "hotel_id": identity["hotel_id"],
+                "city_name": identity["city_name"],
+            }
+
         body = {
             "action": "online",
             "source": "globalonline",
@@ -96,6 +122,10 @@ class Crawler:
                 "hotel_id": data_dict["id"],
                 "city_name": data_dict["cityName"],
             }
+            await self.hotel_cache.set_async(hotel_name, {
+                **hotel_info,
+                "province_name": data_dict.get("districtName", ""),
+            })
 
             await asyncio.sleep(2)
         except:
@@ -104,17 +134,22 @@ class Crawler:
         return hotel_info
 
 
-    def save_to_mongo(self, collection_name: str, data: dict):
+    async def save_to_mongo(self, collection_name: str, data: dict):
         """
-        同步方式写入 MongoDB
+        写入 MongoDB（批量延迟写入）
         """
 
         now = datetime.now()
         data["date"] = now.strftime("%Y-%m-%d")  # 当天日期
-        data["created_at"] = now.strftime("%Y-%m-%d %H:%M:%S")  # 完整时间字符串
+        data["created_at"] = now  # 存为日期类型，供 TTL 索引使用
+        data.update(encode_response(data.get("response") or {}))
 
-        self.mongo.update(collection_name, data, query={"date": data["date"], "hotel_name": data["hotel_name"], "check_in": data["check_in"], "check_out": data["check_out"] }, upsert=True)
+        self.result_writer.add(collection_name, data)
 
+    def _on_results_flushed(self, collection_name: str, records: list):
+        """批量写入完成后推送完成通知，运行在写入线程中"""
+        for data in records:
+            self.result_channel.publish(collection_name, data, date=data["date"])
 
     async def list_spider(self, task: dict):
         """
@@ -337,9 +372,9 @@ class Crawler:
             "check_out": task.get("check_out"),
             "task_type": "list",
             "status_code": response.status_code,
-            "response": json.dumps(response.json()),
+            "response": response.json(),
         }
-        self.save_to_mongo("ctrip_list_results", save_data)
+        await self.save_to_mongo("ctrip_list_results", save_data)
 
 
         return response.json()
@@ -361,7 +396,7 @@ class Crawler:
                 "check_out": task.get("check_out"),
                 "task_type": "detail",
                 "status_code": 404,
-                "response": json.dumps({"msg": "搜索不到酒店"}),
+                "response": {"msg": "搜索不到酒店"},
             }
         else:
             url = "https://m.ctrip.com/restapi/soa2/33278/getHotelRoomListInland"
@@ -497,9 +532,9 @@ class Crawler:
                 "check_out": task.get("check_out"),
                 "task_type": "detail",
                 "status_code": response.status_code,
-                "response": json.dumps(response.json()),
+                "response": response.json(),
             }
-        self.save_to_mongo("ctrip_detail_results", save_data)
+        await self.save_to_mongo("ctrip_detail_results", save_data)
         return True
 
     async def get_proxy(self):
@@ -548,24 +583,40 @@ class Crawler:
     async def listen_queues(self):
         """
         监听两个队列，处理任务
-        :return:
-        """
-        while True:
-            list_task = self.redis.spop('ctrip_list_queue')
-            if list_task:
-                print("从list队列获取任务")
-                task = json.loads(list_task)
-                await self.list_spider(task)
-
-            detail_task = self.redis.spop('ctrip_detail_queue')
-            if detail_task:
-                print("从detail队列获取任务")
-                task = json.loads(detail_task)
-                await self.detail_spider(task)
 
-            # 休眠一段时间再去监听队列
-            await asyncio.sleep(1)
+        队列为 TaskQueue（{name}:pending / processing / leases / payloads），与调度器投放的结构一致；
+        任务执行完成后确认，进程中途退出时未确认的任务在租约过期后重新投递
+        """
+        list_queue = AsyncTaskQueue("ctrip_list_queue", self.aredis)
+        detail_queue = AsyncTaskQueue("ctrip_detail_queue", self.aredis)
+        last_reap = 0.0
 
+        while True:
+            if time.time() - last_reap >= settings.TASK_QUEUE_REAP_INTERVAL:
+                last_reap = time.time()
+                for queue in (list_queue, detail_queue):
+                    try:
+                        await queue.requeue_expired()
+                    except Exception as e:
+                        logger.warning(f"{queue.name} 回收过期任务失败: {e}")
+
+            claimed_any = False
+            for queue, spider in ((list_queue, self.list_spider), (detail_queue, self.detail_spider)):
+                claimed = await queue.claim()
+                if not claimed:
+                    continue
+                claimed_any = True
+                task_id, task = claimed
+                logger.info(f"从 {queue.name} 获取任务: {task_id}")
+                try:
+                    await spider(task)
+                except Exception as e:
+                    logger.error(f"任务 {task_id} 执行异常: {e}")
+                await queue.ack(task_id)
+
+            # 两个队列都为空时休眠一段时间再去监听队列
+            if not claimed_any:
+                await asyncio.sleep(1)
 
 if __name__ == '__main__':
     crawler = Crawler()
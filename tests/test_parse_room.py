@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+from parse_detail import parse_room
+from parse_list import parse_hotel
+
+
+# 房型列表接口（getHotelRoomListInland）响应与对应的期望解析结果
+# 期望结果由按物理房型逐个扫描 saleRoomMap 的原始实现生成，单次分组实现的输出必须与之完全一致
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+
+CASES = [
+    "hotel_room_list_basic",
+    # 重复的 physicalRoomId、字符串 / 整数 id 不匹配、找不到物理房型的售卖房型、缺失或无效的价格
+    "hotel_room_list_edge_cases",
+]
+
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_golden(name: str) -> dict:
+    with open(os.path.join(GOLDEN_DIR, f"{name}.expected.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def as_json(rooms, dialogs) -> dict:
+    # 经过一次 JSON 序列化，与 golden 文件的类型保持一致（如 tuple → list）
+    return json.loads(json.dumps({
+        "rooms": [r.to_dict() for r in rooms],
+        "dialogs": [d.to_dict() for d in dialogs],
+    }, ensure_ascii=False))
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_parse_room_matches_golden(name):
+    rooms, dialogs = parse_room(json_content=load_fixture(name))
+    assert as_json(rooms, dialogs) == load_golden(name)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_parse_room_from_file(name):
+    rooms, dialogs = parse_room(file_path=os.path.join(FIXTURE_DIR, f"{name}.json"))
+    assert as_json(rooms, dialogs) == load_golden(name)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_parse_hotel_matches_golden(name):
+    rooms, dialogs = parse_hotel(json_content=load_fixture(name))
+    assert as_json(rooms, dialogs) == load_golden(name)
@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from loguru import logger
+
+from config import settings
+
+
+class Bookkeeper:
+    """
+    任务收尾记录的后台执行器：task_log 写入、cookie 使用统计、截图缓存 OSS key 登记等
+
+    这些操作不影响平台上的任务状态，流水线模式下提交完成后交给后台线程执行，
+    账号线程立即领取下一个任务并投放爬虫，记录写入与下一个任务的抓取重叠。
+    积压的记录数超过 max_pending 时 defer 阻塞等待，避免 Mongo 变慢时内存无限增长。
+
+    使用示例：
+        # >>> bookkeeper = get_bookkeeper()
+        # >>> bookkeeper.defer(mongo.write, "task_log", doc)
+        # >>> bookkeeper.flush()
+    """
+
+    def __init__(self, max_workers: int = settings.BOOKKEEPING_WORKERS,
+                 max_pending: int = settings.BOOKKEEPING_MAX_PENDING):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bookkeeping")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def defer(self, func: Callable, *args, **kwargs) -> Future:
+        """提交一条记录操作，异常只记录日志，不影响调用方"""
+        self._slots.acquire()
+        try:
+            future = self.executor.submit(self._run, func, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def flush(self, timeout: float = None):
+        """等待已提交的记录全部写完"""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.exception(timeout)
+
+    @staticmethod
+    def _run(func: Callable, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"后台记录 {getattr(func, '__name__', func)} 失败: {e}")
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+
+_bookkeeper: Optional[Bookkeeper] = None
+_bookkeeper_lock = threading.Lock()
+
+
+def get_bookkeeper() -> Bookkeeper:
+    """进程内共享的收尾记录执行器，所有账号共用"""
+    global _bookkeeper
+    with _bookkeeper_lock:
+        if _bookkeeper is None:
+            _bookkeeper = Bookkeeper()
+        return _bookkeeper
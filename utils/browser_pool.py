@@ -0,0 +1,282 @@
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from config import settings
+
+
+class _Generation:
+    """一代浏览器实例：browser + 按设备划分的 context / 空闲 page"""
+
+    def __init__(self, index: int, browser):
+        self.index = index
+        self.browser = browser
+        self.contexts: Dict[str, Any] = {}
+        self.hooked: Dict[str, int] = {}
+        self.idle: Dict[str, List[Any]] = defaultdict(list)
+        self.in_use = 0
+        self.served = 0
+        self.retired = False
+        self.closed = False
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.browser.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器失败（第 {self.index} 代）: {e}")
+
+
+class BrowserPool:
+    """
+    进程内共享的长驻 Chromium 池，替代每个截图任务 sync_playwright() + chromium.launch()
+
+    Playwright 的同步 API 绑定创建它的线程，无法在账号线程之间共享，
+    因此池在独立线程中运行一个事件循环，使用 async_playwright 驱动浏览器；
+    账号线程通过 run() 把截图协程提交到该事件循环并阻塞等待结果。
+
+    1. 浏览器启动一次长期复用，context 按设备（如 iPhone X）创建并复用
+    2. page 用完放回空闲列表，借出前做健康检查，异常或超过使用次数的 page 直接关闭
+    3. 每个设备同时借出的 page 数有上限，账号之间共享
+    4. 浏览器断开或累计借出 page 达到 BROWSER_RECYCLE_AFTER 后换新一代浏览器，
+       旧浏览器在最后一个 page 归还后关闭，不打断进行中的截图
+
+    使用示例：
+        # >>> pool = get_browser_pool()
+        # >>> async def capture(pool):
+        # ...     async with pool.page("iPhone X") as page:
+        # ...         await page.set_content(html)
+        # ...         await page.screenshot(path="a.png")
+        # >>> pool.run(capture(pool))
+    """
+
+    def __init__(self, headless: bool = settings.BROWSER_HEADLESS,
+                 pages_per_device: int = settings.BROWSER_PAGES_PER_DEVICE,
+                 page_max_uses: int = settings.BROWSER_PAGE_MAX_USES,
+                 recycle_after: int = settings.BROWSER_RECYCLE_AFTER):
+        self.headless = headless
+        self.pages_per_device = pages_per_device
+        self.page_max_uses = page_max_uses
+        self.recycle_after = recycle_after
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+
+        self._playwright = None
+        self._generation: Optional[_Generation] = None
+        self._generations = 0
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._page_uses: Dict[Any, int] = {}
+        self._context_hooks: List[Callable[[Any], Awaitable]] = []
+        self._closed = False
+
+    # ---------------- 同步入口（账号线程调用） ----------------
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """把协程提交到浏览器池的事件循环，不等待结果；其他事件循环可以用 asyncio.wrap_future 等待"""
+        if self._closed:
+            raise RuntimeError("浏览器池已关闭")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Awaitable, timeout: float = None):
+        """在浏览器池的事件循环中执行协程，阻塞等待结果"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def add_context_hook(self, hook: Callable[[Any], Awaitable]):
+        """注册 context 初始化协程（如安装路由拦截），新建的 context 都会执行，重复注册只生效一次"""
+        if hook not in self._context_hooks:
+            self._context_hooks.append(hook)
+
+    def close(self, timeout: float = 30):
+        """关闭所有浏览器并停止事件循环"""
+        if self._closed:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"关闭浏览器池失败: {e}")
+        self._closed = True
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    # ---------------- 异步接口（在池的事件循环中调用） ----------------
+
+    @asynccontextmanager
+    async def page(self, device: str = settings.BROWSER_DEVICE) -> AsyncIterator[Any]:
+        """借出一个指定设备的 page，退出时归还；块内抛出异常的 page 不再复用"""
+        slot = self._slots.setdefault(device, asyncio.Semaphore(self.pages_per_device))
+        async with slot:
+            generation, page = await self._acquire(device)
+            broken = False
+            try:
+                yield page
+            except BaseException:
+                broken = True
+                raise
+            finally:
+                await self._release(generation, device, page, broken)
+
+    async def _acquire(self, device: str):
+        generation = await self._current_generation()
+        # 先占用，防止获取 page 期间这一代被回收关闭
+        generation.in_use += 1
+        try:
+            page = await self._take_page(generation, device)
+        except BaseException:
+            generation.in_use -= 1
+            if generation.retired and generation.in_use == 0:
+                await self._close_generation(generation)
+            raise
+
+        generation.served += 1
+        if self.recycle_after and generation.served >= self.recycle_after and not generation.retired:
+            # 借出数达到上限，后续借用换新一代浏览器
+            generation.retired = True
+            if self._generation is generation:
+                self._generation = None
+            logger.info(f"浏览器第 {generation.index} 代已借出 {generation.served} 个 page，准备回收")
+        return generation, page
+
+    async def _take_page(self, generation: _Generation, device: str):
+        idle = generation.idle[device]
+        while idle:
+            page = idle.pop()
+            if await self._healthy(page):
+                return page
+            await self._discard(page)
+
+        context = generation.contexts.get(device)
+        if context is None:
+            context = await generation.browser.new_context(**self._playwright.devices[device])
+            generation.contexts[device] = context
+        # context 创建之后才注册的 hook 也补上
+        hooked = generation.hooked.get(device, 0)
+        for hook in self._context_hooks[hooked:]:
+            await hook(context)
+        generation.hooked[device] = len(self._context_hooks)
+        page = await context.new_page()
+        self._page_uses[page] = 0
+        return page
+
+    async def _release(self, generation: _Generation, device: str, page, broken: bool):
+        generation.in_use -= 1
+        self._page_uses[page] = self._page_uses.get(page, 0) + 1
+
+        reusable = (
+            not broken
+            and not generation.retired
+            and self._page_uses[page] < self.page_max_uses
+            and not page.is_closed()
+        )
+        if reusable:
+            generation.idle[device].append(page)
+        else:
+            await self._discard(page)
+
+        if generation.retired and generation.in_use == 0:
+            await self._close_generation(generation)
+
+    async def _current_generation(self) -> _Generation:
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+        async with self._launch_lock:
+            generation = self._generation
+            if generation is not None and generation.browser.is_connected():
+                return generation
+
+            if generation is not None:
+                # 浏览器已断开（崩溃或被系统杀掉），丢弃整代
+                logger.warning(f"浏览器第 {generation.index} 代已断开，重新启动")
+                generation.retired = True
+                for pages in generation.idle.values():
+                    for page in pages:
+                        self._page_uses.pop(page, None)
+                generation.idle.clear()
+                if generation.in_use == 0:
+                    await generation.close()
+
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+
+            self._generations += 1
+            browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._generation = _Generation(self._generations, browser)
+            logger.info(f"🚀 启动浏览器第 {self._generations} 代（headless={self.headless}）")
+            return self._generation
+
+    async def _close_generation(self, generation: _Generation):
+        if generation.closed:
+            return
+        for pages in generation.idle.values():
+            for page in pages:
+                self._page_uses.pop(page, None)
+        generation.idle.clear()
+        await generation.close()
+        logger.info(f"浏览器第 {generation.index} 代已关闭，累计借出 {generation.served} 个 page")
+
+    @staticmethod
+    async def _healthy(page) -> bool:
+        if page.is_closed():
+            return False
+        try:
+            return await asyncio.wait_for(page.evaluate("1 + 1"), settings.BROWSER_HEALTH_CHECK_TIMEOUT) == 2
+        except Exception:
+            return False
+
+    async def _discard(self, page):
+        self._page_uses.pop(page, None)
+        try:
+            if not page.is_closed():
+                await page.close()
+        except Exception:
+            pass
+
+    async def _shutdown(self):
+        generation, self._generation = self._generation, None
+        if generation is not None:
+            await self._close_generation(generation)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self) -> Dict[str, Any]:
+        """当前一代浏览器的使用统计"""
+        generation = self._generation
+        if generation is None:
+            return {"generation": self._generations, "in_use": 0, "idle": 0, "served": 0}
+        return {
+            "generation": generation.index,
+            "in_use": generation.in_use,
+            "idle": sum(len(p) for p in generation.idle.values()),
+            "served": generation.served,
+        }
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """进程内共享的浏览器池，首次调用时创建，进程退出时关闭"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
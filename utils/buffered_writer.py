@@ -0,0 +1,212 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import settings
+from db.mongo import MongoClientSingleton
+
+
+class BufferedWriter:
+    """
+    爬虫结果的批量延迟写入（write-behind），基于 MongoClientSingleton.write（bulk_write）
+
+    1. add() 只把记录放进内存缓冲区，不产生 IO，可直接在事件循环中调用
+    2. 同一 (collection, *query_fields) 的多次写入在缓冲区内合并，只保留最后一次；
+       缓冲区中已有的有效结果（is_valid=True）不会被之后的无效结果覆盖
+    3. 后台线程在记录数达到 batch_size 或距上次写入超过 interval 秒时，按集合各做一次 bulk_write
+    4. 写入完成后回调 on_flush(collection, records)，用于向调度器推送完成通知
+    5. 整批写入失败（网络抖动、主节点切换等）时记录放回缓冲区，按指数退避重试，
+       同一记录最多重试 max_retries 次，超过后丢弃并记录错误日志
+
+    guard 为覆盖已有记录的条件，例如 {"is_valid": {"$ne": True}} 表示库中已有有效结果时不覆盖：
+    先用 $setOnInsert upsert 插入库中没有的记录，再对其余记录执行带 guard 条件的 $set（不 upsert），
+    结果不依赖唯一索引是否存在，也不会因为 guard 过滤不到文档而插入重复记录。
+
+    使用示例：
+        # >>> writer = BufferedWriter(query=["date", "hotel_name", "check_in", "check_out"])
+        # >>> writer.add("ctrip_detail_results", data)
+        # >>> writer.flush()  # 同步写入缓冲区中的全部记录
+        # >>> writer.close()
+    """
+
+    def __init__(self, mongo: MongoClientSingleton = None, query: List[str] = None, guard: Dict = None,
+                 on_flush: Callable[[str, List[Dict]], None] = None,
+                 batch_size: int = settings.RESULT_WRITE_BATCH_SIZE,
+                 interval: float = settings.RESULT_WRITE_FLUSH_INTERVAL,
+                 max_retries: int = settings.RESULT_WRITE_MAX_RETRIES,
+                 retry_backoff: float = settings.RESULT_WRITE_RETRY_BACKOFF):
+        self.mongo = mongo or MongoClientSingleton(db_name="ctrip")
+        self.query = query or ["date", "hotel_name", "check_in", "check_out"]
+        self.guard = guard or {}
+        self.on_flush = on_flush
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._buffer: Dict[Tuple, Tuple[str, Dict]] = {}  # (collection, *query 值) → (collection, record)
+        self._attempts: Dict[Tuple, int] = {}  # 整批写入失败后放回缓冲区的记录 → 已失败次数
+        self._failures = 0  # 连续整批失败次数，决定退避时间
+        self._retry_at = 0.0  # 退避结束时间（time.monotonic），之前后台线程不写入
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 保证同一时刻只有一个线程在写
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mongo-buffered-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, collection: str, record: Dict):
+        """放入缓冲区，按 query 字段合并"""
+        key = self._key(collection, record)
+        with self._lock:
+            buffered = self._buffer.get(key)
+            if buffered and buffered[1].get("is_valid") and not record.get("is_valid"):
+                logger.info(f"缓冲区已有有效结果，忽略无效结果: {key}")
+                return
+            self._buffer[key] = (collection, dict(record))
+            size = len(self._buffer)
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def _key(self, collection: str, record: Dict) -> Tuple:
+        return (collection, *(record.get(field) for field in self.query))
+
+    def flush(self):
+        """同步写入缓冲区中的全部记录，返回后数据已落库、通知已推送；整批失败的记录放回缓冲区等待重试"""
+        with self._flush_lock:
+            with self._lock:
+                buffer, self._buffer = self._buffer, {}
+            if not buffer:
+                return
+
+            grouped: Dict[str, List[Dict]] = {}
+            for collection, record in buffer.values():
+                grouped.setdefault(collection, []).append(record)
+            for collection, records in grouped.items():
+                self._write(collection, records)
+
+    def _write(self, collection: str, records: List[Dict]):
+        if self.guard:
+            failed = self._write_guarded(collection, records)
+        else:
+            failed = self._bulk(collection, records)
+        if failed is None:
+            self._requeue(collection, records)
+            return
+
+        with self._lock:
+            self._failures, self._retry_at = 0, 0.0
+            for record in records:
+                self._attempts.pop(self._key(collection, record), None)
+
+        written = [record for index, record in enumerate(records) if index not in failed]
+        logger.info(f"批量写入 {collection}: {len(written)}/{len(records)} 条")
+        if self.on_flush and written:
+            try:
+                self.on_flush(collection, written)
+            except Exception as e:
+                logger.warning(f"写入回调执行失败: {e}")
+
+    def _requeue(self, collection: str, records: List[Dict]):
+        """整批写入失败：放回缓冲区并设置退避时间；缓冲区中已有同 key 的新记录时以新记录为准"""
+        dropped = 0
+        with self._lock:
+            self._failures += 1
+            delay = min(self.retry_backoff * 2 ** (self._failures - 1), settings.RESULT_WRITE_RETRY_MAX_DELAY)
+            self._retry_at = time.monotonic() + delay
+            for record in records:
+                key = self._key(collection, record)
+                buffered = self._buffer.get(key)
+                if buffered and (buffered[1].get("is_valid") or not record.get("is_valid")):
+                    self._attempts.pop(key, None)  # 失败期间又收到了新记录，按新记录重新计数
+                    continue
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts > self.max_retries:
+                    self._attempts.pop(key, None)
+                    dropped += 1
+                    continue
+                self._attempts[key] = attempts
+                self._buffer[key] = (collection, record)
+        if dropped:
+            logger.error(f"批量写入 {collection} 重试 {self.max_retries} 次仍失败，丢弃 {dropped} 条记录")
+        logger.warning(f"批量写入 {collection} 失败，{len(records) - dropped} 条记录 {delay:.1f}s 后重试")
+
+    def _write_guarded(self, collection: str, records: List[Dict]) -> Optional[Set[int]]:
+        """
+        两步写入，不依赖唯一索引：
+            1. $setOnInsert upsert：库中没有该记录时插入
+            2. 过滤条件加上 guard 的 $set（不 upsert）：只覆盖满足 guard 的已有记录，如库中的无效结果
+        第 1 步新插入的记录跳过第 2 步
+        """
+        inserted: Set[int] = set()
+        failed = self._bulk(collection, records, inserted=inserted, action="$setOnInsert", ignore_duplicates=True)
+        if failed is None:
+            return None
+
+        guard = self.guard
+
+        def update_op(filter, update, upsert):
+            return UpdateOne({**filter, **guard}, update, upsert=upsert)
+
+        pending = [index for index in range(len(records)) if index not in inserted and index not in failed]
+        if pending:
+            failed_update = self._bulk(collection, [records[i] for i in pending], update_op=update_op, upsert=False)
+            if failed_update is None:
+                return None
+            failed |= {pending[i] for i in failed_update}
+        return failed
+
+    def _bulk(self, collection: str, records: List[Dict], inserted: Set[int] = None,
+              ignore_duplicates: bool = False, **kwargs) -> Optional[Set[int]]:
+        """
+        一次 bulk_write，返回失败记录的下标；整体失败返回 None
+        :param inserted: 传入时收集被 upsert 新插入的记录下标
+        :param ignore_duplicates: 忽略唯一索引冲突（并发插入同一条记录，另一方已插入）
+        """
+        failed: Set[int] = set()
+        try:
+            result = self.mongo.write(collection, *records, query=self.query, **kwargs)
+            upserted = result.upserted_ids if result else {}
+        except BulkWriteError as e:
+            upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+            for error in e.details.get("writeErrors", []):
+                if ignore_duplicates and error.get("code") == 11000:
+                    continue
+                failed.add(error.get("index"))
+                logger.error(f"批量写入 {collection} 失败: {error.get('errmsg')}")
+        except Exception as e:
+            logger.error(f"批量写入 {collection} 失败: {e}")
+            return None
+
+        if inserted is not None:
+            inserted.update(upserted)
+        return failed
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if time.monotonic() < self._retry_at:
+                continue  # 上次整批写入失败，退避中
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"后台写入线程异常: {e}")
+
+    def close(self, timeout: Optional[float] = None):
+        """停止后台线程并写入剩余记录，写入失败时按退避时间重试，直到写完或超过重试次数"""
+        self._closed.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self.flush()
+        while len(self):
+            time.sleep(max(0.0, self._retry_at - time.monotonic()))
+            self.flush()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buffer)
@@ -0,0 +1,88 @@
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from config import settings
+from utils import json_codec
+
+try:
+    import ijson
+except ImportError:  # 流式解析为可选模式
+    ijson = None
+
+
+# 详情页（getHotelRoomListInland）下游实际用到的字段：
+#   code / msg / error    → 结果校验（305、搜索不到酒店等）
+#   data.physicRoomMap    → parse_room 的物理房型
+#   data.saleRoomMap      → parse_room 的售卖房型，totalPriceInfo 在每个售卖房型内
+TOP_LEVEL_FIELDS = ("code", "msg", "error")
+DATA_FIELDS = ("physicRoomMap", "saleRoomMap")
+_STREAM_PREFIXES = {*TOP_LEVEL_FIELDS, *(f"data.{field}" for field in DATA_FIELDS)}
+
+
+def prune_detail_response(response: Any) -> Any:
+    """只保留下游用到的字段，缩小内存占用和落库体积；非 dict 响应原样返回"""
+    if not isinstance(response, dict):
+        return response
+    pruned = {k: response[k] for k in TOP_LEVEL_FIELDS if k in response}
+    data = response.get("data")
+    if isinstance(data, dict):
+        pruned["data"] = {k: data[k] for k in DATA_FIELDS if k in data}
+    elif "data" in response:
+        pruned["data"] = data
+    return pruned
+
+
+async def _stream_detail_response(content) -> Dict[str, Any]:
+    """
+    基于 ijson 事件流解析：只为需要的字段构建对象，其余字段随读随丢，
+    峰值内存约等于保留字段的大小，而不是完整响应 + 完整对象
+    """
+    result: Dict[str, Any] = {}
+    builder: Optional["ijson.ObjectBuilder"] = None
+    building = None
+
+    async for prefix, event, value in ijson.parse_async(content, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == building and event in ("end_map", "end_array"):
+                _assign(result, building, builder.value)
+                builder = building = None
+            continue
+
+        if prefix == "data" and event == "start_map":
+            result.setdefault("data", {})
+        elif prefix in _STREAM_PREFIXES:
+            if event in ("start_map", "start_array"):
+                builder, building = ijson.ObjectBuilder(), prefix
+                builder.event(event, value)
+            else:
+                _assign(result, prefix, value)
+    return result
+
+
+def _assign(result: Dict[str, Any], prefix: str, value: Any):
+    if prefix.startswith("data."):
+        result.setdefault("data", {})[prefix[len("data."):]] = value
+    else:
+        result[prefix] = value
+
+
+async def read_detail_response(response, mode: str = None, prune: bool = None) -> Any:
+    """
+    读取 aiohttp 详情页响应并解析，替代 `await response.json()`
+
+    :param response: aiohttp.ClientResponse
+    :param mode: full / stream，默认取 settings.DETAIL_PARSE_MODE
+    :param prune: 是否只保留下游用到的字段，默认取 settings.DETAIL_RESPONSE_PRUNE
+    """
+    mode = mode or settings.DETAIL_PARSE_MODE
+    prune = settings.DETAIL_RESPONSE_PRUNE if prune is None else prune
+
+    if mode == "stream" and prune:
+        if ijson is not None:
+            return await _stream_detail_response(response.content)
+        logger.warning("未安装 ijson，详情页响应改为完整解析")
+
+    data = json_codec.loads(await response.read())
+    return prune_detail_response(data) if prune else data
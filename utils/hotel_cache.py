@@ -0,0 +1,171 @@
+import asyncio
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+from loguru import logger
+
+from config import settings
+from db.mongo import AsyncMongoClientSingleton, MongoClientSingleton
+
+
+class HotelInfoCache:
+    """
+    酒店基础信息两级缓存：hotel_name → hotel_id / city_id / city_name / province_name
+
+    1. 进程内 LRU，带 TTL，线程安全
+    2. Mongo 持久化（默认 ctrip.hotel_identity），按规范化后的酒店名作为 _id，进程重启或多进程之间共享
+
+    这些字段对同一家酒店是静态的，命中缓存即可跳过一次关键词搜索请求以及随后的 2s 休眠。
+    传入 async_mongo 时，事件循环中可以用 get_async / set_async 直接查询 / 写入 Mongo，不占用线程池；
+    未传入时这两个方法回落到线程池执行同步版本。
+
+    使用示例：
+        # >>> cache = HotelInfoCache()
+        # >>> identity = cache.get("三亚西岛剑麻酒店")
+        # >>> if identity is None:
+        # ...     identity = {...}  # 远程搜索
+        # ...     cache.set("三亚西岛剑麻酒店", identity)
+        # >>> identity = await cache.get_async("三亚西岛剑麻酒店")  # 协程中
+    """
+    FIELDS = ("hotel_id", "city_id", "city_name", "province_name")
+
+    def __init__(self, mongo: MongoClientSingleton = None, collection: str = "hotel_identity",
+                 max_size: int = settings.HOTEL_CACHE_SIZE, ttl: int = settings.HOTEL_CACHE_TTL,
+                 async_mongo: Optional[AsyncMongoClientSingleton] = None):
+        self.mongo = mongo or MongoClientSingleton(db_name="ctrip")
+        self.async_mongo = async_mongo
+        self.collection = collection
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()  # key → (expire_ts, identity)
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "store_hits": 0, "misses": 0}
+
+    @staticmethod
+    def normalize(hotel_name: str) -> str:
+        """规范化酒店名：全角转半角、去除空白、英文小写"""
+        name = unicodedata.normalize("NFKC", hotel_name or "")
+        return re.sub(r"\s+", "", name).lower()
+
+    def get_local(self, hotel_name: str) -> Optional[Dict]:
+        """只查进程内缓存，不产生 IO，可直接在事件循环中调用"""
+        key = self.normalize(hotel_name)
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            expire_ts, identity = item
+            if expire_ts < time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            self._stats["local_hits"] += 1
+        self._log_stats()
+        return dict(identity)
+
+    def get(self, hotel_name: str) -> Optional[Dict]:
+        """依次查询进程内缓存、Mongo；Mongo 命中后回填进程内缓存"""
+        identity = self.get_local(hotel_name)
+        if identity is not None:
+            return identity
+
+        key = self.normalize(hotel_name)
+        try:
+            doc = self.mongo.find_one(self.collection, {"_id": key})
+        except Exception as e:
+            logger.warning(f"查询酒店信息缓存失败: {e}")
+            doc = None
+        return self._from_store(key, doc)
+
+    async def get_async(self, hotel_name: str) -> Optional[Dict]:
+        """get 的协程版本"""
+        identity = self.get_local(hotel_name)
+        if identity is not None:
+            return identity
+        if self.async_mongo is None:
+            return await asyncio.get_running_loop().run_in_executor(None, self.get, hotel_name)
+
+        key = self.normalize(hotel_name)
+        try:
+            doc = await self.async_mongo.find_one(self.collection, {"_id": key})
+        except Exception as e:
+            logger.warning(f"查询酒店信息缓存失败: {e}")
+            doc = None
+        return self._from_store(key, doc)
+
+    def _from_store(self, key: str, doc: Optional[Dict]) -> Optional[Dict]:
+        """统计 Mongo 命中情况，命中后回填进程内缓存"""
+        with self._lock:
+            if doc:
+                self._stats["store_hits"] += 1
+            else:
+                self._stats["misses"] += 1
+        self._log_stats()
+
+        if not doc:
+            return None
+        identity = {k: doc.get(k) for k in self.FIELDS}
+        self._set_local(key, identity)
+        return dict(identity)
+
+    def set(self, hotel_name: str, identity: Dict):
+        """写入两级缓存"""
+        key = self.normalize(hotel_name)
+        identity = {k: identity.get(k) for k in self.FIELDS}
+        self._set_local(key, identity)
+        try:
+            self.mongo.update(
+                self.collection,
+                {**identity, "hotel_name": hotel_name, "updated_at": datetime.now()},
+                query={"_id": key},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"写入酒店信息缓存失败: {e}")
+
+    async def set_async(self, hotel_name: str, identity: Dict):
+        """set 的协程版本"""
+        if self.async_mongo is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.set, hotel_name, identity)
+            return
+
+        key = self.normalize(hotel_name)
+        identity = {k: identity.get(k) for k in self.FIELDS}
+        self._set_local(key, identity)
+        try:
+            await self.async_mongo.update(
+                self.collection,
+                {**identity, "hotel_name": hotel_name, "updated_at": datetime.now()},
+                query={"_id": key},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"写入酒店信息缓存失败: {e}")
+
+    def _set_local(self, key: str, identity: Dict):
+        with self._lock:
+            self._local[key] = (time.time() + self.ttl, identity)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._local)
+        total = stats["local_hits"] + stats["store_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["local_hits"] + stats["store_hits"]) / total, 4) if total else 0.0
+        return stats
+
+    def _log_stats(self):
+        with self._lock:
+            total = sum(self._stats.values())
+        if total and total % 100 == 0:
+            logger.info(f"酒店信息缓存统计: {self.stats()}")
@@ -0,0 +1,114 @@
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List, Union
+
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时回落到标准库
+    orjson = None
+
+
+# 项目统一的 JSON 编解码入口：
+# - 安装了 orjson 时使用 orjson，否则回落到标准库 json
+# - 输出统一为紧凑格式、不转义中文（等价于 ensure_ascii=False, separators=(",", ":")），
+#   两种后端对同一个对象的输出一致，可直接用于去重比较
+# - sort_keys=True 时按 key 排序，用于队列任务体等需要稳定序列化结果的场景
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """序列化为 str"""
+    return dumps_bytes(obj, sort_keys).decode("utf-8")
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+    """序列化为 UTF-8 bytes，写 Redis / 网络时可省一次编码"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(obj, option=option)
+        except (TypeError, orjson.JSONEncodeError):
+            pass  # 超出 64 位的整数等 orjson 不支持的类型，交给标准库处理
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys).encode("utf-8")
+
+
+def loads(raw: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """反序列化 str / bytes"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# ============================
+# 基准测试
+# ============================
+
+def _codecs() -> Dict[str, Dict[str, Callable]]:
+    codecs = {
+        "json": {
+            "dumps": lambda o: json.dumps(o, ensure_ascii=False),
+            "loads": json.loads,
+        },
+    }
+    if orjson is not None:
+        codecs["orjson"] = {"dumps": orjson.dumps, "loads": orjson.loads}
+    try:
+        import msgspec
+        encoder, decoder = msgspec.json.Encoder(), msgspec.json.Decoder()
+        codecs["msgspec"] = {"dumps": encoder.encode, "loads": decoder.decode}
+    except ImportError:
+        pass
+    return codecs
+
+
+def _load_payloads(paths: List[str], collection: str = None, limit: int = 20) -> List[Any]:
+    payloads = []
+    for path in paths:
+        with open(path, "rb") as f:
+            payloads.append(loads(f.read()))
+    if collection:
+        from db.mongo import MongoClientSingleton
+        from utils.response_codec import decode_response
+
+        mongo = MongoClientSingleton(db_name="ctrip")
+        for doc in mongo.find(collection, {"response": {"$exists": True}}, limit=limit,
+                              sort=[("_id", -1)], projection={"response": 1}):
+            payloads.append(decode_response(doc))
+    return payloads
+
+
+if __name__ == "__main__":
+    # python -m utils.json_codec hotel_detail.json
+    # python -m utils.json_codec --from-mongo ctrip_detail_results --limit 50
+    parser = argparse.ArgumentParser(description="JSON 编解码基准测试")
+    parser.add_argument("paths", nargs="*", help="响应 JSON 文件")
+    parser.add_argument("--from-mongo", metavar="COLLECTION", help="从结果集合中读取最近的响应")
+    parser.add_argument("--limit", type=int, default=20, help="从 Mongo 读取的条数")
+    parser.add_argument("--rounds", type=int, default=50, help="每条响应重复次数")
+    args = parser.parse_args()
+
+    payloads = _load_payloads(args.paths, args.from_mongo, args.limit)
+    if not payloads:
+        parser.error("请指定响应 JSON 文件或 --from-mongo")
+
+    raw_payloads = [json.dumps(p, ensure_ascii=False).encode("utf-8") for p in payloads]
+    size = sum(len(r) for r in raw_payloads) / len(raw_payloads)
+    logger.info(f"当前后端 {BACKEND}，{len(payloads)} 条响应，平均 {size / 1024:.1f} KB")
+
+    for name, codec in _codecs().items():
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for payload in payloads:
+                codec["dumps"](payload)
+        dumps_cost = (time.perf_counter() - start) / (args.rounds * len(payloads))
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for raw in raw_payloads:
+                codec["loads"](raw)
+        loads_cost = (time.perf_counter() - start) / (args.rounds * len(payloads))
+        logger.info(f"{name:<8} dumps {dumps_cost * 1e3:.3f} ms  loads {loads_cost * 1e3:.3f} ms")
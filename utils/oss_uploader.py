@@ -0,0 +1,203 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from config import settings
+from utils.platform_client import get_platform_client
+from utils.screenshot_cache import ScreenshotCache, get_screenshot_cache
+
+
+OSS_KEY_HEADERS = {
+    "Accept": "*/*",
+    "Content-Type": "application/json",
+    "Origin": "http://47.101.140.209",
+    "Referer": "http://47.101.140.209/crowd.html",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
+}
+OSS_KEY_COOKIES = {"crowd-code": "759528"}
+
+
+class OssUploadError(Exception):
+    """重试次数用尽仍无法获取上传参数或上传文件"""
+
+
+class OssUploader:
+    """
+    截图并发上传 OSS，替代逐个文件 获取上传参数 → 上传 → sleep(0.5)
+
+    1. 复用 keep-alive 连接池（requests.Session + HTTPAdapter），不再每次新建连接
+    2. 每个文件的 获取上传参数 + 上传 作为一个单元放进有界线程池并发执行，所有账号共享
+    3. 每一步失败按指数退避 + 随机抖动重试，超过 OSS_UPLOAD_RETRIES 次抛出 OssUploadError
+    4. 文件用 with open 流式读取，上传结束立即关闭句柄
+    5. 已在截图缓存中记录过 OSS key 的文件直接跳过
+    6. 通过 batch() 可以在截图过程中逐张提交上传，见 UploadBatch
+
+    使用示例：
+        # >>> uploader = get_oss_uploader()
+        # >>> submit_map = uploader.upload_room_info(token, room_info)
+        # >>> # {"1": ["ossKey1", "ossKey2"], "list_1_2": ["ossKey3"]}
+    """
+
+    def __init__(self, max_workers: int = settings.OSS_UPLOAD_WORKERS,
+                 max_retries: int = settings.OSS_UPLOAD_RETRIES,
+                 backoff: float = settings.OSS_UPLOAD_BACKOFF,
+                 timeout: float = settings.OSS_UPLOAD_TIMEOUT,
+                 cache: Optional[ScreenshotCache] = None):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache if cache is not None else get_screenshot_cache()
+        # 获取上传参数走任务平台共享客户端（重试由 _retry 负责），上传 OSS 用独立连接池
+        self.platform = get_platform_client()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers * 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="oss-upload")
+
+    def upload_room_info(self, token: str, room_info: List[Dict]) -> Dict[str, List[str]]:
+        """上传所有房型的截图，返回提交用的 {key: [ossKey, ...]}，顺序与截图顺序一致"""
+        return self.batch(token).collect(room_info)
+
+    def batch(self, token: str) -> "UploadBatch":
+        """一个任务的上传批次：截图写入后立即 submit，全部截图完成后 collect"""
+        return UploadBatch(self, token)
+
+    def upload(self, token: str, file_path: str) -> str:
+        """上传单个文件，返回 OSS key"""
+        oss_key = self.cache.oss_key(file_path) if self.cache else None
+        if oss_key:
+            return oss_key
+
+        oss_info = self._retry(self.get_upload_info, token, os.path.basename(file_path))
+        self._retry(self.upload_file, file_path, oss_info)
+        return oss_info["ossKey"]
+
+    def get_upload_info(self, token: str, file_name: str) -> Dict:
+        """第一步：获取 OSS 上传参数"""
+        payload = {
+            "bizType": "HOTEL",
+            "fileName": file_name,
+            "token": token
+        }
+        resp = self.platform.post("getOssKey", params={"token": token}, headers=OSS_KEY_HEADERS, json=payload,
+                                  cookies=OSS_KEY_COOKIES, timeout=self.timeout, verify=False, retries=0)
+        resp.raise_for_status()
+        result = resp.json()
+        if not result or result.get("msg") != "正常返回":
+            raise OssUploadError(f"获取 OSS 上传参数失败: {result}")
+        logger.info("✅ 获取 OSS 上传参数成功")
+        return result["data"]
+
+    def upload_file(self, file_path: str, oss_info: Dict):
+        """第二步：使用返回参数上传文件到 OSS"""
+        data = {
+            "accessId": oss_info["accessId"],
+            "ossKey": oss_info["ossKey"],
+            "signature": oss_info["signature"],
+            "expiration": oss_info["expiration"],
+            "uuid": oss_info["uuid"],
+            "policy": oss_info["policy"],
+            "OSSAccessKeyId": oss_info["accessId"],
+            "key": oss_info["ossKey"]
+        }
+        with open(file_path, "rb") as f:
+            files = {"file": (os.path.basename(file_path), f, "image/png")}
+            resp = self.session.post(f"https://{oss_info['url']}/", data=data, files=files, timeout=self.timeout)
+        resp.raise_for_status()
+        logger.info(f"✅ 上传成功: {oss_info['ossKey']}")
+
+    def _retry(self, func, *args):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise OssUploadError(f"{func.__name__} 重试 {attempt} 次仍失败: {e}") from e
+                # 指数退避 + 随机抖动，避免多个线程同时重试
+                delay = min(self.backoff * 2 ** (attempt - 1), 30) * random.uniform(0.5, 1.5)
+                logger.warning(f"{func.__name__} 第 {attempt} 次失败: {e}，{delay:.1f}s 后重试")
+                time.sleep(delay)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+
+class UploadBatch:
+    """
+    边截图边上传：截图阶段每写入一张图就 submit 进上传线程池，上传延迟隐藏在渲染时间之后；
+    collect 按 room_info 组装 submit_map，未 submit 过的截图在这时补传。
+
+    使用示例：
+        # >>> batch = get_oss_uploader().batch(token)
+        # >>> room_info = scheduler.screenshot(task_info, response, on_image=batch.submit)
+        # >>> submit_map = batch.collect(room_info)
+        # >>> submit_map = await batch.collect_async(room_info)  # 异步调度器中
+    """
+
+    def __init__(self, uploader: OssUploader, token: str):
+        self.uploader = uploader
+        self.token = token
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, file_path: str) -> Future:
+        """提交上传，同一个文件只上传一次；线程安全、不阻塞，可在截图回调中直接调用"""
+        with self._lock:
+            future = self._futures.get(file_path)
+            if future is None:
+                future = self.uploader.executor.submit(self.uploader.upload, self.token, file_path)
+                self._futures[file_path] = future
+            return future
+
+    def collect(self, room_info: List[Dict], record_keys: bool = True) -> Dict[str, List[str]]:
+        """
+        等待所有截图上传完成，返回 {key: [ossKey, ...]}；任一文件失败抛出 OssUploadError
+
+        :param record_keys: 是否立即把 OSS key 登记到截图缓存；False 时由调用方稍后调用 record_oss_keys
+        """
+        futures = {item["key"]: [self.submit(path) for path in item["screenshots"]] for item in room_info}
+        submit_map = {key: [f.result() for f in items] for key, items in futures.items()}
+        if record_keys:
+            self.record_oss_keys(room_info, submit_map)
+        return submit_map
+
+    async def collect_async(self, room_info: List[Dict]) -> Dict[str, List[str]]:
+        """collect 的协程版本，在事件循环中等待上传线程池，不占用额外线程"""
+        futures = {item["key"]: [self.submit(path) for path in item["screenshots"]] for item in room_info}
+        submit_map = {}
+        for key, items in futures.items():
+            submit_map[key] = list(await asyncio.gather(*(asyncio.wrap_future(f) for f in items)))
+        await asyncio.get_running_loop().run_in_executor(None, self.record_oss_keys, room_info, submit_map)
+        return submit_map
+
+    def record_oss_keys(self, room_info: List[Dict], submit_map: Dict[str, List[str]]):
+        # 截图登记进缓存之后再记录 OSS key（边截图边上传时，上传可能早于登记完成）
+        cache = self.uploader.cache
+        if cache:
+            for item in room_info:
+                for path, oss_key in zip(item["screenshots"], submit_map[item["key"]]):
+                    cache.record_oss_key(path, oss_key)
+
+
+_uploader: Optional[OssUploader] = None
+_uploader_lock = threading.Lock()
+
+
+def get_oss_uploader() -> OssUploader:
+    """进程内共享的上传器，所有账号共用一个连接池和线程池"""
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = OssUploader()
+        return _uploader
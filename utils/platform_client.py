@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from config import settings
+
+
+# 接口 → (连接超时, 读超时, 是否幂等)
+# 非幂等接口（领取、提交）只在连接阶段失败时重试，请求可能已送达服务器的情况不重试，避免重复领取 / 提交
+ENDPOINT_POLICIES: Dict[str, Tuple[float, float, bool]] = {
+    "login": (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_READ_TIMEOUT, True),
+    "listTask": (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_READ_TIMEOUT, True),
+    "queryClaimRecordList": (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_READ_TIMEOUT, True),
+    "queryClaimTemplateTask": (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_READ_TIMEOUT, True),
+    "claimTemplateTask": (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_READ_TIMEOUT, False),
+    "submitTemplateTask": (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_SUBMIT_TIMEOUT, False),
+    "cancelTask": (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_READ_TIMEOUT, True),
+    "getOssKey": (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_READ_TIMEOUT, True),
+}
+DEFAULT_POLICY = (settings.PLATFORM_CONNECT_TIMEOUT, settings.PLATFORM_READ_TIMEOUT, True)
+
+
+class PlatformClient:
+    """
+    任务平台（crowd）统一 HTTP 客户端，所有账号共用
+
+    1. 一个 requests.Session + 连接池，keep-alive 复用连接，不再每个请求新建 TCP 连接
+    2. 每个接口单独的连接 / 读超时（ENDPOINT_POLICIES），不会无限期挂起
+    3. 连接异常、超时、5xx 按指数退避 + 随机抖动重试，最多 PLATFORM_MAX_RETRIES 次；
+       非幂等接口只在连接建立失败时重试
+    4. 按接口统计请求数、失败数、重试数、平均 / 最大耗时，定期输出到日志
+
+    使用示例：
+        # >>> client = get_platform_client()
+        # >>> resp = client.get("listTask", params={"token": token})
+        # >>> resp = client.post("submitTemplateTask", params={"token": token}, json=payload)
+        # >>> client.metrics()
+    """
+
+    def __init__(self, base_url: str = settings.PLATFORM_BASE_URL,
+                 pool_size: int = settings.PLATFORM_POOL_SIZE,
+                 max_retries: int = settings.PLATFORM_MAX_RETRIES,
+                 backoff: float = settings.PLATFORM_BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._last_log = time.time()
+
+    def url(self, endpoint: str) -> str:
+        return f"{self.base_url}/task/{endpoint}"
+
+    def get(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("POST", endpoint, **kwargs)
+
+    def request(self, method: str, endpoint: str, retries: int = None, **kwargs) -> requests.Response:
+        """
+        发送请求，重试用尽后抛出最后一次的异常；5xx 重试用尽后返回最后一次的响应，由调用方按原逻辑处理
+
+        :param endpoint: 接口名，如 listTask，对应 {base_url}/task/{endpoint}
+        :param retries: 覆盖默认重试次数，0 表示不重试（调用方自行重试时使用）
+        :param kwargs: 透传给 requests，如 params / json / data / headers / verify
+        """
+        connect_timeout, read_timeout, idempotent = ENDPOINT_POLICIES.get(endpoint, DEFAULT_POLICY)
+        kwargs.setdefault("timeout", (connect_timeout, read_timeout))
+        retries = self.max_retries if retries is None else retries
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                resp = self.session.request(method, self.url(endpoint), **kwargs)
+            except requests.RequestException as e:
+                self._record(endpoint, time.perf_counter() - start, error=True, retry=attempt > 0)
+                retryable = isinstance(e, (requests.ConnectionError, requests.Timeout)) and (
+                    idempotent or isinstance(e, requests.ConnectTimeout)
+                )
+                if not retryable or attempt >= retries:
+                    raise
+                logger.warning(f"平台接口 {endpoint} 请求失败（第 {attempt + 1} 次）: {e}")
+            else:
+                failed = resp.status_code >= 500
+                self._record(endpoint, time.perf_counter() - start, error=failed, retry=attempt > 0)
+                if not failed or not idempotent or attempt >= retries:
+                    return resp
+                logger.warning(f"平台接口 {endpoint} 返回 {resp.status_code}（第 {attempt + 1} 次）")
+
+            attempt += 1
+            time.sleep(min(self.backoff * 2 ** (attempt - 1), 10) * random.uniform(0.5, 1.5))
+
+    # ---------------- 指标 ----------------
+
+    def _record(self, endpoint: str, elapsed: float, error: bool, retry: bool):
+        with self._lock:
+            m = self._metrics.setdefault(endpoint, {"count": 0, "errors": 0, "retries": 0, "total": 0.0, "max": 0.0})
+            m["count"] += 1
+            m["errors"] += int(error)
+            m["retries"] += int(retry)
+            m["total"] += elapsed
+            m["max"] = max(m["max"], elapsed)
+            should_log = time.time() - self._last_log >= settings.PLATFORM_METRICS_LOG_INTERVAL
+            if should_log:
+                self._last_log = time.time()
+        if should_log:
+            logger.info(f"平台接口统计: {self.metrics()}")
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """按接口汇总：请求数、失败数、重试数、平均 / 最大耗时（毫秒）"""
+        with self._lock:
+            return {
+                endpoint: {
+                    "count": int(m["count"]),
+                    "errors": int(m["errors"]),
+                    "retries": int(m["retries"]),
+                    "avg_ms": round(m["total"] / m["count"] * 1000, 1) if m["count"] else 0.0,
+                    "max_ms": round(m["max"] * 1000, 1),
+                }
+                for endpoint, m in self._metrics.items()
+            }
+
+
+_client: Optional[PlatformClient] = None
+_client_lock = threading.Lock()
+
+
+def get_platform_client() -> PlatformClient:
+    """进程内共享的平台客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PlatformClient()
+        return _client
@@ -0,0 +1,107 @@
+import argparse
+from typing import Any, Dict
+
+import bson
+from loguru import logger
+from pymongo import UpdateOne
+
+from config import settings
+from db.mongo import MongoClientSingleton
+from utils import json_codec
+
+try:
+    import zstandard
+except ImportError:  # zstd 为可选格式
+    zstandard = None
+
+
+FORMATS = ("json", "bson", "zstd")
+
+
+def encode_response(response: Any, fmt: str = None) -> Dict[str, Any]:
+    """
+    按存储格式编码爬虫响应，返回需要合并进结果文档的字段：{"response": ..., "response_format": ...}
+
+    :param response: 接口返回的原始数据（dict）；bson 格式下无法编码为 BSON 的响应回落到 json
+    :param fmt: json / bson / zstd，默认取 settings.RESPONSE_STORAGE_FORMAT
+    """
+    fmt = fmt or settings.RESPONSE_STORAGE_FORMAT
+    if fmt == "zstd" and zstandard is None:
+        logger.warning("未安装 zstandard，响应改为 bson 格式存储")
+        fmt = "bson"
+    if fmt == "bson" and not isinstance(response, dict):
+        fmt = "json"  # BSON 顶层必须是文档
+
+    if fmt == "bson":
+        try:
+            # 提前按 BSON 编码一次：超出 64 位的整数等无法编码的值会让 bulk_write 整批失败，这类响应改存 JSON
+            bson.encode(response)
+        except Exception as e:
+            logger.warning(f"响应无法按 BSON 存储，改为 json 格式: {e}")
+            fmt = "json"
+        else:
+            return {"response": response, "response_format": "bson"}
+    raw = json_codec.dumps_bytes(response)
+    if fmt == "zstd":
+        blob = zstandard.ZstdCompressor(level=settings.RESPONSE_ZSTD_LEVEL).compress(raw)
+        return {"response": blob, "response_format": "zstd"}
+    return {"response": raw.decode("utf-8"), "response_format": "json"}
+
+
+def decode_response(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从结果文档中取出响应 dict，兼容历史 JSON 字符串、BSON 子文档和 zstd 压缩字节
+    """
+    raw = (document or {}).get("response")
+    if raw is None:
+        return {}
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, (bytes, bytearray)):
+        if zstandard is None:
+            raise RuntimeError("读取 zstd 格式的响应需要安装 zstandard")
+        raw = zstandard.ZstdDecompressor().decompress(bytes(raw))
+    return json_codec.loads(raw)
+
+
+def migrate_responses(mongo: MongoClientSingleton, collection: str, fmt: str = None,
+                      database: str = None, count: int = 500) -> int:
+    """
+    把集合中存量结果的 response 转成指定格式，可重复执行，已是目标格式的文档会被跳过
+
+    :return: 转换的文档数
+    """
+    fmt = fmt or settings.RESPONSE_STORAGE_FORMAT
+    query = {"response": {"$exists": True}, "response_format": {"$ne": fmt}}
+    col = mongo.client[database or mongo.db.name][collection]
+    migrated = 0
+    for batch in mongo.iter_data(collection, query=query, projection={"response": 1},
+                                 database=database, count=count):
+        requests = []
+        for doc in batch:
+            try:
+                encoded = encode_response(decode_response(doc), fmt)
+            except Exception as e:
+                logger.warning(f"{collection} {doc['_id']} 的 response 无法解析，跳过: {e}")
+                continue
+            requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": encoded}))
+        if requests:
+            col.bulk_write(requests, ordered=False)
+            migrated += len(requests)
+            logger.info(f"{collection} 已转换 {migrated} 条")
+    return migrated
+
+
+if __name__ == "__main__":
+    # python -m utils.response_codec --format bson ctrip_detail_results ctrip_list_results
+    parser = argparse.ArgumentParser(description="爬虫结果 response 存储格式迁移")
+    parser.add_argument("collections", nargs="+", help="集合名")
+    parser.add_argument("--db", default="ctrip", help="数据库名")
+    parser.add_argument("--format", choices=FORMATS, default=settings.RESPONSE_STORAGE_FORMAT, help="目标格式")
+    parser.add_argument("--count", type=int, default=500, help="每批处理条数")
+    args = parser.parse_args()
+
+    mongo_instance = MongoClientSingleton(db_name=args.db)
+    for name in args.collections:
+        total = migrate_responses(mongo_instance, name, args.format, database=args.db, count=args.count)
+        print(f"{args.db}.{name}: 转换 {total} 条")
@@ -0,0 +1,170 @@
+import argparse
+import json
+import time
+from enum import Enum
+from typing import Any, Dict, Iterable, List
+
+from loguru import logger
+
+
+class Verdict(str, Enum):
+    """爬虫响应的校验结论"""
+    SUCCESS = "success"                  # 数据完整
+    PARTIAL = "partial"                  # 有价格，但部分房型缺少登录后才有的价格明细
+    SERVER_305 = "305"                   # 携程服务器内异常，需要取消任务
+    HOTEL_NOT_FOUND = "hotel_not_found"  # 搜索不到酒店
+    COOKIE_INVALID = "cookie_invalid"    # 有响应但缺少价格结构，通常是 cookie 失效
+    ERROR = "error"                      # 爬虫异常或服务器错误码
+    EMPTY = "empty"                      # 空结果
+
+    @property
+    def ok(self) -> bool:
+        """是否可以直接用于截图和提交"""
+        return self in (Verdict.SUCCESS, Verdict.PARTIAL)
+
+
+# 服务器失败响应：{"code": 301/303/304/305/306/307, "data": {}, "msg": "错误信息"}
+SERVER_ERROR_CODES = {301, 303, 304, 306, 307}
+DETAIL_TASK_TYPES = {"detail", "XC_ROOM_DETAIL_RP_PIC_DISCOUNT"}
+SOLD_OUT_TEXT = "酒店已售罄"
+
+
+def validate_response(response: Dict[str, Any], task_type: str) -> Verdict:
+    """
+    按结构校验爬虫响应，不做序列化
+
+    详情任务只遍历 data.saleRoomMap 一次；列表任务只遍历 data.hotelList 中的目标酒店一次。
+
+    :param response: 爬虫响应 dict
+    :param task_type: detail / list，或任务平台的 XC_ROOM_DETAIL_RP_PIC_DISCOUNT / XC_LIST_TEMPLATE_PIC_DISCOUNT
+    """
+    if not response or not isinstance(response, dict):
+        return Verdict.EMPTY
+    if response.get("msg") == "搜索不到酒店":
+        return Verdict.HOTEL_NOT_FOUND
+
+    code = response.get("code")
+    if code == 305:
+        return Verdict.SERVER_305
+    if code in SERVER_ERROR_CODES or response.get("error"):
+        return Verdict.ERROR
+
+    data = response.get("data")
+    if not isinstance(data, dict) or not data:
+        return Verdict.COOKIE_INVALID
+
+    if task_type in DETAIL_TASK_TYPES:
+        return _validate_detail(data.get("saleRoomMap"))
+    return _validate_list(data.get("hotelList"))
+
+
+def _validate_detail(sale_room_map: Any) -> Verdict:
+    """售卖房型需要有 ¥ 开头的 displayPrice，且带 totalPriceInfo（登录后才返回的价格明细）"""
+    if not isinstance(sale_room_map, dict) or not sale_room_map:
+        return Verdict.COOKIE_INVALID
+
+    priced = detailed = 0
+    for room in sale_room_map.values():
+        if not isinstance(room, dict):
+            continue
+        price_info = room.get("priceInfo")
+        if not isinstance(price_info, dict):
+            continue
+        display_price = price_info.get("displayPrice")
+        if not (isinstance(display_price, str) and display_price.startswith("¥")):
+            continue
+        priced += 1
+        if room.get("totalPriceInfo"):
+            detailed += 1
+
+    if not priced or not detailed:
+        return Verdict.COOKIE_INVALID
+    if detailed < priced:
+        return Verdict.PARTIAL
+    return Verdict.SUCCESS
+
+
+def _validate_list(hotel_list: Any) -> Verdict:
+    """目标酒店（列表第一个）需要有 priceInfo 和 tipAfterPrice（登录后才返回），或者已售罄"""
+    if not isinstance(hotel_list, list) or not hotel_list:
+        return Verdict.COOKIE_INVALID
+
+    has_price = has_tip = sold_out = False
+    stack: List[Any] = [hotel_list[0]]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "priceInfo" in node:
+                has_price = True
+            if "tipAfterPrice" in node:
+                has_tip = True
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list, str)))
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif not sold_out and SOLD_OUT_TEXT in node:
+            sold_out = True
+
+    if sold_out or (has_price and has_tip):
+        return Verdict.SUCCESS
+    return Verdict.COOKIE_INVALID
+
+
+# ============================
+# 基准测试：与原来的 json.dumps + 子串判断对比
+# ============================
+
+def _string_check(response: Dict[str, Any], task_type: str) -> bool:
+    """原 Scheduler.handle_task_result 的判断方式"""
+    result_str = json.dumps(response)
+    if "priceInfo" not in result_str:
+        return False
+    if task_type in DETAIL_TASK_TYPES:
+        return "totalPriceInfo" in result_str
+    return "tipAfterPrice" in result_str or SOLD_OUT_TEXT in result_str
+
+
+def _load_payloads(paths: Iterable[str], collection: str = None, limit: int = 20) -> List[Dict[str, Any]]:
+    payloads = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            payloads.append(json.load(f))
+    if collection:
+        from db.mongo import MongoClientSingleton
+        from utils.response_codec import decode_response
+
+        mongo = MongoClientSingleton(db_name="ctrip")
+        for doc in mongo.find(collection, {"response": {"$exists": True}}, limit=limit,
+                              sort=[("_id", -1)], projection={"response": 1}):
+            payloads.append(decode_response(doc))
+    return payloads
+
+
+if __name__ == "__main__":
+    # python -m utils.response_validator hotel_detail.json --task-type detail
+    # python -m utils.response_validator --from-mongo ctrip_detail_results --limit 50
+    parser = argparse.ArgumentParser(description="响应校验基准测试")
+    parser.add_argument("paths", nargs="*", help="响应 JSON 文件")
+    parser.add_argument("--task-type", default="detail", help="detail / list")
+    parser.add_argument("--from-mongo", metavar="COLLECTION", help="从结果集合中读取最近的响应")
+    parser.add_argument("--limit", type=int, default=20, help="从 Mongo 读取的条数")
+    parser.add_argument("--rounds", type=int, default=200, help="每条响应重复次数")
+    args = parser.parse_args()
+
+    payloads = _load_payloads(args.paths, args.from_mongo, args.limit)
+    if not payloads:
+        parser.error("请指定响应 JSON 文件或 --from-mongo")
+
+    size = sum(len(json.dumps(p)) for p in payloads) / len(payloads)
+    logger.info(f"{len(payloads)} 条响应，平均 {size / 1024:.1f} KB")
+
+    for name, check in (("json.dumps + 子串", _string_check), ("结构校验", validate_response)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for payload in payloads:
+                check(payload, args.task_type)
+        elapsed = (time.perf_counter() - start) / (args.rounds * len(payloads))
+        logger.info(f"{name:<16} 单次 {elapsed * 1e6:.1f} µs")
+
+    disagree = [i for i, p in enumerate(payloads)
+                if _string_check(p, args.task_type) != validate_response(p, args.task_type).ok]
+    logger.info(f"结论不一致的响应: {disagree or '无'}")
@@ -0,0 +1,129 @@
+import asyncio
+import time
+import datetime
+from typing import Dict, Optional
+
+import redis
+import redis.asyncio
+from loguru import logger
+
+from config import settings
+from utils import json_codec
+
+
+class ResultChannel:
+    """
+    任务完成通知通道
+
+    爬虫写入结果后向 `{prefix}:{collection}:{date}:{hotel_name}:{check_in}:{check_out}` 推送一条通知，
+    调度器对同一个 key 做 BLPOP 阻塞等待，收到通知后再读一次 Mongo，避免每 5 秒轮询一次结果集合。
+    通知只是"结果已落库"的信号，真正的数据仍以 Mongo 为准，通道不可用时调度器回落到 Mongo 轮询。
+    """
+
+    def __init__(self, redis_host: str = settings.REDIS_HOST, redis_port: int = settings.REDIS_PORT,
+                 redis_db: int = settings.REDIS_DB, prefix: str = settings.RESULT_NOTIFY_PREFIX,
+                 ttl: int = settings.RESULT_NOTIFY_TTL):
+        self.redis = redis.StrictRedis(host=redis_host, port=redis_port, db=redis_db, decode_responses=True)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def key(self, collection: str, task_info: Dict, date: str = None) -> str:
+        """生成任务结果通知 key，与结果集合的查询条件一一对应"""
+        date = date or datetime.datetime.now().strftime("%Y-%m-%d")
+        return ":".join([
+            self.prefix,
+            collection,
+            date,
+            str(task_info.get("hotel_name")),
+            str(task_info.get("check_in")),
+            str(task_info.get("check_out")),
+        ])
+
+    def publish(self, collection: str, task_info: Dict, status: Dict = None, date: str = None):
+        """
+        爬虫端：结果写入 Mongo 后调用，推送完成通知
+        :param collection: 结果集合名
+        :param task_info: 至少包含 hotel_name / check_in / check_out
+        :param status: 附带的状态信息，如 {"success": True, "server_code": 305}
+        :param date: 结果记录的日期，默认今天
+        """
+        key = self.key(collection, task_info, date)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.rpush(key, json_codec.dumps(status or {}))
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"推送任务完成通知失败: {key}, 错误原因{e}")
+
+    def reset(self, collection: str, task_info: Dict):
+        """调度器端：投放任务前清理残留通知，避免读到上一次的旧信号"""
+        try:
+            self.redis.delete(self.key(collection, task_info))
+        except Exception as e:
+            logger.warning(f"清理任务通知失败, 错误原因{e}")
+
+    def wait(self, collection: str, task_info: Dict, timeout: int = settings.RESULT_NOTIFY_WAIT) -> Optional[Dict]:
+        """
+        调度器端：阻塞等待完成通知
+        :return: 收到通知返回附带的状态字典；超时或通道异常返回 None
+        """
+        key = self.key(collection, task_info)
+        try:
+            item = self.redis.blpop(key, timeout=max(int(timeout), 1))
+        except Exception as e:
+            logger.warning(f"等待任务完成通知失败，回落到 Mongo 轮询, 错误原因{e}")
+            time.sleep(min(timeout, 5))  # 通道不可用时保持原来的轮询节奏
+            return None
+        if not item:
+            return None
+        try:
+            return json_codec.loads(item[1])
+        except Exception:
+            return {}
+
+
+class AsyncResultChannel(ResultChannel):
+    """
+    ResultChannel 的 asyncio 版本，基于 redis.asyncio，key 与通知格式完全一致，可以和同步版混用。
+    BLPOP 等待期间只占用一个连接、不占用线程，供异步多账号调度器使用。
+    """
+
+    def __init__(self, redis_client: redis.asyncio.StrictRedis = None, prefix: str = settings.RESULT_NOTIFY_PREFIX,
+                 ttl: int = settings.RESULT_NOTIFY_TTL):
+        self.redis = redis_client or redis.asyncio.StrictRedis(
+            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB, decode_responses=True
+        )
+        self.prefix = prefix
+        self.ttl = ttl
+
+    async def publish(self, collection: str, task_info: Dict, status: Dict = None, date: str = None):
+        key = self.key(collection, task_info, date)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.rpush(key, json_codec.dumps(status or {}))
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"推送任务完成通知失败: {key}, 错误原因{e}")
+
+    async def reset(self, collection: str, task_info: Dict):
+        try:
+            await self.redis.delete(self.key(collection, task_info))
+        except Exception as e:
+            logger.warning(f"清理任务通知失败, 错误原因{e}")
+
+    async def wait(self, collection: str, task_info: Dict, timeout: int = settings.RESULT_NOTIFY_WAIT) -> Optional[Dict]:
+        key = self.key(collection, task_info)
+        try:
+            item = await self.redis.blpop(key, timeout=max(int(timeout), 1))
+        except Exception as e:
+            logger.warning(f"等待任务完成通知失败，回落到 Mongo 轮询, 错误原因{e}")
+            await asyncio.sleep(min(timeout, 5))  # 通道不可用时保持原来的轮询节奏
+            return None
+        if not item:
+            return None
+        try:
+            return json_codec.loads(item[1])
+        except Exception:
+            return {}
@@ -0,0 +1,376 @@
+import asyncio
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from config import settings
+from utils.browser_pool import BrowserPool, get_browser_pool
+from utils.screenshot_cache import ScreenshotCache, get_screenshot_cache
+from utils.template_renderer import RoomRenderer, get_room_renderer
+
+
+@dataclass
+class RenderJob:
+    """
+    一个房型的截图任务：渲染 payload（或已渲染好的 HTML）+ 需要截图的弹窗（variant code），
+    截图路径回填到 list_image / dialog_images
+    """
+    title: str
+    variant_codes: List[str]
+    payload: Optional[Dict[str, Any]] = None
+    html: Optional[str] = None
+    list_image: Optional[str] = None
+    dialog_images: List[str] = field(default_factory=list)
+    cached: bool = False
+    cache_key: Optional[str] = None
+    out_dir: Optional[str] = None  # 截图目录，启用缓存时直接写入缓存条目目录，截图路径之后不再变化
+
+
+class RoomScreenshotter:
+    """
+    房型列表 / 优惠弹窗截图，page 从共享的 BrowserPool 借用
+
+    只带 payload 的任务在调用线程中渲染 HTML；进程内渲染时会在浏览器 context 上安装静态资源路由拦截。
+    启用截图缓存时，payload 与渲染环境完全相同的房型直接复用缓存中的截图，不再渲染和截图。
+
+    两种截图模式（SCREENSHOT_MODE）：
+        page:   每个房型一个 page，列表页整页截图，弹窗逐个点击展开后整页截图
+        single: 所有房型合并成一个文档只渲染一次，列表按房型区块、弹窗通过 CSS 预先展开后按元素截图，
+                不需要点击和等待动画，适合房型多的酒店
+
+    使用示例：
+        # >>> shooter = RoomScreenshotter()
+        # >>> jobs = [RenderJob(title, ["code1", "code2"], payload=payload)]
+        # >>> shooter.capture(jobs, "screenshots/20250101/xxx")
+        # >>> jobs[0].list_image, jobs[0].dialog_images
+    """
+
+    def __init__(self, pool: BrowserPool = None, device: str = settings.BROWSER_DEVICE,
+                 timeout: float = settings.SCREENSHOT_TIMEOUT,
+                 task_concurrency: int = settings.SCREENSHOT_TASK_CONCURRENCY, renderer: RoomRenderer = None,
+                 mode: str = settings.SCREENSHOT_MODE, cache: Optional[ScreenshotCache] = None):
+        self.pool = pool or get_browser_pool()
+        self.renderer = renderer or get_room_renderer()
+        if self.renderer.in_process:
+            self.pool.add_context_hook(self.renderer.install_static_route)
+        self.cache = cache if cache is not None else get_screenshot_cache()
+        self.mode = mode
+        self.device = device
+        self.timeout = timeout
+        self.task_concurrency = task_concurrency
+
+    def capture(self, jobs: List[RenderJob], out_dir: str,
+                on_image: Callable[[str], Any] = None) -> List[RenderJob]:
+        """
+        同步入口，供账号线程调用；渲染失败的房型 list_image 为 None
+
+        :param on_image: 每张截图写入磁盘后立即回调（参数为截图路径），用于边截图边上传；
+                         在浏览器池的事件循环线程中调用，不能阻塞
+        """
+        pending = self._prepare(jobs, on_image)
+        if pending:
+            self.pool.run(self.capture_async(pending, out_dir, on_image), timeout=self.timeout)
+        self._store(pending)
+        return jobs
+
+    async def capture_from_loop(self, jobs: List[RenderJob], out_dir: str,
+                                on_image: Callable[[str], Any] = None) -> List[RenderJob]:
+        """
+        异步入口，供其他事件循环（如异步多账号调度器）调用，参数同 capture
+
+        缓存读写和 HTML 渲染放到默认线程池，截图在浏览器池的事件循环中执行，调用方的事件循环不阻塞。
+        """
+        loop = asyncio.get_running_loop()
+        pending = await loop.run_in_executor(None, self._prepare, jobs, on_image)
+        if pending:
+            future = self.pool.submit(self.capture_async(pending, out_dir, on_image))
+            await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        await loop.run_in_executor(None, self._store, pending)
+        return jobs
+
+    def _prepare(self, jobs: List[RenderJob], on_image: Callable[[str], Any] = None) -> List[RenderJob]:
+        """命中缓存的房型直接回填截图，其余房型渲染 HTML，返回需要截图的任务"""
+        fingerprint = self.renderer.fingerprint()
+        pending = []
+        for job in jobs:
+            if job.payload is not None and self.cache is not None and fingerprint is not None:
+                job.cache_key = self.cache.key_for(job.payload, fingerprint, self.device, self.mode)
+                entry = self.cache.load(job.cache_key)
+                if entry:
+                    job.list_image, job.dialog_images, job.cached = entry["list"], entry["dialogs"], True
+                    logger.info(f"♻ 命中截图缓存：{job.title}")
+                    for path in [job.list_image, *job.dialog_images]:
+                        _emit(on_image, path)
+                    continue
+                job.out_dir = self.cache.entry_dir(job.cache_key)
+
+            if job.html is None:
+                try:
+                    job.html = self.renderer.render(job.payload)
+                except Exception as e:
+                    logger.error(f"❌ 渲染失败: {e}")
+                    continue
+            pending.append(job)
+        return pending
+
+    def _store(self, pending: List[RenderJob]):
+        for job in pending:
+            # 有弹窗截图失败的房型不缓存，下次重新截图
+            if job.cache_key is None or not job.list_image or len(job.dialog_images) != len(job.variant_codes):
+                continue
+            try:
+                self.cache.store(job.cache_key, job.list_image, job.dialog_images)
+            except OSError as e:
+                logger.warning(f"写入截图缓存失败: {e}")
+
+    async def capture_async(self, jobs: List[RenderJob], out_dir: str,
+                            on_image: Callable[[str], Any] = None) -> List[RenderJob]:
+        if self.mode == "single":
+            return await self._capture_single(jobs, out_dir, on_image)
+        return await self._capture_pages(jobs, out_dir, on_image)
+
+    async def _capture_pages(self, jobs: List[RenderJob], out_dir: str,
+                             on_image: Callable[[str], Any] = None) -> List[RenderJob]:
+        """
+        每个房型在独立的 page 上并发渲染、截图
+
+        单个任务同时占用的 page 数不超过 task_concurrency；
+        所有任务合计不超过浏览器池的 BROWSER_PAGES_PER_DEVICE。
+        """
+        semaphore = asyncio.Semaphore(self.task_concurrency)
+        results = await asyncio.gather(
+            *(self._capture_job(job, job.out_dir or out_dir, semaphore, on_image) for job in jobs),
+            return_exceptions=True,
+        )
+        # 等所有房型结束（page 全部归还）后再抛出第一个异常
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return jobs
+
+    async def _capture_job(self, job: RenderJob, out_dir: str, semaphore: asyncio.Semaphore,
+                           on_image: Callable[[str], Any] = None):
+        async with semaphore, self.pool.page(self.device) as page:
+            await patch_page_rendering(page)
+
+            # 页面加载，等待图片、字体就绪
+            await page.set_content(job.html, wait_until="networkidle")
+            await wait_for_render_ready(page)
+
+            # ✔ 截图列表页
+            job.list_image = await capture_room_list_item(page, job.title, out_dir)
+            _emit(on_image, job.list_image)
+
+            # ✔ 截图每种早餐对应弹窗
+            for variant_code in job.variant_codes:
+                dialog_img = await capture_dialog(page, variant_code, out_dir)
+                if dialog_img:
+                    job.dialog_images.append(dialog_img)
+                    _emit(on_image, dialog_img)
+
+
+    async def _capture_single(self, jobs: List[RenderJob], out_dir: str,
+                              on_image: Callable[[str], Any] = None) -> List[RenderJob]:
+        """所有房型合并成一个文档，一次渲染后按元素截图"""
+        async with self.pool.page(self.device) as page:
+            await patch_page_rendering(page)
+            await page.set_content(merge_documents([job.html for job in jobs]), wait_until="networkidle")
+            await wait_for_render_ready(page)
+
+            # ✔ 列表页：按房型区块截图（弹窗展开前，区块里不含弹窗）
+            for i, job in enumerate(jobs):
+                job.list_image = await capture_element(page, f'[data-render-job="{i}"]', job.out_dir or out_dir, "list")
+                _emit(on_image, job.list_image)
+
+            # ✔ 弹窗：CSS 预先展开全部弹窗，逐个元素截图
+            await page.add_style_tag(content=_EXPAND_DIALOGS_CSS)
+            await wait_for_animations(page)
+            for job in jobs:
+                for variant_code in job.variant_codes:
+                    dialog_img = await capture_element(page, f'[id="dialog-{variant_code}"]', job.out_dir or out_dir,
+                                                       "dialog")
+                    if dialog_img:
+                        job.dialog_images.append(dialog_img)
+                        _emit(on_image, dialog_img)
+        return jobs
+
+
+
+def _emit(on_image: Callable[[str], Any], path: Optional[str]):
+    """通知截图已写入，回调异常不影响截图"""
+    if on_image is None or not path:
+        return
+    try:
+        on_image(path)
+    except Exception as e:
+        logger.warning(f"截图回调失败 {path}: {e}")
+
+# 文档加载完成、图片解码完成、字体加载完成
+_RENDER_READY_JS = """
+    () => document.readyState === 'complete'
+        && Array.from(document.images).every(img => img.complete)
+        && (!document.fonts || document.fonts.status === 'loaded')
+"""
+
+# 等待页面上正在运行的 CSS 动画 / 过渡结束（弹窗展开、收起）
+_ANIMATIONS_FINISHED_JS = """
+    () => Promise.all(
+        (document.getAnimations ? document.getAnimations() : []).map(a => a.finished.catch(() => null))
+    )
+"""
+
+
+# 预先展开所有弹窗：放回文档流、去掉遮罩和动画，保证每个弹窗都有独立的布局区域
+_EXPAND_DIALOGS_CSS = """
+    [id^="dialog-"] {
+        display: block !important;
+        visibility: visible !important;
+        opacity: 1 !important;
+        position: relative !important;
+        inset: auto !important;
+        transform: none !important;
+        max-height: none !important;
+        margin: 0 auto 12px !important;
+        animation: none !important;
+        transition: none !important;
+    }
+    [id^="mask-"] {
+        display: none !important;
+    }
+"""
+
+_HEAD_RE = re.compile(r"<head[^>]*>(.*?)</head>", re.IGNORECASE | re.DOTALL)
+_BODY_RE = re.compile(r"<body[^>]*>(.*?)</body>", re.IGNORECASE | re.DOTALL)
+
+
+def merge_documents(documents: List[str]) -> str:
+    """把每个房型渲染出的完整 HTML 合并成一个文档：沿用第一个文档的 head，各自的 body 放进独立区块"""
+    head = _HEAD_RE.search(documents[0]) if documents else None
+    sections = []
+    for i, html in enumerate(documents):
+        body = _BODY_RE.search(html)
+        sections.append(f'<section data-render-job="{i}">{body.group(1) if body else html}</section>')
+    return (
+        f'<!DOCTYPE html><html><head>{head.group(1) if head else ""}</head>'
+        f'<body>{"".join(sections)}</body></html>'
+    )
+
+
+async def capture_element(page, selector, out_dir, suffix):
+    """按元素裁剪截图，元素不存在时返回 None"""
+    locator = page.locator(selector).first
+    if not await locator.count():
+        logger.warning(f"⚠ 未找到截图元素: {selector}")
+        return None
+    try:
+        img_path = os.path.join(out_dir, f"{uuid.uuid4().hex}_{suffix}.png")
+        await locator.screenshot(path=img_path, animations="disabled")
+        logger.info(f"✔ 元素截图完成: {img_path}")
+        return img_path
+    except Exception as e:
+        logger.error(f"❌ 元素截图失败 {selector}: {e}")
+        return None
+
+async def wait_for_render_ready(page, timeout: float = settings.SCREENSHOT_READY_TIMEOUT):
+    """用 DOM 就绪信号替代固定等待，超时后照常截图"""
+    try:
+        await page.wait_for_function(_RENDER_READY_JS, timeout=timeout * 1000)
+        await wait_for_animations(page)
+    except Exception as e:
+        logger.warning(f"⚠ 等待页面就绪超时，继续截图: {e}")
+
+
+async def wait_for_animations(page):
+    try:
+        await page.evaluate(_ANIMATIONS_FINISHED_JS)
+    except Exception:
+        pass
+
+
+async def patch_page_rendering(page):
+    await page.evaluate("""
+        () => {
+            document.body.style.overflow = 'hidden';
+            document.body.style.webkitFontSmoothing = 'antialiased';
+            document.body.style.mozOsxFontSmoothing = 'grayscale';
+            document.body.style.textRendering = 'optimizeLegibility';
+        }
+    """)
+    await page.add_style_tag(content="""
+        * {
+            image-rendering: crisp-edges !important;
+            text-rendering: optimizeLegibility !important;
+            -webkit-font-smoothing: antialiased !important;
+        }
+    """)
+
+
+async def capture_room_list_item(page, title, out_dir):
+    img_path = os.path.join(out_dir, f"{uuid.uuid4().hex}_list.png")
+    await page.screenshot(path=img_path)
+    logger.info(f"✔ 列表页截图完成: {img_path}")
+    return img_path
+
+
+async def capture_dialog(page, variant_code, out_dir):
+    dialog_id = f"dialog-{variant_code}"
+    btn_selector = f'.open-discount-btn[data-dialog-id="{dialog_id}"]'
+    btn = await page.query_selector(btn_selector)
+
+    if not btn:
+        logger.warning(f"⚠ 未找到弹窗按钮: {btn_selector}")
+        return None
+
+    try:
+        await btn.scroll_into_view_if_needed()
+        await btn.click()
+        await wait_for_dialog(page, variant_code, "visible")
+
+        img_path = os.path.join(out_dir, f"{uuid.uuid4().hex}_dialog.png")
+        await page.screenshot(path=img_path)
+        logger.info(f"✔ 弹窗截图成功: {img_path}")
+
+        await safe_close_dialog(page, variant_code)
+        return img_path
+
+    except Exception as e:
+        logger.error(f"❌ 弹窗截图失败: {e}")
+        return None
+
+
+async def wait_for_dialog(page, variant_code, state: str):
+    """等待弹窗（或遮罩）显示 / 隐藏，并等展开、收起动画结束"""
+    selector = f"#dialog-{variant_code}, #mask-{variant_code}"
+    try:
+        # 模板里没有对应 id 时不等待，只等动画结束
+        if await page.query_selector(selector) is not None:
+            await page.wait_for_selector(selector, state=state,
+                                         timeout=settings.SCREENSHOT_READY_TIMEOUT * 1000)
+    except Exception as e:
+        logger.debug(f"等待弹窗 {state} 失败: {e}")
+    await wait_for_animations(page)
+
+
+async def safe_close_dialog(page, variant_code):
+    dialog_id = f"dialog-{variant_code}"
+    close_selector = f'.close[data-dialog-id="{dialog_id}"]'
+
+    try:
+        btn = await page.query_selector(close_selector)
+        if btn:
+            await btn.scroll_into_view_if_needed()
+            await btn.click()
+        else:
+            mask = await page.query_selector(f"#mask-{variant_code}")
+            if mask:
+                await mask.click()
+            else:
+                await page.mouse.click(10, 10)
+
+        await wait_for_dialog(page, variant_code, "hidden")
+    except Exception:
+        await page.mouse.click(10, 10)
@@ -0,0 +1,242 @@
+import argparse
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from config import settings
+from utils import json_codec
+
+
+class ScreenshotCache:
+    """
+    按渲染内容寻址的截图磁盘缓存
+
+    key = sha256(渲染 payload（房型、弹窗、日期） + 渲染环境（模板版本、设备、截图模式）)，
+    同一酒店同一日期的重复任务（重新领取、重复派发）直接复用截图，跳过渲染和截图；
+    上传后记录 文件 → OSS key，再次提交时连上传也可以跳过。
+
+    目录结构：
+        {root}/{key[:2]}/{key}/*.png        截图
+        {root}/{key[:2]}/{key}/meta.json    {"created_at", "list", "dialogs", "oss": {文件名: ossKey}}，有 meta.json 的条目才会命中
+
+    淘汰：超过 max_age 的条目删除；总大小超过 max_bytes 时按最近使用时间（meta.json 的 mtime）从旧到新删除。
+
+    使用示例：
+        # >>> cache = get_screenshot_cache()
+        # >>> key = cache.key_for(payload, "jinja:room.html:1700000000")
+        # >>> entry = cache.load(key)          # {"list": path, "dialogs": [path, ...]} 或 None
+        # >>> out_dir = cache.entry_dir(key)    # 截图直接写到条目目录
+        # >>> entry = cache.store(key, list_image, dialog_images)
+        # >>> cache.oss_key(entry["list"])     # 未上传过返回 None
+        # >>> cache.record_oss_key(entry["list"], oss_key)
+    """
+    META = "meta.json"
+
+    def __init__(self, root: str = settings.SCREENSHOT_CACHE_DIR,
+                 max_bytes: int = settings.SCREENSHOT_CACHE_MAX_MB * 1024 * 1024,
+                 max_age: int = settings.SCREENSHOT_CACHE_MAX_AGE,
+                 evict_interval: int = settings.SCREENSHOT_CACHE_EVICT_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_interval = evict_interval
+
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "oss_hits": 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key_for(payload: Dict[str, Any], *salt: Any) -> str:
+        """payload 按 key 排序后序列化再取哈希，字段顺序不影响结果"""
+        return hashlib.sha256(json_codec.dumps_bytes([payload, salt], sort_keys=True)).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def entry_dir(self, key: str) -> str:
+        """条目目录，截图可以直接写到这里，store() 写入 meta.json 后条目才生效"""
+        entry_dir = self._entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+        return entry_dir
+
+    # ---------------- 截图 ----------------
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """命中时返回 {"list": 列表页截图路径, "dialogs": [弹窗截图路径]}"""
+        entry_dir = self._entry_dir(key)
+        meta = self._read_meta(entry_dir)
+        entry = None
+        if meta and time.time() - meta.get("created_at", 0) <= self.max_age:
+            paths = [os.path.join(entry_dir, name) for name in [meta["list"], *meta["dialogs"]]]
+            if all(os.path.isfile(p) for p in paths):
+                entry = {"list": paths[0], "dialogs": paths[1:]}
+                # 更新访问时间，供按最近使用淘汰
+                os.utime(os.path.join(entry_dir, self.META))
+
+        with self._lock:
+            self._stats["hits" if entry else "misses"] += 1
+        return entry
+
+    def store(self, key: str, list_image: str, dialog_images) -> Dict[str, Any]:
+        """
+        登记截图，返回缓存中的路径
+
+        已经写在条目目录（entry_dir）中的截图原地登记，路径不变，可以在登记前就开始上传；
+        其他位置的截图移动到条目目录。
+        """
+        entry_dir = self.entry_dir(key)
+        names = []
+        for path in [list_image, *dialog_images]:
+            path = os.path.abspath(path)
+            if os.path.dirname(path) != entry_dir:
+                target = os.path.join(entry_dir, os.path.basename(path))
+                shutil.move(path, target)
+                path = target
+            names.append(os.path.basename(path))
+
+        with self._lock:
+            old_meta = self._read_meta(entry_dir) or {}
+            meta = {"created_at": time.time(), "list": names[0], "dialogs": names[1:], "oss": {}}
+            # 同名文件已上传过的 OSS key 保留
+            meta["oss"] = {name: k for name, k in old_meta.get("oss", {}).items() if name in names}
+            self._write_meta(entry_dir, meta)
+            self._stats["stores"] += 1
+
+        self.maybe_evict()
+        return {
+            "list": os.path.join(entry_dir, meta["list"]),
+            "dialogs": [os.path.join(entry_dir, name) for name in meta["dialogs"]],
+        }
+
+    # ---------------- OSS key ----------------
+
+    def oss_key(self, path: str) -> Optional[str]:
+        """缓存中的截图已上传过时返回 OSS key"""
+        entry_dir, name = os.path.split(os.path.abspath(path))
+        if not entry_dir.startswith(self.root + os.sep):
+            return None
+        meta = self._read_meta(entry_dir)
+        oss_key = (meta or {}).get("oss", {}).get(name)
+        if oss_key:
+            with self._lock:
+                self._stats["oss_hits"] += 1
+        return oss_key
+
+    def record_oss_key(self, path: str, oss_key: str):
+        """记录缓存截图对应的 OSS key，非缓存目录下或尚未登记的文件忽略"""
+        entry_dir, name = os.path.split(os.path.abspath(path))
+        if not entry_dir.startswith(self.root + os.sep):
+            return
+        with self._lock:
+            meta = self._read_meta(entry_dir)
+            if meta is None:
+                return
+            meta.setdefault("oss", {})[name] = oss_key
+            self._write_meta(entry_dir, meta)
+
+    # ---------------- 淘汰 ----------------
+
+    def maybe_evict(self):
+        if time.time() - self._last_evict < self.evict_interval:
+            return
+        self._last_evict = time.time()
+        self.evict()
+
+    def evict(self) -> Dict[str, int]:
+        """删除过期条目，总大小超限时按最近使用时间淘汰"""
+        now = time.time()
+        entries, removed, total = [], 0, 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.is_dir():
+                    continue
+                meta = self._read_meta(entry.path)
+                if meta is None:
+                    # 截图中途失败、未登记的目录，留出足够时间给正在截图的任务
+                    if now - entry.stat().st_mtime > 3600:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+                    continue
+                if now - meta.get("created_at", 0) > self.max_age:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                last_used = os.stat(os.path.join(entry.path, self.META)).st_mtime
+                entries.append((last_used, size, entry.path))
+                total += size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+
+        result = {"entries": len(entries), "removed": removed, "bytes": total}
+        if removed:
+            logger.info(f"截图缓存淘汰: {result}")
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    # ---------------- meta.json ----------------
+
+    def _read_meta(self, entry_dir: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(entry_dir, self.META), "rb") as f:
+                return json_codec.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry_dir: str, meta: Dict[str, Any]):
+        tmp_path = os.path.join(entry_dir, f"{self.META}.{uuid.uuid4().hex}")
+        with open(tmp_path, "wb") as f:
+            f.write(json_codec.dumps_bytes(meta))
+        os.replace(tmp_path, os.path.join(entry_dir, self.META))
+
+
+_cache: Optional[ScreenshotCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_screenshot_cache() -> Optional[ScreenshotCache]:
+    """进程内共享的截图缓存，SCREENSHOT_CACHE_ENABLED=0 时返回 None"""
+    global _cache
+    if not settings.SCREENSHOT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScreenshotCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    # python -m utils.screenshot_cache --evict
+    parser = argparse.ArgumentParser(description="截图缓存维护")
+    parser.add_argument("--root", default=settings.SCREENSHOT_CACHE_DIR, help="缓存目录")
+    parser.add_argument("--evict", action="store_true", help="立即执行一次淘汰")
+    parser.add_argument("--clear", action="store_true", help="清空缓存")
+    args = parser.parse_args()
+
+    cache = ScreenshotCache(root=args.root)
+    if args.clear:
+        shutil.rmtree(cache.root, ignore_errors=True)
+        logger.info(f"已清空截图缓存: {cache.root}")
+    elif args.evict:
+        logger.info(cache.evict())
+    else:
+        cache.max_bytes, cache.max_age = float("inf"), float("inf")
+        logger.info(f"截图缓存 {cache.root}: {cache.evict()}")
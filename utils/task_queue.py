@@ -0,0 +1,211 @@
+import time
+from typing import Dict, Optional, Tuple
+
+import redis
+import redis.asyncio
+from loguru import logger
+
+from config import settings
+from utils import json_codec
+
+
+# 入队：按任务 id 去重，只有新任务才进入待处理列表
+_PUSH_SCRIPT = """
+if redis.call('HSET', KEYS[1], ARGV[1], ARGV[2]) == 1 then
+    if ARGV[3] == '1' then
+        redis.call('RPUSH', KEYS[2], ARGV[1])
+    else
+        redis.call('LPUSH', KEYS[2], ARGV[1])
+    end
+    return 1
+end
+return 0
+"""
+
+# 确认：从处理中列表、租约表、任务体中一并移除
+_ACK_SCRIPT = """
+redis.call('LREM', KEYS[1], 0, ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return redis.call('HDEL', KEYS[3], ARGV[1])
+"""
+
+# 回收：租约过期的任务放回待处理列表的出队端，优先重新投递
+_REAP_SCRIPT = """
+local now = tonumber(ARGV[1])
+local grace = tonumber(ARGV[2])
+local ids = redis.call('LRANGE', KEYS[1], 0, -1)
+local requeued = 0
+for _, id in ipairs(ids) do
+    local deadline = redis.call('ZSCORE', KEYS[2], id)
+    if not deadline then
+        -- 刚被领取、还没来得及写租约，给一个宽限期
+        redis.call('ZADD', KEYS[2], now + grace, id)
+    elseif tonumber(deadline) <= now then
+        redis.call('LREM', KEYS[1], 0, id)
+        redis.call('ZREM', KEYS[2], id)
+        if redis.call('HEXISTS', KEYS[4], id) == 1 then
+            redis.call('RPUSH', KEYS[3], id)
+            requeued = requeued + 1
+        end
+    end
+end
+return requeued
+"""
+
+
+def task_identifier(task: dict, task_type: str) -> str:
+    """生成任务唯一标识符，调度器与爬虫共用，作为队列去重的 key"""
+    if task_type in ("list", "XC_LIST_TEMPLATE_PIC_DISCOUNT"):
+        return f"list_{task['hotel_name']}_{task['check_in']}_{task['check_out']}"
+    elif task_type in ("detail", "XC_ROOM_DETAIL_RP_PIC_DISCOUNT"):
+        return f"detail_{task['hotel_name']}_{task['check_in']}_{task['check_out']}"
+    else:
+        return f"unknown_{hash(json_codec.dumps(task, sort_keys=True))}"
+
+
+class TaskQueue:
+    """
+    基于 Redis 的可靠任务队列，替代原来的 SET + spop
+
+    Redis 结构（name 为队列名，如 ctrip_detail_queue_v3）：
+        {name}:pending     LIST  待处理任务 id，左进右出 → FIFO；priority 任务从右端插队
+        {name}:processing  LIST  已被领取、尚未确认的任务 id
+        {name}:leases      ZSET  任务 id → 租约到期时间戳
+        {name}:payloads    HASH  任务 id → 任务 JSON，同一个 id 在确认前只会入队一次
+
+    流程：
+        push()   调度器投放任务，按任务 id 去重
+        claim()  爬虫原子地把任务从 pending 移到 processing（LMOVE/BLMOVE），并写入租约
+        ack()    任务处理完成后确认，彻底删除
+        requeue_expired()  定期回收租约过期的任务（爬虫进程中途退出），重新投递
+
+    使用示例：
+        # >>> queue = TaskQueue("ctrip_detail_queue_v3")
+        # >>> queue.push(task_identifier(task, "detail"), task)
+        # >>> claimed = queue.claim(timeout=5)
+        # >>> if claimed:
+        # ...     task_id, task = claimed
+        # ...     ...
+        # ...     queue.ack(task_id)
+    """
+
+    def __init__(self, name: str, redis_client: redis.StrictRedis = None, lease: int = settings.TASK_QUEUE_LEASE):
+        self.name = name
+        self.redis = redis_client or redis.StrictRedis(
+            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB, decode_responses=True
+        )
+        self.lease = lease
+
+        self.pending_key = f"{name}:pending"
+        self.processing_key = f"{name}:processing"
+        self.leases_key = f"{name}:leases"
+        self.payloads_key = f"{name}:payloads"
+
+        self._push = self.redis.register_script(_PUSH_SCRIPT)
+        self._ack = self.redis.register_script(_ACK_SCRIPT)
+        self._reap = self.redis.register_script(_REAP_SCRIPT)
+
+    def push(self, task_id: str, task: Dict, priority: bool = False) -> bool:
+        """
+        投放任务
+        :param task_id: 任务唯一标识，见 task_identifier
+        :param task: 任务内容
+        :param priority: 是否插队到队首
+        :return: True 表示新入队；False 表示同 id 任务已在队列或处理中（仅更新任务内容）
+        """
+        payload = json_codec.dumps(task, sort_keys=True)
+        return bool(self._push(keys=[self.payloads_key, self.pending_key], args=[task_id, payload, int(priority)]))
+
+    def claim(self, timeout: int = 0, lease: int = None) -> Optional[Tuple[str, Dict]]:
+        """
+        领取一个任务
+        :param timeout: 大于 0 时阻塞等待（BLMOVE）；0 表示不等待
+        :param lease: 租约时长，默认使用队列配置
+        :return: (task_id, task) 或 None
+        """
+        if timeout > 0:
+            task_id = self.redis.blmove(self.pending_key, self.processing_key, timeout, "RIGHT", "LEFT")
+        else:
+            task_id = self.redis.lmove(self.pending_key, self.processing_key, "RIGHT", "LEFT")
+        if not task_id:
+            return None
+
+        self.redis.zadd(self.leases_key, {task_id: time.time() + (lease or self.lease)})
+        payload = self.redis.hget(self.payloads_key, task_id)
+        if payload is None:
+            # 任务已被确认删除（重复投递的残留 id），直接丢弃
+            self.ack(task_id)
+            return None
+        return task_id, json_codec.loads(payload)
+
+    def ack(self, task_id: str):
+        """确认任务完成"""
+        self._ack(keys=[self.processing_key, self.leases_key, self.payloads_key], args=[task_id])
+
+    def requeue_expired(self) -> int:
+        """回收租约过期的任务，返回重新投递的数量"""
+        requeued = self._reap(
+            keys=[self.processing_key, self.leases_key, self.pending_key, self.payloads_key],
+            args=[time.time(), self.lease],
+        )
+        if requeued:
+            logger.warning(f"{self.name} 回收 {requeued} 个租约过期任务，重新投递")
+        return requeued
+
+    def size(self) -> Dict[str, int]:
+        """队列长度统计"""
+        return {
+            "pending": self.redis.llen(self.pending_key),
+            "processing": self.redis.llen(self.processing_key),
+        }
+
+
+class AsyncTaskQueue(TaskQueue):
+    """
+    TaskQueue 的 asyncio 版本，基于 redis.asyncio，Redis 结构与 TaskQueue 完全一致，
+    调度器用 TaskQueue 投放、爬虫用 AsyncTaskQueue 消费。所有方法均为协程，阻塞领取不会卡住事件循环。
+    """
+
+    def __init__(self, name: str, redis_client: redis.asyncio.StrictRedis = None,
+                 lease: int = settings.TASK_QUEUE_LEASE):
+        redis_client = redis_client or redis.asyncio.StrictRedis(
+            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB, decode_responses=True
+        )
+        super().__init__(name, redis_client, lease)
+
+    async def push(self, task_id: str, task: Dict, priority: bool = False) -> bool:
+        payload = json_codec.dumps(task, sort_keys=True)
+        return bool(await self._push(keys=[self.payloads_key, self.pending_key], args=[task_id, payload, int(priority)]))
+
+    async def claim(self, timeout: int = 0, lease: int = None) -> Optional[Tuple[str, Dict]]:
+        if timeout > 0:
+            task_id = await self.redis.blmove(self.pending_key, self.processing_key, timeout, "RIGHT", "LEFT")
+        else:
+            task_id = await self.redis.lmove(self.pending_key, self.processing_key, "RIGHT", "LEFT")
+        if not task_id:
+            return None
+
+        await self.redis.zadd(self.leases_key, {task_id: time.time() + (lease or self.lease)})
+        payload = await self.redis.hget(self.payloads_key, task_id)
+        if payload is None:
+            await self.ack(task_id)
+            return None
+        return task_id, json_codec.loads(payload)
+
+    async def ack(self, task_id: str):
+        await self._ack(keys=[self.processing_key, self.leases_key, self.payloads_key], args=[task_id])
+
+    async def requeue_expired(self) -> int:
+        requeued = await self._reap(
+            keys=[self.processing_key, self.leases_key, self.pending_key, self.payloads_key],
+            args=[time.time(), self.lease],
+        )
+        if requeued:
+            logger.warning(f"{self.name} 回收 {requeued} 个租约过期任务，重新投递")
+        return requeued
+
+    async def size(self) -> Dict[str, int]:
+        return {
+            "pending": await self.redis.llen(self.pending_key),
+            "processing": await self.redis.llen(self.processing_key),
+        }
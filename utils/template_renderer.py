@@ -0,0 +1,158 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+from loguru import logger
+
+from config import settings
+
+try:
+    import jinja2
+except ImportError:  # 未安装 jinja2 时回落到 Flask 渲染服务
+    jinja2 = None
+
+
+_HEAD_RE = re.compile(r"<head[^>]*>", re.IGNORECASE)
+
+
+def _iter_files(directory: str) -> Iterator[str]:
+    """按固定顺序遍历目录下的全部文件"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            yield os.path.join(root, name)
+
+
+class RoomRenderer:
+    """
+    房型页 HTML 渲染，替代每个房型一次的 Flask /render_room 请求
+
+    1. 默认在进程内用 Jinja2 渲染，编译后的模板缓存在 Environment 中，只在首次使用时编译
+    2. 模板里的静态资源（url_for('static', ...) 或 /static/... 相对路径）指向虚拟域名 RENDER_ORIGIN，
+       由浏览器 context 上的路由拦截直接从 STATIC_DIR 读文件返回，不经过网络，networkidle 立即完成
+    3. RENDER_BACKEND=flask、未安装 jinja2 或模板目录不存在时，回落到原来的 Flask 渲染服务
+
+    使用示例：
+        # >>> renderer = get_room_renderer()
+        # >>> html = renderer.render(payload)
+        # >>> await renderer.install_static_route(context)  # 浏览器池创建 context 时调用
+    """
+
+    def __init__(self, backend: str = settings.RENDER_BACKEND, template_dir: str = settings.TEMPLATE_DIR,
+                 template_name: str = settings.ROOM_TEMPLATE, static_dir: str = settings.STATIC_DIR,
+                 origin: str = settings.RENDER_ORIGIN, flask_url: str = settings.RENDER_ROOM_URL):
+        self.template_name = template_name
+        self.template_dir = os.path.abspath(template_dir)
+        self.static_dir = os.path.abspath(static_dir)
+        self.origin = origin.rstrip("/")
+        self.flask_url = flask_url
+        self.session = requests.Session()
+
+        self.env = None
+        if backend == "jinja":
+            if jinja2 is None:
+                logger.warning("未安装 jinja2，房型页回落到 Flask 渲染")
+            elif not os.path.isdir(template_dir):
+                logger.warning(f"模板目录不存在: {template_dir}，房型页回落到 Flask 渲染")
+            else:
+                self.env = jinja2.Environment(
+                    loader=jinja2.FileSystemLoader(template_dir),
+                    autoescape=jinja2.select_autoescape(["html", "htm", "xml"]),
+                    auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+                )
+                # 与 Flask 模板保持兼容：url_for('static', filename=...)
+                self.env.globals["url_for"] = self.url_for
+
+    @property
+    def in_process(self) -> bool:
+        """是否在进程内渲染（需要在浏览器 context 上安装静态资源路由）"""
+        return self.env is not None
+
+    def fingerprint(self) -> Optional[str]:
+        """
+        渲染环境标识，作为截图缓存 key 的一部分
+
+        进程内渲染时包含模板目录（含 include / extends 的子模板）和静态资源目录下全部文件的修改时间与大小，
+        任一文件修改后缓存自动失效；Flask 渲染时无法感知服务端模板变化，只使用 SCREENSHOT_CACHE_VERSION，
+        未配置时返回 None，不使用截图缓存
+        """
+        version = settings.SCREENSHOT_CACHE_VERSION
+        if self.env is None:
+            return f"flask:{self.flask_url}:{version}" if version else None
+
+        digest = hashlib.sha1()
+        for directory in (self.template_dir, self.static_dir):
+            for path in _iter_files(directory):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                digest.update(f"{os.path.relpath(path, directory)}:{stat.st_mtime_ns}:{stat.st_size}\n".encode())
+        return f"jinja:{self.template_name}:{version}:{digest.hexdigest()}"
+
+    def render(self, payload: Dict[str, Any]) -> str:
+        """渲染房型页，失败时抛出异常"""
+        if self.env is None:
+            resp = self.session.post(self.flask_url, json=payload, timeout=20)
+            resp.raise_for_status()
+            return resp.text
+
+        # 模板既可以直接使用 payload 中的字段，也可以通过 data 访问整个 payload
+        html = self.env.get_template(self.template_name).render(data=payload, **payload)
+        return self._with_base(html)
+
+    def url_for(self, endpoint: str, filename: str = "", **kwargs) -> str:
+        if endpoint != "static":
+            raise ValueError(f"进程内渲染只支持 url_for('static', ...)，收到: {endpoint}")
+        return f"{self.origin}/static/{filename.lstrip('/')}"
+
+    def _with_base(self, html: str) -> str:
+        """page.set_content 的文档地址是 about:blank，加上 <base> 让 /static/... 相对路径落到虚拟域名"""
+        if "<base " in html[:2048].lower():
+            return html
+        base = f'<base href="{self.origin}/">'
+        match = _HEAD_RE.search(html)
+        if match:
+            return f"{html[:match.end()]}{base}{html[match.end():]}"
+        return base + html
+
+    # ---------------- 静态资源路由（在浏览器池的事件循环中执行） ----------------
+
+    async def install_static_route(self, context):
+        await context.route(f"{self.origin}/**", self._serve_static)
+
+    async def _serve_static(self, route):
+        path = unquote(urlparse(route.request.url).path)
+        if path.startswith("/static/"):
+            path = path[len("/static/"):]
+        file_path = os.path.abspath(os.path.join(self.static_dir, path.lstrip("/")))
+
+        # 防止 ../ 跳出静态目录
+        if not file_path.startswith(self.static_dir + os.sep) or not os.path.isfile(file_path):
+            logger.warning(f"⚠ 静态资源不存在: {route.request.url}")
+            await route.fulfill(status=404, body="")
+            return
+
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        await route.fulfill(status=200, path=file_path, headers={
+            "Content-Type": content_type,
+            "Cache-Control": "max-age=86400",
+        })
+
+
+_renderer: Optional[RoomRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_room_renderer() -> RoomRenderer:
+    """进程内共享的渲染器，模板只编译一次"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = RoomRenderer()
+        return _renderer